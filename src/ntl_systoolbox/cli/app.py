@@ -1,27 +1,98 @@
+import importlib
+from pathlib import Path
+from typing import Optional
+
 import typer
-from ntl_systoolbox.cli.interactive import run_interactive_menu
-from ntl_systoolbox.cli import module1_diag, module2_backup, module3_audit
+from typer.core import TyperCommand, TyperGroup
+
+# Sous-commandes chargées à la demande : nom -> (module, attribut Typer, aide, groupe).
+# groupe=False : l'app Typer n'expose qu'une commande, appelée directement.
+# Les dépendances lourdes (paramiko, mariadb, dotenv...) ne sont importées que
+# si la commande correspondante est réellement lancée.
+LAZY_SUBCOMMANDS = {
+    "diag": ("ntl_systoolbox.cli.module1_diag", "app", "Module 1 - Diagnostic", True),
+    "backup": ("ntl_systoolbox.cli.module2_backup", "app", "Module 2 - Sauvegarde WMS", True),
+    "audit": ("ntl_systoolbox.cli.module3_audit", "app", "Module 3 - Audit obsolescence", True),
+    "inventory": ("ntl_systoolbox.cli.inventory", "app", "Inventaire SQLite des audits et diagnostics", True),
+    "run": ("ntl_systoolbox.cli.runner", "app", "Exécute un plan de tâches (YAML/JSON) en parallèle", False),
+}
+
+
+class _LazyCommand(TyperCommand):
+    """Commande de substitution : importe le vrai module au premier appel."""
+
+    def __init__(self, name: str, module: str, attr: str, help: str, group: bool = True):
+        super().__init__(name=name, help=help)
+        self._module = module
+        self._attr = attr
+        self._group = group
+        self._real = None
+
+    def load(self):
+        if self._real is None:
+            typer_app = getattr(importlib.import_module(self._module), self._attr)
+            real = typer.main.get_group(typer_app) if self._group else typer.main.get_command(typer_app)
+            # get_command ajoute --install/--show-completion, propres au programme racine
+            real.params = [p for p in real.params if p.name not in ("install_completion", "show_completion")]
+            real.name = self.name
+            real.help = real.help or self.help
+            self._real = real
+        return self._real
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return self.load().make_context(info_name, args, parent=parent, **extra)
+
+
+class LazyGroup(TyperGroup):
+    def list_commands(self, ctx: typer.Context) -> list[str]:
+        return list(LAZY_SUBCOMMANDS) + [n for n in super().list_commands(ctx) if n not in LAZY_SUBCOMMANDS]
+
+    def get_command(self, ctx: typer.Context, cmd_name: str):
+        if cmd_name in LAZY_SUBCOMMANDS:
+            if cmd_name not in self.commands:
+                module, attr, help, group = LAZY_SUBCOMMANDS[cmd_name]
+                self.commands[cmd_name] = _LazyCommand(cmd_name, module, attr, help, group)
+            return self.commands[cmd_name]
+        return super().get_command(ctx, cmd_name)
+
 
 app = typer.Typer(
     name="ntl-systoolbox",
     help="NTL-SysToolbox - Outil CLI (3 modules) + sorties JSON/console.",
     no_args_is_help=False,
+    cls=LazyGroup,
 )
 
-# Sous-apps (commandes)
-app.add_typer(module1_diag.app, name="diag", help="Module 1 - Diagnostic")
-app.add_typer(module2_backup.app, name="backup", help="Module 2 - Sauvegarde WMS")
-app.add_typer(module3_audit.app, name="audit", help="Module 3 - Audit obsolescence")
-
 
 @app.command("menu")
 def menu():
     """Lance le mode interactif (menus)."""
+    from ntl_systoolbox.cli.interactive import run_interactive_menu
     run_interactive_menu()
 
 
 @app.callback(invoke_without_command=True)
-def _default(ctx: typer.Context):
+def _default(
+    ctx: typer.Context,
+    metrics_file: Optional[Path] = typer.Option(
+        None, "--metrics-file", envvar="NTL_METRICS_FILE",
+        help="Écrit les métriques (format texte Prometheus) en fin d'exécution, ex: pour node-exporter textfile ;"
+             " compteurs de cette exécution seulement (un fichier par tâche planifiée),"
+             " horodatages de dernier succès conservés d'une exécution à l'autre",
+    ),
+    metrics_port: Optional[int] = typer.Option(
+        None, "--metrics-port", envvar="NTL_METRICS_PORT",
+        help="Expose les métriques sur http://127.0.0.1:PORT/metrics pendant l'exécution",
+    ),
+):
+    if metrics_file or metrics_port:
+        from ntl_systoolbox.core.metrics import REGISTRY
+        if metrics_port:
+            REGISTRY.serve(metrics_port)
+        if metrics_file:
+            ctx.call_on_close(lambda: REGISTRY.write_textfile(metrics_file))
+
     # Si l'utilisateur lance sans argument -> menu interactif
     if ctx.invoked_subcommand is None:
-        run_interactive_menu()
\ No newline at end of file
+        from ntl_systoolbox.cli.interactive import run_interactive_menu
+        run_interactive_menu()
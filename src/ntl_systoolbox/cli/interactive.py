@@ -1,7 +1,18 @@
 from __future__ import annotations
+from ntl_systoolbox.core.session import SessionContext
 from ntl_systoolbox.core.ui import choose, console
 
 def run_interactive_menu() -> None:
+    # Une seule session pour toute la durée du menu : secrets, connexions
+    # et derniers résultats sont conservés d'une action à l'autre
+    session = SessionContext()
+    try:
+        _main_menu(session)
+    finally:
+        session.close()
+
+
+def _main_menu(session: SessionContext) -> None:
     while True:
         main = choose(
             "Menu principal",
@@ -19,19 +30,22 @@ def run_interactive_menu() -> None:
             return
 
         if main == "1":
-            _menu_module1()
+            _menu_module1(session)
         elif main == "2":
-            _menu_module2()
+            _menu_module2(session)
         elif main == "3":
-            _menu_module3()
+            _menu_module3(session)
 
 
-def _menu_module1() -> None:
+def _menu_module1(session: SessionContext) -> None:
     from ntl_systoolbox.cli.module1_diag import (
         run,
-        run_AD_DNS_OS
+        run_AD_DNS_OS,
+        warm_session,
     )   
 
+    warm_session(session)
+
     while True:
         c = choose(
             "Module 1 - Diagnostic",
@@ -45,7 +59,7 @@ def _menu_module1() -> None:
             return
         # Placeholders : tu relieras aux vraies fonctions plus tard
         if c == "1":
-            run_AD_DNS_OS()
+            run_AD_DNS_OS(session)
         elif c == "2":
             console.print("[yellow]TODO:[/yellow] implémenter test MySQL")
             run()
@@ -53,12 +67,15 @@ def _menu_module1() -> None:
             console.print("[yellow]TODO:[/yellow] exporter JSON diagnostic")
 
 
-def _menu_module2() -> None:
+def _menu_module2(session: SessionContext) -> None:
     from ntl_systoolbox.cli.module2_backup import (
         interactive_dump_sql,
         interactive_export_csv,
+        warm_session,
     )
 
+    warm_session(session)
+
     while True:
         c = choose(
             "Module 2 - Sauvegarde WMS",
@@ -71,22 +88,26 @@ def _menu_module2() -> None:
             return
 
         if c == "1":
-            interactive_dump_sql()
+            interactive_dump_sql(session)
         elif c == "2":
-            interactive_export_csv()
+            interactive_export_csv(session)
 
 
-def _menu_module3() -> None:
+def _menu_module3(session: SessionContext) -> None:
     from ntl_systoolbox.cli.module3_audit import (
         interactive_audit_system,
         interactive_audit_reseau,
+        interactive_audit_report,
+        warm_session,
     )
+
+    warm_session(session)
     while True:
         c = choose(
             "Module 3 - Audit obsolescence",
             [
                 ("1", "Scanner un ou des hotes donné manuellement"),
-                ("2", "Générer rapport (placeholder)"),
+                ("2", "Générer rapport (HTML/Markdown/CSV)"),
                 ("3", "Exporter JSON (placeholder)"),
                 ("4", "Scanner un réseau entier "),
                 ("5", "Audit réseau SSH (placeholder)"),
@@ -95,12 +116,12 @@ def _menu_module3() -> None:
         if c is None:
             return
         if c == "1":
-            interactive_audit_system()
+            interactive_audit_system(session)
         elif c == "2":
-            console.print("[yellow]TODO:[/yellow] implémenter rapport audit")
+            interactive_audit_report(session)
         elif c == "3":
             console.print("[yellow]TODO:[/yellow] exporter JSON audit")
         elif c == "4":
-            interactive_audit_reseau()
+            interactive_audit_reseau(session)
             
             
\ No newline at end of file
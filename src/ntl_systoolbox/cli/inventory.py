@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from ntl_systoolbox.core import inventory as inv
+
+app = typer.Typer()
+console = Console()
+
+
+def _fmt_ts(ts: Optional[float]) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else ""
+
+
+def _print_rows(rows, columns: list[str], as_json: bool, title: str) -> None:
+    if as_json:
+        typer.echo(json.dumps([{c: row[c] for c in columns} for row in rows], indent=2, ensure_ascii=False))
+        return
+    table = Table(title=title)
+    for c in columns:
+        table.add_column(c)
+    for row in rows:
+        table.add_row(*[_fmt_ts(row[c]) if c == "ts" or c.endswith("_ts") or c == "last_seen" else str(row[c] or "")
+                        for c in columns])
+    console.print(table)
+    console.print(f"{len(rows)} ligne(s)")
+
+
+@app.command("hosts")
+def hosts(
+    os_family: Optional[str] = typer.Option(None, "--os-family", help="linux / windows"),
+    distribution: Optional[str] = typer.Option(None, "--distribution", "-d", help="ex: ubuntu, debian, rhel"),
+    version: Optional[str] = typer.Option(None, "--version", "-v", help="ex: 18.04"),
+    eol_status: Optional[str] = typer.Option(None, "--eol-status", help="supported / eol_soon / eol / unknown"),
+    as_json: bool = typer.Option(False, "--json", help="Sortie JSON"),
+):
+    """Dernier état connu des hôtes (ex: qui tourne encore sous Ubuntu 18.04 ?)."""
+    with closing(inv.connect()) as conn:
+        rows = inv.query_hosts(conn, os_family, distribution, version, eol_status)
+    _print_rows(rows, ["host", "hostname", "os_family", "distribution", "version", "eol_date", "eol_status",
+                       "last_seen"], as_json, "Inventaire des hôtes")
+
+
+@app.command("history")
+def history(
+    host: str,
+    limit: int = typer.Option(50, "--limit", "-n"),
+    as_json: bool = typer.Option(False, "--json", help="Sortie JSON"),
+):
+    """Historique des audits et diagnostics d'un hôte."""
+    with closing(inv.connect()) as conn:
+        rows = inv.host_history(conn, host, limit)
+    _print_rows(rows, ["kind", "ts", "os", "version", "status", "error"], as_json, f"Historique {host}")
+
+
+@app.command("service-down")
+def service_down(
+    service: str = typer.Argument(..., help="ex: NTDS, DNS, SSSD, BIND9"),
+    host: Optional[str] = typer.Option(None, "--host"),
+    as_json: bool = typer.Option(False, "--json", help="Sortie JSON"),
+):
+    """Dernière fois qu'un service a été signalé non actif, par hôte."""
+    with closing(inv.connect()) as conn:
+        rows = inv.service_down(conn, service.upper(), host)
+    _print_rows(rows, ["host", "ts", "status", "occurrences"], as_json, f"Service {service.upper()} KO")
+
+
+@app.command("import")
+def import_results(input_file: Path):
+    """Importe un fichier de résultats d'audit (NDJSON/JSON) dans l'inventaire."""
+    from ntl_systoolbox.core.audit_report import iter_audit_records
+    from ntl_systoolbox.core.eol import load_eol_index
+
+    if not input_file.exists():
+        typer.echo(f"[red]Fichier introuvable:[/red] {input_file}")
+        raise typer.Exit(code=1)
+    ts = input_file.stat().st_mtime
+    count = 0
+    with inv.InventoryWriter("audit", source=str(input_file)) as writer:
+        for record in iter_audit_records(input_file):
+            # Fichiers antérieurs à l'enrichissement EOL
+            if "error" not in record and "eol_status" not in record:
+                record.update(load_eol_index().evaluate(record))
+            writer.add_audit(record, ts=ts)
+            count += 1
+    typer.echo(f"[green]OK[/green] {count} résultats importés dans {inv.inventory_path()}")
@@ -1,11 +1,14 @@
 #python -m pip install psutil typer paramiko
 #Distant : python diagnostic.py choose --mode remote
 import typer
-import mariadb          #MariaDB
 import paramiko         #SSH distant (OpenSSH Windows/Linux)
 import getpass          #Mot de passe sécurisé
 import re               #Gestions des données (Disque/RAM/CPU/Uptime)s
 import sys              #Ferme le programme
+import time             #Durée du diagnostic (métriques)
+
+from ntl_systoolbox.core.inventory import record_diag
+from ntl_systoolbox.core.metrics import DIAG_DURATION, DIAG_RUNS, LAST_SUCCESS
 
 app = typer.Typer()
 
@@ -14,6 +17,8 @@ app = typer.Typer()
 # ======== FONCTION : BDD ========
 
 def run():
+    import mariadb      #MariaDB (importé ici : inutile pour le diagnostic SSH)
+
     # Connection parameters
     db_config = {
         'user': 'admin',
@@ -54,13 +59,19 @@ def run():
 
 
 # ======== FONCTION : DISTANT SSH (LINUX + WINDOWS) ========
-def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
+def check_remote_ssh(host: str, user: str, password: str, port: int = 22, client: paramiko.SSHClient | None = None) -> dict:
+    """
+    Diagnostic distant ; affiche le résultat et le renvoie sous forme de dict.
+    client : connexion déjà ouverte (session interactive), réutilisée et laissée ouverte.
+    """
+    report = {"host": host, "port": port, "success": False}
+    started = time.monotonic()
     print(f"\n{'='*60}")
     print(f"DIAGNOSTIC {host}:{port}")
     print(f"{'='*60}")
     
     #Initialisation client SSH
-    ssh = paramiko.SSHClient()
+    ssh = client or paramiko.SSHClient()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
     
     #Exécute commande SSH + gère erreurs
@@ -74,7 +85,8 @@ def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
             return "ERREUR"
     
     try:
-        ssh.connect(host, port=port, username=user, password=password, timeout=10)
+        if client is None:
+            ssh.connect(host, port=port, username=user, password=password, timeout=10)
         print("SSH connecté !")
         
         #DETECTION AUTOMATIQUE OS
@@ -87,6 +99,7 @@ def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
         
         os_type = "Windows" if is_windows else "Linux" if is_linux else "Windows"
         print(f"Système détecté : {os_type}")
+        report["os_type"] = os_type
         
         #AFFICHAGE OS
         if is_windows:
@@ -96,6 +109,7 @@ def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
         else:
             os_name = safe_exec('grep PRETTY_NAME /etc/os-release 2>/dev/null | cut -d\'"\' -f2')
         print(f"OS : {os_name}")
+        report["os"] = os_name
         
         #UPTIME
         if is_windows:
@@ -105,11 +119,14 @@ def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
                 days = sec // 86400
                 hours = (sec % 86400) // 3600
                 print(f"Uptime : {days}j {hours}h")
+                report["uptime"] = f"{days}j {hours}h"
             else:
                 print("Uptime : ERREUR")
+                report["uptime"] = "ERREUR"
         else:
             uptime_raw = safe_exec('uptime -p')
             print(f"Uptime : {uptime_raw}")
+            report["uptime"] = uptime_raw
         
         #CPU + RAM Utilisation (%)
         if is_windows:
@@ -121,6 +138,8 @@ def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
         
         print(f"CPU : {cpu_raw if cpu_raw != 'ERREUR' else 'ERREUR'}% d'utilisation")
         print(f"RAM : {ram_raw if ram_raw != 'ERREUR' else 'ERREUR'}% d'utilisation")
+        report["cpu_percent"] = cpu_raw
+        report["ram_percent"] = ram_raw
 
         #DISQUE PRINCIPAL C: ou /
         if is_windows:
@@ -133,13 +152,17 @@ def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
                     free_bytes = int(free_match.group(1))
                     used_percent = ((total_bytes - free_bytes) / total_bytes) * 100
                     print(f"Disque C: {used_percent:.1f}% ({total_bytes//(1024**3)} Go)")
+                    report["disk"] = f"{used_percent:.1f}% ({total_bytes//(1024**3)} Go)"
                 else:
                     print("C: ERREUR parsing")
+                    report["disk"] = "ERREUR"
             else:
                 print("C: ERREUR WMIC")
+                report["disk"] = "ERREUR"
         else:
             disk_raw = safe_exec('df -h / | tail -1 | awk \'{printf "%s (%.0fG total)", $5, $2}\'')
             print(f"Disque /: {disk_raw}")
+            report["disk"] = disk_raw
         
         #SERVICES AD/DNS ou SSID/Bind9
         if is_windows:
@@ -149,26 +172,83 @@ def check_remote_ssh(host: str, user: str, password: str, port: int = 22):
             dns_status = "ACTIF" if "RUNNING" in dns else "sKO"
             print(f"NTDS : {ntds_status}")
             print(f"DNS  : {dns_status}")
+            report["services"] = {"NTDS": ntds_status, "DNS": dns_status}
         else:
             sssd = safe_exec('systemctl is-active sssd 2>/dev/null || echo inactive')
             bind9 = safe_exec('systemctl is-active bind9 2>/dev/null || echo inactive')
             print(f"SSSD  : {'ACTIF' if 'active' in sssd else 'KO'}")
             print(f"BIND9 : {'ACTIF' if 'active' in bind9 else 'KO'}")
+            report["services"] = {
+                "SSSD": 'ACTIF' if 'active' in sssd else 'KO',
+                "BIND9": 'ACTIF' if 'active' in bind9 else 'KO',
+            }
         
         print(f"\n{'='*60}")
         print("DIAGNOSTIC TERMINÉ")
+        report["success"] = True
         
     except Exception as e:
         print(f"Erreur : {e}")
+        report["error"] = str(e)
     finally:
-        ssh.close()
+        if client is None:
+            ssh.close()
+        DIAG_RUNS.inc(result="success" if report["success"] else "failure")
+        DIAG_DURATION.observe(time.monotonic() - started)
+        if report["success"]:
+            LAST_SUCCESS.set(time.time(), operation="diag")
+        try:
+            record_diag(report, source="check_remote_ssh")
+        except Exception as e:
+            print(f"Inventaire non mis à jour : {e}")
+    return report
 
-def run_AD_DNS_OS():
+def run_AD_DNS_OS(session=None):
     print(" DIAGNOSTIC COMPLET (Windows Server / Ubuntu)\n")
-    host = input("IP/Hostname : ").strip()
-    user = input("Utilisateur : ").strip()
-    password = getpass.getpass("Mot de passe : ")
-    port_input = input("Port SSH [22] : ").strip()
+    if session is None:
+        host = input("IP/Hostname : ").strip()
+        user = input("Utilisateur : ").strip()
+        password = getpass.getpass("Mot de passe : ")
+        port_input = input("Port SSH [22] : ").strip()
+        port = int(port_input) if port_input else 22
+
+        check_remote_ssh(host, user, password, port)
+        return
+
+    #Session interactive : dernière cible proposée par défaut, mot de passe saisi une fois
+    last = session.results.get("diag_target", {})
+    host = _ask("IP/Hostname", last.get("host"))
+    user = _ask("Utilisateur", last.get("user"))
+    port_input = _ask("Port SSH", str(last.get("port", 22)))
     port = int(port_input) if port_input else 22
-    
-    check_remote_ssh(host, user, password, port)
+    secret_name = f"ssh:{user}@{host}:{port}"
+    password = session.secret(secret_name, "Mot de passe : ")
+    session.results["diag_target"] = {"host": host, "user": user, "port": port}
+
+    try:
+        client = session.ssh(host, user, port, password=password)
+    except Exception as e:
+        #Échec de connexion : mot de passe oublié pour être redemandé
+        print(f"Erreur : {e}")
+        session.forget_secret(secret_name)
+        session.results["diag"] = {"host": host, "port": port, "success": False, "error": str(e)}
+        return
+    report = check_remote_ssh(host, user, password, port, client=client)
+    if not report["success"]:
+        session.drop_ssh(host, user, port)
+    session.results["diag"] = report
+
+
+def _ask(label: str, default: str | None) -> str:
+    value = input(f"{label} [{default}] : " if default else f"{label} : ").strip()
+    return value or (default or "")
+
+
+def warm_session(session) -> None:
+    """À l'ouverture du menu 1 : reconnexion en arrière-plan à la dernière cible."""
+    target = session.results.get("diag_target")
+    if not target:
+        return
+    password = session.known_secret(f"ssh:{target['user']}@{target['host']}:{target['port']}")
+    if password:
+        session.warm_ssh(target["host"], target["user"], target["port"], password=password)
@@ -7,17 +7,41 @@ import os
 import socket
 import subprocess
 import shutil
+import tempfile
 import getpass
+import gzip
+import hashlib
+import shlex
+import zlib
 from pathlib import Path
 import typer
 from rich.console import Console
+from rich.table import Table
 import csv
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Optional, List
 
-from ntl_systoolbox.core.paths import get_paths
+from ntl_systoolbox.core.backup_plan import (
+    STRATEGY_CHUNKED,
+    STRATEGY_PARALLEL,
+    STRATEGY_SINGLE,
+    BackupPlan,
+    TableStats,
+    human_bytes,
+    manifest_throughput,
+    parse_table_stats,
+    plan_dump,
+    plan_export,
+)
+from ntl_systoolbox.core.metrics import BACKUP_BYTES, BACKUP_DURATION, BACKUP_ROWS, BACKUP_RUNS, LAST_SUCCESS
+from ntl_systoolbox.core.paths import get_paths, load_env
 
-from dotenv import load_dotenv, find_dotenv
-load_dotenv(find_dotenv(".env", usecwd=True))
+if TYPE_CHECKING:
+    import paramiko
+
+    from ntl_systoolbox.core.session import SessionContext
+
+load_env()
 
 app = typer.Typer()
 console = Console()
@@ -41,9 +65,33 @@ def _write_manifest(artifact: Path, kind: str, extra: dict) -> Path:
     return manifest
 
 
-def _perform_mysqldump(host: str, user: str, password: str, db: str, out: Path, port: int = 3306) -> bool:
+def _record_backup(operation: str, success: bool, artifact: Optional[Path] = None, duration: Optional[float] = None) -> None:
+    """Alimente les métriques (voir --metrics-file / --metrics-port)."""
+    BACKUP_RUNS.inc(operation=operation, result="success" if success else "failure")
+    if duration is not None:
+        BACKUP_DURATION.observe(duration, operation=operation)
+    if success and artifact is not None and artifact.exists():
+        BACKUP_BYTES.inc(artifact.stat().st_size, operation=operation)
+        LAST_SUCCESS.set(time.time(), operation=operation)
+
+
+def _perform_mysqldump(
+    host: str,
+    user: str,
+    password: str,
+    db: str,
+    out: Path,
+    port: int = 3306,
+    tables: Optional[List[str]] = None,
+    compress: bool = False,
+    stats: Optional[dict] = None,
+    options: Optional[List[str]] = None,
+) -> bool:
     """Run `mysqldump` against a remote MariaDB/MySQL instance.
 
+    tables limits the dump to these tables; compress streams the output
+    through gzip (stats["raw_bytes"] then receives the uncompressed size).
+    options are extra mysqldump flags (ex: --no-data).
     Returns True on success, False otherwise.
     """
     if shutil.which("mysqldump") is None:
@@ -60,10 +108,14 @@ def _perform_mysqldump(host: str, user: str, password: str, db: str, out: Path,
         "-u",
         user,
         f"--password={password}",
+        *(options or []),
         db,
+        *(tables or []),
     ]
 
     try:
+        if compress:
+            return _mysqldump_gzip(args, out, stats)
         with out.open("wb") as fout:
             proc = subprocess.run(args, stdout=fout, stderr=subprocess.PIPE)
         if proc.returncode != 0:
@@ -75,6 +127,203 @@ def _perform_mysqldump(host: str, user: str, password: str, db: str, out: Path,
         return False
 
 
+def _mysqldump_gzip(args: List[str], out: Path, stats: Optional[dict]) -> bool:
+    """mysqldump -> gzip en flux continu (jamais de fichier SQL brut sur disque)."""
+    raw = 0
+    with tempfile.TemporaryFile() as err, gzip.open(out, "wb", compresslevel=6) as fout:
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=err)
+        for block in iter(lambda: proc.stdout.read(1 << 20), b""):
+            fout.write(block)
+            raw += len(block)
+        proc.stdout.close()
+        returncode = proc.wait()
+        err.seek(0)
+        stderr = err.read().decode(errors="replace").strip()
+    if returncode != 0:
+        console.print(f"[red]mysqldump failed:[/red] {stderr}")
+        return False
+    if stats is not None:
+        stats["raw_bytes"] = stats.get("raw_bytes", 0) + raw
+    return True
+
+
+def _perform_parallel_dump(
+    host: str, user: str, password: str, db: str, out: Path, port: int,
+    tables: List[str], jobs: int, compress: bool, stats: Optional[dict] = None,
+    views: Optional[List[str]] = None,
+) -> bool:
+    """
+    Un mysqldump par table, `jobs` à la fois, puis concaténation dans l'ordre
+    des tables en un seul fichier (des membres gzip concaténés restent un
+    gzip valide). Chaque table est cohérente, pas l'ensemble. Les vues sont
+    ajoutées à la fin (--no-data), une fois toutes leurs tables créées ; les
+    triggers suivent leur table, comme en mode un seul flux.
+    """
+    parts_dir = Path(tempfile.mkdtemp(prefix=f".{out.name}.", dir=out.parent))
+    try:
+        parts = {t: parts_dir / f"{i:05d}.part" for i, t in enumerate(tables)}
+        part_stats = {t: {} for t in tables}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(_perform_mysqldump, host, user, password, db, parts[t], port, [t], compress,
+                                part_stats[t]): t
+                for t in tables
+            }
+            failed = [futures[f] for f in as_completed(futures) if not f.result()]
+        if failed:
+            console.print(f"[red]Dump en échec pour:[/red] {', '.join(failed)}")
+            return False
+        ordered = [parts[t] for t in tables]
+        if views:
+            views_part = parts_dir / "views.part"
+            if not _perform_mysqldump(host, user, password, db, views_part, port, views, compress,
+                                      options=["--no-data", "--skip-triggers"]):
+                console.print(f"[red]Dump des vues en échec:[/red] {', '.join(views)}")
+                return False
+            ordered.append(views_part)
+        with out.open("wb") as fout:
+            for path in ordered:
+                with path.open("rb") as part:
+                    shutil.copyfileobj(part, fout, 1 << 20)
+        if stats is not None and compress:
+            stats["raw_bytes"] = sum(ps.get("raw_bytes", 0) for ps in part_stats.values())
+        return True
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+
+# --------------------------
+# Dump distant : mysqldump | gzip exécuté sur l'hôte SSH
+# --------------------------
+def _mysql_defaults(password: str) -> bytes:
+    """Fichier d'options [client] envoyé sur stdin : le mot de passe n'apparaît dans aucun argv."""
+    escaped = (password or "").replace("\\", "\\\\").replace("\n", "\\n")
+    return f'[client]\npassword="{escaped}"\n'.encode()
+
+
+def _remote_run(client: paramiko.SSHClient, command: str, stdin: bytes = b"", timeout: float = 30.0):
+    """Commande courte sur l'hôte SSH ; résultat au format de subprocess.run (texte)."""
+    chan = client.get_transport().open_session(timeout=timeout)
+    try:
+        chan.settimeout(timeout)
+        chan.exec_command(command)
+        chan.sendall(stdin)
+        chan.shutdown_write()
+        out = chan.makefile("rb").read()
+        err = chan.makefile_stderr("rb").read()
+        status = chan.recv_exit_status()
+    finally:
+        chan.close()
+    return subprocess.CompletedProcess(command, status, out.decode(errors="replace"), err.decode(errors="replace"))
+
+
+def _remote_dump_command(db_host: str, port: int, user: str, db: str, tables: Optional[List[str]] = None) -> str:
+    """
+    Commande POSIX lancée sur l'hôte SSH : mysqldump compressé sur place
+    (pigz si présent, sinon gzip). Le code retour est celui de mysqldump,
+    pas celui du compresseur ; le mot de passe est lu sur stdin.
+    """
+    dump = " ".join(shlex.quote(a) for a in [
+        "mysqldump", "--defaults-extra-file=/dev/stdin",
+        "-h", db_host, "-P", str(port), "-u", user, db, *(tables or []),
+    ])
+    return (
+        'z=$(command -v pigz || echo gzip); exec 4>&1; '
+        f'rc=$({{ {{ {dump}; echo $? >&3; }} | "$z" -c >&4; }} 3>&1); exit ${{rc:-1}}'
+    )
+
+
+def _perform_remote_mysqldump(
+    client: paramiko.SSHClient,
+    db_host: str,
+    user: str,
+    password: str,
+    db: str,
+    out: Path,
+    port: int = 3306,
+    tables: Optional[List[str]] = None,
+    stats: Optional[dict] = None,
+    idle_timeout: float = 300.0,
+) -> bool:
+    """
+    Lance mysqldump | gzip sur l'hôte SSH et écrit le flux compressé tel
+    quel dans out : seuls les octets compressés traversent le lien. Le flux
+    est aussi décompressé en mémoire, par blocs et sans écriture, pour
+    vérifier qu'il est complet et compter sa taille brute (stats["raw_bytes"]).
+    """
+    out.parent.mkdir(parents=True, exist_ok=True)
+    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    raw = 0
+    err = []
+    try:
+        chan = client.get_transport().open_session(timeout=15)
+        try:
+            chan.settimeout(idle_timeout)
+            chan.exec_command(_remote_dump_command(db_host, port, user, db, tables))
+            chan.sendall(_mysql_defaults(password))
+            chan.shutdown_write()
+            with out.open("wb") as fout:
+                for block in iter(lambda: chan.recv(1 << 20), b""):
+                    fout.write(block)
+                    while block:
+                        raw += len(inflate.decompress(block, 1 << 22))
+                        block = inflate.unconsumed_tail
+                    while chan.recv_stderr_ready():
+                        err.append(chan.recv_stderr(32768))
+            status = chan.recv_exit_status()
+            while chan.recv_stderr_ready():
+                err.append(chan.recv_stderr(32768))
+        finally:
+            chan.close()
+    except Exception as exc:
+        console.print(f"[red]Erreur lors du dump distant:[/red] {exc}")
+        return False
+
+    if status != 0 or not inflate.eof:
+        stderr = b"".join(err).decode(errors="replace").strip()
+        console.print(f"[red]mysqldump distant en échec (code {status}):[/red] {stderr or 'flux gzip incomplet'}")
+        return False
+    if stats is not None:
+        stats["raw_bytes"] = raw
+    return True
+
+
+def _ssh_settings(
+    ssh_host: Optional[str], ssh_user: Optional[str], ssh_port: Optional[int], ssh_key: Optional[str]
+) -> Optional[tuple[str, str, int, Optional[str]]]:
+    """(hôte, utilisateur, port, clé) du dump distant ; None = dump local (ni --ssh-host ni MYSQL_SSH_HOST)."""
+    host = ssh_host or os.environ.get("MYSQL_SSH_HOST")
+    if not host:
+        return None
+    from ntl_systoolbox.cli.module3_audit import find_ssh_key
+
+    user = ssh_user or os.environ.get("MYSQL_SSH_USER") or getpass.getuser()
+    port = ssh_port or int(os.environ.get("MYSQL_SSH_PORT", "22"))
+    key = ssh_key or os.environ.get("MYSQL_SSH_KEY") or find_ssh_key()
+    return host, user, port, key
+
+
+def _ssh_client(
+    session: Optional[SessionContext], host: str, user: str, port: int, key: Optional[str]
+) -> tuple[paramiko.SSHClient, bool]:
+    """Connexion SSH (celle de la session si possible) ; le booléen indique s'il faut la fermer."""
+    if session is not None:
+        return session.ssh(host, user, port, key_path=key), False
+    # Import tardif : la pile SSH n'est chargée que pour un dump distant
+    import paramiko
+
+    from ntl_systoolbox.core import ssh_keys
+
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        client.connect(host, port=port, username=user, timeout=10, **ssh_keys.connect_kwargs(key))
+    except Exception:
+        client.close()
+        raise
+    return client, True
+
+
 def _test_db_connection(host: str, user: str, password: str, db: str, port: int = 3306, timeout: int = 5) -> bool:
     """Test TCP connectivity to host:port and optionally verify credentials using `mysql` client.
 
@@ -113,49 +362,341 @@ def _test_db_connection(host: str, user: str, password: str, db: str, port: int
         return False
 
 
-@app.command("dump")
-def dump_sql():
-    """Dump SQL -> écrit un fichier .sql dans sauvegarde/."""
-    paths = get_paths()
-    ts = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
-    out = paths.sauvegarde_dir / f"wms_dump_{ts}.sql"
+# --------------------------
+# Pré-vol : estimation et choix de stratégie
+# --------------------------
+def _table_stats(
+    host: str, user: str, password: str, db: str, port: int = 3306,
+    client: Optional[paramiko.SSHClient] = None,
+) -> List[TableStats]:
+    """
+    Tailles et nombres de lignes estimés (information_schema), plus la clé
+    primaire entière mono-colonne de chaque table. Liste vide si illisible.
+    Avec client, la requête est lancée depuis l'hôte SSH (dump distant).
+    """
+    mysql_path = "mysql" if client is not None else _mysql_client_path()
+    if not mysql_path:
+        return []
+    schema = _quote_value(db)
+    sql = (
+        "SELECT TABLE_NAME, IFNULL(TABLE_ROWS, 0), IFNULL(DATA_LENGTH, 0), IFNULL(INDEX_LENGTH, 0)"
+        f" FROM information_schema.TABLES WHERE TABLE_SCHEMA = {schema} AND TABLE_TYPE = 'BASE TABLE';"
+        " SELECT c.TABLE_NAME, c.COLUMN_NAME FROM information_schema.COLUMNS c"
+        f" WHERE c.TABLE_SCHEMA = {schema} AND c.COLUMN_KEY = 'PRI'"
+        " AND c.DATA_TYPE IN ('tinyint', 'smallint', 'mediumint', 'int', 'bigint')"
+        " AND (SELECT COUNT(*) FROM information_schema.KEY_COLUMN_USAGE k WHERE k.TABLE_SCHEMA = c.TABLE_SCHEMA"
+        " AND k.TABLE_NAME = c.TABLE_NAME AND k.CONSTRAINT_NAME = 'PRIMARY') = 1;"
+    )
+    args = [mysql_path, "-h", host, "-P", str(port), "-u", user, "-N", "-B", "-e", sql]
+    try:
+        if client is not None:
+            args.insert(1, "--defaults-extra-file=/dev/stdin")
+            proc = _remote_run(client, " ".join(shlex.quote(a) for a in args), _mysql_defaults(password))
+        else:
+            env = os.environ.copy()
+            env["MYSQL_PWD"] = password or ""
+            proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True,
+                                  timeout=30)
+    except Exception as exc:
+        console.print(f"[yellow]Estimation impossible:[/yellow] {exc}")
+        return []
+    if proc.returncode != 0:
+        console.print(f"[yellow]Estimation impossible (information_schema):[/yellow] {proc.stderr.strip()}")
+        return []
+    lines = proc.stdout.splitlines()
+    tables = parse_table_stats("\n".join(line for line in lines if line.count("\t") >= 3))
+    pks = dict(line.split("\t", 1) for line in lines if line.count("\t") == 1)
+    for t in tables:
+        t.pk = pks.get(t.name)
+    return tables
+
 
-    # Defaults and env-based credentials
+def _list_views(host: str, user: str, password: str, db: str, port: int = 3306) -> Optional[List[str]]:
+    """Vues de la base (information_schema), ou None si la liste est illisible."""
+    mysql_path = _mysql_client_path()
+    if not mysql_path:
+        return None
+    sql = f"SELECT TABLE_NAME FROM information_schema.VIEWS WHERE TABLE_SCHEMA = {_quote_value(db)};"
+    env = os.environ.copy()
+    env["MYSQL_PWD"] = password or ""
+    args = [mysql_path, "-h", host, "-P", str(port), "-u", user, "-N", "-B", "-e", sql]
+    try:
+        proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True, timeout=30)
+    except Exception as exc:
+        console.print(f"[red]Liste des vues impossible:[/red] {exc}")
+        return None
+    if proc.returncode != 0:
+        console.print(f"[red]Liste des vues impossible:[/red] {proc.stderr.strip()}")
+        return None
+    return [line.strip() for line in proc.stdout.splitlines() if line.strip()]
+
+
+def _print_plan(plan: BackupPlan, out: Optional[Path] = None) -> None:
+    table = Table(title=f"Plan de {plan.operation}" + (" (--dry-run)" if out is None else ""), show_header=False)
+    table.add_column("", style="bold")
+    table.add_column("")
+    table.add_row("Stratégie", plan.strategy + (f" ({plan.jobs} jobs)" if plan.jobs > 1 else "")
+                  + (f" (tranches de {plan.chunk_size})" if plan.chunk_size else ""))
+    table.add_row("Compression", "gzip" if plan.compress else "non")
+    table.add_row("Volume estimé", human_bytes(plan.estimated_bytes) + f" ({len(plan.tables)} table(s))")
+    table.add_row("Taille de sortie estimée", human_bytes(plan.estimated_output_bytes))
+    table.add_row("Espace libre", human_bytes(plan.free_bytes) + ("" if plan.enough_space else " [red]INSUFFISANT[/red]"))
+    table.add_row("Durée estimée", f"{plan.estimated_duration_s} s "
+                  f"({human_bytes(plan.throughput_bps)}/s, {plan.throughput_source})")
+    if out is not None:
+        table.add_row("Sortie", str(out))
+    for reason in plan.reasons:
+        table.add_row("", f"- {reason}")
+    console.print(table)
+
+
+# --------------------------
+# Paramètres de connexion (partagés dump / export)
+# --------------------------
+def _mysql_env(db: Optional[str] = None) -> Optional[tuple[str, int, str, str]]:
     host = os.environ.get("MYSQL_HOST")
     user = os.environ.get("MYSQL_USER")
-    db = os.environ.get("MYSQL_DB")
+    db = db or os.environ.get("MYSQL_DB")
     port_str = os.environ.get("MYSQL_PORT")
-    
     if not all([host, user, db, port_str]):
+        return None
+    return host, int(port_str), user, db
+
+
+def _mysql_settings(
+    session: Optional[SessionContext], db: Optional[str] = None
+) -> Optional[tuple[str, int, str, str, str]]:
+    """(host, port, user, password, db) depuis .env (db explicite prioritaire) ; None si incomplet."""
+    env = _mysql_env(db)
+    if env is None:
         console.print("[red]Variables .env manquantes[/red]")
         console.print("MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_DB doivent être définies.")
-        return
-
-    port = int(port_str)
+        return None
+    host, port, user, db = env
 
-    # Mot de passe : demandé au runtime si absent
+    # Mot de passe : demandé au runtime si absent (une seule fois en mode interactif)
     password = os.environ.get("MYSQL_PASSWORD")
     if not password:
-        password = getpass.getpass("MySQL password: ")
+        if session is not None:
+            password = session.secret(f"mysql:{user}@{host}:{port}", "MySQL password: ")
+        else:
+            password = getpass.getpass("MySQL password: ")
         if not password:
             console.print("[red]Mot de passe manquant. Abandon.[/red]")
-            return
+            return None
+    return host, port, user, password, db
+
+
+def _db_ready(session: Optional[SessionContext], host: str, user: str, password: str, db: str, port: int) -> bool:
+    """Test de connexion ; un succès est mémorisé par la session, pas un échec."""
+    if session is None:
+        return _test_db_connection(host=host, user=user, password=password, db=db, port=port)
+    key = ("db_ready", host, port, user, db)
+    ok = session.cached(key, lambda: _test_db_connection(host=host, user=user, password=password, db=db, port=port))
+    if not ok:
+        session.invalidate(key)
+        session.forget_secret(f"mysql:{user}@{host}:{port}")
+    return ok
+
+
+def _tables(session: Optional[SessionContext], host: str, user: str, password: str, db: str, port: int) -> List[str]:
+    if session is None:
+        return _list_tables_mysql_client(host=host, user=user, password=password, db=db, port=port)
+    key = ("tables", host, port, user, db)
+    tables = session.cached(key, lambda: _list_tables_mysql_client(host=host, user=user, password=password,
+                                                                    db=db, port=port))
+    if not tables:
+        session.invalidate(key)
+    return tables
+
+
+@app.command("dump")
+def dump_sql(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Affiche le plan (taille, durée, stratégie) sans rien écrire"),
+    strategy: str = typer.Option("auto", "--strategy", help="auto (= single, un flux cohérent) ou parallel (une table par job, sans cohérence entre tables)"),
+    compress: Optional[bool] = typer.Option(None, "--compress/--no-compress", help="Forcer ou désactiver la sortie gzip (défaut: selon le volume)"),
+    ssh_host: Optional[str] = typer.Option(None, "--ssh-host", help="Dump exécuté et compressé sur cet hôte via SSH, en un seul flux gzip (sinon MYSQL_SSH_HOST)"),
+    ssh_user: Optional[str] = typer.Option(None, "--ssh-user", help="Utilisateur SSH (sinon MYSQL_SSH_USER ou utilisateur courant)"),
+    ssh_port: Optional[int] = typer.Option(None, "--ssh-port", help="Port SSH (sinon MYSQL_SSH_PORT ou 22)"),
+    ssh_key: Optional[str] = typer.Option(None, "--ssh-key", help="Clé privée SSH (sinon MYSQL_SSH_KEY ou ~/.ssh)"),
+) -> Optional[Path]:
+    """Dump SQL -> écrit un fichier .sql (ou .sql.gz) dans sauvegarde/.
+
+    Par défaut un seul flux cohérent ; la compression et l'estimation suivent
+    la taille des tables, l'espace libre et le débit des dumps précédents. Avec --ssh-host, mysqldump | gzip tourne
+    sur cet hôte (le serveur de base ou un voisin) et seul le flux compressé
+    traverse le réseau. Retourne le chemin du dump (None en --dry-run) ;
+    un échec sort avec le code 1, sans écrire de fichier.
+    """
+    out = _dump_sql(None, dry_run=dry_run, strategy=strategy, compress=compress,
+                    ssh=(ssh_host, ssh_user, ssh_port, ssh_key))
+    if out is None and not dry_run:
+        raise typer.Exit(code=1)
+    return out
+
+
+def _dump_sql(
+    session: Optional[SessionContext],
+    dry_run: bool = False,
+    strategy: str = "auto",
+    compress: Optional[bool] = None,
+    ssh: tuple = (None, None, None, None),
+) -> Optional[Path]:
+    paths = get_paths()
+    ts = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
+
+    settings = _mysql_settings(session)
+    if settings is None:
+        return
+    host, port, user, password, db = settings
+    if strategy not in ("auto", STRATEGY_SINGLE, STRATEGY_PARALLEL):
+        console.print(f"[red]Stratégie inconnue:[/red] {strategy} (auto, single, parallel)")
+        return None
+
+    remote = _ssh_settings(*ssh)
+    if remote is not None:
+        # Le dump distant est toujours un flux unique compressé à la source
+        if strategy == STRATEGY_PARALLEL or compress is False:
+            console.print("[red]Dump distant (--ssh-host) : un seul flux gzip ; "
+                          "--strategy parallel et --no-compress ne s'appliquent pas.[/red]")
+            return None
+        return _dump_sql_remote(session, paths.sauvegarde_dir, ts, host, port, user, password, db, remote,
+                                dry_run)
 
     console.print(f"Tentative de dump de {db} sur {host}:{port} en tant que {user}...")
     # test connection before attempting dump
-    ok = _test_db_connection(host=host, user=user, password=password, db=db, port=port)
+    ok = _db_ready(session, host, user, password, db, port)
     if not ok:
         console.print(f"[red]Connexion à la base impossible — arrêt du dump.[/red]")
+        _record_backup("dump", False)
         return
-    success = _perform_mysqldump(host=host, user=user, password=password, db=db, out=out, port=port)
+
+    # Pré-vol : tailles, espace libre, débit observé -> stratégie
+    table_stats = _table_stats(host, user, password, db, port)
+    plan = plan_dump(
+        table_stats,
+        free_bytes=shutil.disk_usage(paths.sauvegarde_dir).free,
+        throughput=manifest_throughput([paths.sauvegarde_dir], "dump_sql"),
+        strategy=strategy,
+        compress=compress,
+    )
+    if plan.strategy == STRATEGY_PARALLEL and len(table_stats) < 2:
+        plan.strategy, plan.jobs = STRATEGY_SINGLE, 1
+        plan.reasons.append("tables inconnues ou unique : dump en un seul flux")
+    out = paths.sauvegarde_dir / f"wms_dump_{ts}.sql{'.gz' if plan.compress else ''}"
+    _print_plan(plan, None if dry_run else out)
+    if dry_run:
+        return None
+    if not plan.enough_space:
+        console.print("[red]Espace disque insuffisant pour ce dump — arrêt.[/red]")
+        _record_backup("dump", False)
+        return None
+
+    views: List[str] = []
+    if plan.strategy == STRATEGY_PARALLEL:
+        # Les vues ne figurent pas dans table_stats (BASE TABLE) : sans leur
+        # liste, le dump parallèle serait incomplet
+        views = _list_views(host, user, password, db, port)
+        if views is None:
+            console.print("[red]Vues non listées : dump parallèle refusé (utiliser --strategy single).[/red]")
+            _record_backup("dump", False)
+            return None
+
+    started = time.monotonic()
+    stats: dict = {}
+    if plan.strategy == STRATEGY_PARALLEL:
+        success = _perform_parallel_dump(host, user, password, db, out, port, [t.name for t in table_stats],
+                                         plan.jobs, plan.compress, stats, views=views)
+    else:
+        success = _perform_mysqldump(host=host, user=user, password=password, db=db, out=out, port=port,
+                                     compress=plan.compress, stats=stats)
+    duration = time.monotonic() - started
+    _record_backup("dump", success, out, duration)
 
     if not success:
-        console.print("[yellow]Echec du dump réel — écriture d'un fichier de remplacement (placeholder).[/yellow]")
-        _write_dummy_file(out, "-- Fallback: mysqldump failed or not available\n")
+        # Pas de fichier de remplacement : un faux dump passerait pour une sauvegarde valide
+        out.unlink(missing_ok=True)
+        console.print("[red]Echec du dump — aucun fichier écrit.[/red]")
+        return None
 
-    manifest = _write_manifest(out, "dump_sql", {"host": host, "db": db, "note": "remote dump"})
+    extra = {"host": host, "db": db, "note": "remote dump", "duration_s": round(duration, 3),
+             "strategy": plan.strategy, "compress": plan.compress, "jobs": plan.jobs, "views": views,
+             "estimated_bytes": plan.estimated_bytes, "estimated_duration_s": plan.estimated_duration_s}
+    if plan.compress:
+        extra["raw_bytes"] = stats.get("raw_bytes")
+    manifest = _write_manifest(out, "dump_sql", extra)
     console.print(f"[green]OK[/green] Dump créé: {out}")
     console.print(f"Manifest: {manifest}")
+    return out
+
+
+def _dump_sql_remote(
+    session: Optional[SessionContext],
+    sauvegarde_dir: Path,
+    ts: str,
+    host: str,
+    port: int,
+    user: str,
+    password: str,
+    db: str,
+    remote: tuple[str, str, int, Optional[str]],
+    dry_run: bool,
+) -> Optional[Path]:
+    """
+    Dump distant : un seul flux mysqldump | gzip lancé sur l'hôte SSH. La
+    base est jointe depuis cet hôte (127.0.0.1 s'il s'agit du serveur de
+    base lui-même), ce qui évite aussi d'ouvrir le port MySQL au réseau.
+    """
+    ssh_host, ssh_user, ssh_port, ssh_key = remote
+    db_host = "127.0.0.1" if ssh_host == host else host
+    console.print(f"Dump distant de {db} via {ssh_user}@{ssh_host}:{ssh_port} (base {db_host}:{port})...")
+    try:
+        client, owned = _ssh_client(session, ssh_host, ssh_user, ssh_port, ssh_key)
+    except Exception as exc:
+        console.print(f"[red]Connexion SSH impossible — arrêt du dump:[/red] {exc}")
+        _record_backup("dump", False)
+        return None
+
+    try:
+        plan = plan_dump(
+            _table_stats(db_host, user, password, db, port, client=client),
+            free_bytes=shutil.disk_usage(sauvegarde_dir).free,
+            throughput=manifest_throughput([sauvegarde_dir], "dump_sql"),
+            strategy=STRATEGY_SINGLE,
+            compress=True,
+        )
+        plan.reasons = [f"dump distant sur {ssh_host} : un seul flux, compressé à la source"]
+        out = sauvegarde_dir / f"wms_dump_{ts}.sql.gz"
+        _print_plan(plan, None if dry_run else out)
+        if dry_run:
+            return None
+        if not plan.enough_space:
+            console.print("[red]Espace disque insuffisant pour ce dump — arrêt.[/red]")
+            _record_backup("dump", False)
+            return None
+
+        started = time.monotonic()
+        stats: dict = {}
+        success = _perform_remote_mysqldump(client, db_host, user, password, db, out, port, stats=stats)
+        duration = time.monotonic() - started
+    finally:
+        if owned:
+            client.close()
+    _record_backup("dump", success, out, duration)
+    if not success:
+        out.unlink(missing_ok=True)
+        return None
+
+    manifest = _write_manifest(out, "dump_sql", {
+        "host": host, "db": db, "note": "remote dump over ssh", "ssh_host": ssh_host,
+        "duration_s": round(duration, 3), "strategy": plan.strategy, "compress": True, "jobs": 1,
+        "raw_bytes": stats.get("raw_bytes"), "estimated_bytes": plan.estimated_bytes,
+        "estimated_duration_s": plan.estimated_duration_s,
+    })
+    console.print(f"[green]OK[/green] Dump créé: {out} "
+                  f"({human_bytes(out.stat().st_size)} transférés pour {human_bytes(stats.get('raw_bytes', 0))} de SQL)")
+    console.print(f"Manifest: {manifest}")
+    return out
 
 def _mysql_client_path() -> Optional[str]:
     return shutil.which("mysql")
@@ -182,10 +723,145 @@ def _list_tables_mysql_client(host: str, user: str, password: str, db: str, port
     return tables
 
 
-def _export_table_csv_mysql_client(host: str, user: str, password: str, db: str, table: str, out_csv: Path, port: int = 3306) -> bool:
+def _quote_ident(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _quote_value(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _build_select(
+    table: str,
+    columns: List[str],
+    where: Optional[str] = None,
+    since: Optional[str] = None,
+    watermark: Optional[str] = None,
+    key: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    after_since: Optional[str] = None,
+) -> str:
+    """
+    Requête d'export exécutée par le serveur : projection, filtre libre
+    (--where) et, en incrémental, lignes à partir du dernier filigrane (>=,
+    pour ne pas perdre les lignes arrivées plus tard avec la même valeur)
+    triées par la colonne de reprise. En export par tranches, key/after/limit
+    paginent sur la clé primaire (keyset, sans OFFSET) ; en incrémental, sur
+    le couple (since, key), after_since portant la valeur de reprise de la
+    dernière ligne lue (None pour NULL).
+    """
+    clauses = []
+    if where:
+        clauses.append(f"({where})")
+    if since and watermark is not None:
+        clauses.append(f"{_quote_ident(since)} >= {_quote_value(watermark)}")
+    if key and after is not None:
+        k, v = _quote_ident(key), _quote_value(after)
+        if not since:
+            clauses.append(f"{k} > {v}")
+        elif after_since is None:
+            # Les NULL sont triés en tête : reste des NULL, puis toutes les valeurs
+            clauses.append(f"({_quote_ident(since)} IS NOT NULL OR {k} > {v})")
+        else:
+            s, sv = _quote_ident(since), _quote_value(after_since)
+            clauses.append(f"({s} > {sv} OR ({s} = {sv} AND {k} > {v}))")
+    sql = f"SELECT {', '.join(_quote_ident(c) for c in columns)} FROM {_quote_ident(table)}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    order = [c for c in (since, key) if c]
+    if order:
+        sql += " ORDER BY " + ", ".join(_quote_ident(c) for c in order)
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return sql + ";"
+
+
+def _sql_outside_literals(sql: str) -> Optional[str]:
+    """
+    Texte de sql hors chaînes ('...', "...") et identifiants (`...`), chacun
+    remplacé par une espace ; None si l'un d'eux n'est pas refermé.
+    """
+    out: List[str] = []
+    quote = None
+    i = 0
+    while i < len(sql):
+        c = sql[i]
+        if quote is None:
+            if c in "'\"`":
+                quote = c
+            else:
+                out.append(c)
+        elif c == "\\" and quote != "`":
+            i += 1  # caractère échappé
+        elif c == quote:
+            if sql[i + 1:i + 2] == quote:
+                i += 1  # guillemet doublé
+            else:
+                quote = None
+                out.append(" ")
+        i += 1
+    return None if quote else "".join(out)
+
+
+def _row_digest(row: List[str]) -> str:
+    return hashlib.sha1("\t".join(row).encode("utf-8")).hexdigest()
+
+
+def _last_watermark(export_dir: Path, db: str, table: str, since: str) -> Optional[tuple[str, List[str]]]:
+    """
+    Filigrane du dernier export incrémental (db, table, colonne), lu dans les
+    manifests, avec les empreintes des lignes déjà exportées à cette valeur.
+    """
+    best: tuple[tuple[str, int], tuple[str, List[str]]] | None = None
+    for manifest in export_dir.glob(f"{db}_{table}_*.manifest.json"):
+        try:
+            data = json.loads(manifest.read_text(encoding="utf-8"))
+            mtime = manifest.stat().st_mtime_ns
+        except (OSError, ValueError):
+            continue
+        extra = data.get("extra") or {}
+        if extra.get("db") != db or extra.get("table") != table or extra.get("since") != since:
+            continue
+        if extra.get("watermark") is None:
+            continue
+        # created_at est à la seconde : la date de modification départage
+        order = (data.get("created_at", ""), mtime)
+        if best is None or order > best[0]:
+            best = (order, (extra["watermark"], list(extra.get("watermark_rows") or [])))
+    return best[1] if best else None
+
+
+def _export_table_csv_mysql_client(
+    host: str,
+    user: str,
+    password: str,
+    db: str,
+    table: str,
+    out_csv: Path,
+    port: int = 3306,
+    columns: Optional[List[str]] = None,
+    where: Optional[str] = None,
+    since: Optional[str] = None,
+    watermark: Optional[str] = None,
+    seen: Optional[List[str]] = None,
+    stats: Optional[dict] = None,
+    chunk_size: Optional[int] = None,
+    key: Optional[str] = None,
+    compress: bool = False,
+) -> bool:
     """
     Exporte une table au format CSV via le client `mysql` en produisant une sortie tabulée,
     puis conversion en CSV (delimiter=';').
+    Le filtrage (columns, where, since >= watermark) est fait par le serveur :
+    seules les lignes et colonnes utiles transitent. Les lignes au filigrane
+    dont l'empreinte figure dans seen (déjà exportées) sont écartées.
+    stats (facultatif) reçoit le nombre de lignes, le nouveau filigrane et
+    les empreintes des lignes exportées à cette valeur.
+    chunk_size + key : requêtes successives de chunk_size lignes paginées sur
+    la clé primaire (sur since puis la clé en incrémental), pour ne jamais
+    charger toute une grosse table en mémoire.
+    compress : CSV écrit en gzip.
     Note: fonctionne bien pour des cas simples; si tu as des champs avec tabs/newlines,
     la solution "pymysql streaming" est plus robuste.
     """
@@ -206,69 +882,128 @@ def _export_table_csv_mysql_client(host: str, user: str, password: str, db: str,
     if cols_proc.returncode != 0:
         console.print(f"[red]Erreur SHOW COLUMNS:[/red] {cols_proc.stderr.strip()}")
         return False
-    columns = [line.split("\t", 1)[0] for line in cols_proc.stdout.splitlines() if line.strip()]
-    if not columns:
+    table_columns = [line.split("\t", 1)[0] for line in cols_proc.stdout.splitlines() if line.strip()]
+    if not table_columns:
         console.print("[red]Impossible de récupérer les colonnes (table vide ou inexistante).[/red]")
         return False
 
-    # Récupère les données en mode batch: colonnes séparées par tab
-    data_cmd = f"SELECT * FROM `{table}`;"
-    data_args = [mysql_path, "-h", host, "-P", str(port), "-u", user, "-D", db, "-N", "-B", "-e", data_cmd]
-    data_proc = subprocess.run(data_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True)
-    if data_proc.returncode != 0:
-        console.print(f"[red]Erreur SELECT:[/red] {data_proc.stderr.strip()}")
+    # Projection : colonnes demandées (validées), sinon toutes
+    columns = columns or table_columns
+    if not chunk_size:
+        key = None
+    unknown = [c for c in columns + [c for c in (since, key) if c] if c not in table_columns]
+    if unknown:
+        console.print(f"[red]Colonnes inconnues dans {table}:[/red] {', '.join(unknown)}")
+        return False
+    # Colonnes de reprise / de pagination lues même hors projection
+    selected = list(columns)
+    for extra in (since, key):
+        if extra and extra not in selected:
+            selected.append(extra)
+    # ';' et marqueurs de commentaire refusés hors chaînes ("ref = 'A#1'" reste permis)
+    bare = _sql_outside_literals(where) if where else ""
+    if bare is None or any(token in bare for token in (";", "--", "#", "/*")):
+        console.print("[red]--where : une seule condition SQL, sans ';' ni commentaire (--, #, /*).[/red]")
         return False
 
-    # Écriture CSV (séparateur ;)
-    with out_csv.open("w", newline="", encoding="utf-8") as f:
+    # Écriture CSV (séparateur ;), une requête par tranche
+    rows = 0
+    last = watermark
+    # Empreintes des lignes exportées à la valeur du filigrane courant
+    boundary = set(seen or ())
+    after = after_since = None
+    since_index = selected.index(since) if since else None
+    key_index = selected.index(key) if key else None
+    opener = gzip.open(out_csv, "wt", newline="", encoding="utf-8") if compress else \
+        out_csv.open("w", newline="", encoding="utf-8")
+    with opener as f:
         writer = csv.writer(f, delimiter=";")
         writer.writerow(columns)
-        for line in data_proc.stdout.splitlines():
-            # chaque ligne = valeurs séparées par tab
-            row = line.split("\t")
-            writer.writerow(row)
+        while True:
+            # Récupère les données en mode batch: colonnes séparées par tab
+            data_cmd = _build_select(table, selected, where, since, watermark, key, after,
+                                     chunk_size if key else None, after_since)
+            data_args = [mysql_path, "-h", host, "-P", str(port), "-u", user, "-D", db, "-N", "-B", "-q", "-e", data_cmd]
+            data_proc = subprocess.run(data_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True)
+            if data_proc.returncode != 0:
+                console.print(f"[red]Erreur SELECT:[/red] {data_proc.stderr.strip()}")
+                return False
+
+            chunk_rows = 0
+            for line in data_proc.stdout.splitlines():
+                # chaque ligne = valeurs séparées par tab
+                row = line.split("\t")
+                if since_index is not None and row[since_index] != "NULL":
+                    # Lignes triées par la colonne de reprise : la dernière porte le filigrane
+                    digest = _row_digest(row)
+                    if row[since_index] == watermark and digest in boundary:
+                        continue  # déjà exportée au passage précédent
+                    if row[since_index] != last:
+                        last, boundary = row[since_index], set()
+                    boundary.add(digest)
+                if key_index is not None:
+                    after = row[key_index]
+                    if since_index is not None:
+                        after_since = None if row[since_index] == "NULL" else row[since_index]
+                writer.writerow(row[:len(columns)])
+                chunk_rows += 1
+            rows += chunk_rows
+            if key is None or chunk_rows < chunk_size:
+                break
 
+    BACKUP_ROWS.inc(rows, table=f"{db}.{table}")
+    if stats is not None:
+        stats.update(rows=rows, watermark=last, watermark_rows=sorted(boundary))
     return True
 
 @app.command("export-csv")
 def export_csv(
     table: Optional[str] = typer.Option(None, "--table", "-t", help="Nom de la table à exporter (si omis: mode interactif)"),
     db: Optional[str] = typer.Option(None, "--db", help="Nom de la base (sinon MYSQL_DB ou saisie)"),
+    columns: Optional[str] = typer.Option(None, "--columns", "-c", help="Colonnes à exporter, ex: id,client,total"),
+    where: Optional[str] = typer.Option(None, "--where", "-w", help="Condition SQL brute, insérée telle quelle (source de confiance uniquement ; ';' et commentaires refusés), ex: \"statut = 'livree'\""),
+    since: Optional[str] = typer.Option(None, "--since", help="Export incrémental : lignes dont cette colonne atteint ou dépasse le dernier filigrane, sans les lignes déjà exportées"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Affiche le plan (taille, durée, découpage) sans rien écrire"),
+    compress: Optional[bool] = typer.Option(None, "--compress/--no-compress", help="Forcer ou désactiver la sortie gzip (défaut: selon le volume)"),
 ):
-    """Export d'une table au format CSV -> écrit dans export/."""
+    """Export d'une table au format CSV -> écrit dans export/.
+
+    Le filtrage (--columns, --where, --since) est exécuté par le serveur ;
+    les grosses tables sont lues par tranches sur leur clé primaire.
+    Retourne le chemin du CSV, ou None en cas d'échec (ou en --dry-run).
+    """
+    column_list = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    return _export_csv(table, db, None, columns=column_list, where=where, since=since,
+                       dry_run=dry_run, compress=compress)
+
+
+def _export_csv(
+    table: Optional[str],
+    db: Optional[str],
+    session: Optional[SessionContext],
+    columns: Optional[List[str]] = None,
+    where: Optional[str] = None,
+    since: Optional[str] = None,
+    dry_run: bool = False,
+    compress: Optional[bool] = None,
+) -> Optional[Path]:
     paths = get_paths()
     export_dir = paths.repo_root / "export"
     export_dir.mkdir(parents=True, exist_ok=True)
 
-    # Defaults and env-based credentials
-    host = os.environ.get("MYSQL_HOST")
-    user = os.environ.get("MYSQL_USER")
-    db = os.environ.get("MYSQL_DB")
-    port_str = os.environ.get("MYSQL_PORT")
-    
-    if not all([host, user, db, port_str]):
-        console.print("[red]Variables .env manquantes[/red]")
-        console.print("MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_DB doivent être définies.")
+    settings = _mysql_settings(session, db)
+    if settings is None:
         return
-
-    port = int(port_str)
-
-    # Mot de passe : demandé au runtime si absent
-    password = os.environ.get("MYSQL_PASSWORD")
-    if not password:
-        password = getpass.getpass("MySQL password: ")
-        if not password:
-            console.print("[red]Mot de passe manquant. Abandon.[/red]")
-            return
+    host, port, user, password, db = settings
 
     console.print(f"Connexion à {db} sur {host}:{port} ...")
-    ok = _test_db_connection(host=host, user=user, password=password, db=db, port=port)
+    ok = _db_ready(session, host, user, password, db, port)
     if not ok:
         console.print("[red]Connexion à la base impossible — arrêt de l'export.[/red]")
         return
 
-    # Liste des tables
-    tables = _list_tables_mysql_client(host=host, user=user, password=password, db=db, port=port)
+    # Liste des tables (mémorisée par la session interactive)
+    tables = _tables(session, host, user, password, db, port)
     if not tables:
         console.print("[red]Aucune table trouvée (ou impossible de les lister).[/red]")
         return
@@ -292,10 +1027,37 @@ def export_csv(
         console.print(f"[red]Table inconnue:[/red] {table}")
         return
 
+    # Pré-vol : taille de la table, espace libre, débit observé -> stratégie
+    stats_by_name = {t.name: t for t in _table_stats(host, user, password, db, port)}
+    plan = plan_export(
+        stats_by_name.get(table) or TableStats(table),
+        free_bytes=shutil.disk_usage(export_dir).free,
+        throughput=manifest_throughput([export_dir], "export_csv"),
+        incremental=bool(since),
+        compress=compress,
+    )
+    if columns or where or since:
+        plan.reasons.append("filtres actifs : estimation haute (table entière)")
+
     # Export CSV dans export/
     ts = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
-    out = export_dir / f"{db}_{table}_{ts}.csv"
+    out = export_dir / f"{db}_{table}_{ts}.csv{'.gz' if plan.compress else ''}"
+    _print_plan(plan, None if dry_run else out)
+    if dry_run:
+        return None
+    if not plan.enough_space:
+        console.print("[red]Espace disque insuffisant pour cet export — arrêt.[/red]")
+        _record_backup("export", False)
+        return None
 
+    previous, seen = (_last_watermark(export_dir, db, table, since) if since else None) or (None, [])
+    if since:
+        console.print(f"Export incrémental sur {since} : "
+                      + (f"lignes >= {previous} non encore exportées" if previous is not None
+                         else "premier export (complet)"))
+
+    started = time.monotonic()
+    stats: dict = {}
     success = _export_table_csv_mysql_client(
         host=host,
         user=user,
@@ -304,21 +1066,65 @@ def export_csv(
         table=table,
         out_csv=out,
         port=port,
+        columns=columns,
+        where=where,
+        since=since,
+        watermark=previous,
+        seen=seen,
+        stats=stats,
+        chunk_size=plan.chunk_size,
+        key=plan.tables[0].pk if plan.strategy == STRATEGY_CHUNKED else None,
+        compress=plan.compress,
     )
+    duration = time.monotonic() - started
+    _record_backup("export", success, out, duration)
     if not success:
         console.print("[red]Export CSV échoué.[/red]")
         return
 
-    manifest = _write_manifest(out, "export_csv", {"host": host, "db": db, "table": table, "note": "mysql client"})
+    extra = {"host": host, "db": db, "table": table, "note": "mysql client", "duration_s": round(duration, 3),
+             "rows": stats.get("rows"), "columns": columns, "where": where,
+             "strategy": plan.strategy, "chunk_size": plan.chunk_size, "compress": plan.compress,
+             "estimated_bytes": plan.estimated_bytes}
+    if since:
+        extra.update(since=since, previous_watermark=previous, watermark=stats.get("watermark"),
+                     watermark_rows=stats.get("watermark_rows"))
+    manifest = _write_manifest(out, "export_csv", extra)
     console.print(f"[green]OK[/green] CSV créé: {out}")
     console.print(f"Manifest: {manifest}")
+    return out
 
 
 
 # --- Fonctions appelées par le menu interactif ---
 
-def interactive_dump_sql() -> None:
-    dump_sql()
+def warm_session(session: SessionContext) -> None:
+    """
+    À l'ouverture du menu 2 : test de connexion et liste des tables en
+    arrière-plan, si le mot de passe est déjà connu (jamais demandé ici).
+    """
+    env = _mysql_env()
+    if env is None:
+        return
+    host, port, user, db = env
+    password = os.environ.get("MYSQL_PASSWORD") or session.known_secret(f"mysql:{user}@{host}:{port}")
+    if not password:
+        return
+
+    def warm() -> None:
+        if _db_ready(session, host, user, password, db, port):
+            _tables(session, host, user, password, db, port)
 
-def interactive_export_csv() -> None:
-    export_csv(table=None, db=None)
+    session.submit(warm)
+
+def interactive_dump_sql(session: Optional[SessionContext] = None) -> None:
+    if session is None:
+        _dump_sql(None)
+        return
+    session.results["dump"] = _dump_sql(session)
+
+def interactive_export_csv(session: Optional[SessionContext] = None) -> None:
+    if session is None:
+        _export_csv(None, None, None)
+        return
+    session.results["export"] = _export_csv(None, None, session)
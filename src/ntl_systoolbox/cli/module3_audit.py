@@ -6,9 +6,26 @@ import typer
 from rich.console import Console
 import ipaddress
 import socket
-import json
+import select
+import hashlib
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing.managers import SyncManager
 
+from ntl_systoolbox.core.audit_cache import AuditCache, DEFAULT_TTL
+from ntl_systoolbox.core.audit_report import aggregate_file, write_report
+from ntl_systoolbox.core.concurrency import (
+    AdaptiveLimiter,
+    OUTCOME_OK,
+    OUTCOME_REFUSED,
+    OUTCOME_TIMEOUT,
+    OUTCOME_UNREACHABLE,
+)
+from ntl_systoolbox.core.eol import install_dataset, load_eol_index, windows_product
+from ntl_systoolbox.core.inventory import InventoryWriter, record_audit
+from ntl_systoolbox.core.metrics import AUDIT_CONNECT, AUDIT_DURATION, AUDIT_HOSTS, LAST_SUCCESS
+from ntl_systoolbox.core.paths import get_paths
+from ntl_systoolbox.core import ssh_keys
 
 app = typer.Typer()
 
@@ -25,42 +42,214 @@ def find_ssh_key() -> str | None:
     if not ssh_dir.exists():
         return None
 
-    # Cherche des clés privées classiques
-    for key_name in ["id_ed25519", "id_rsa", "id_ecdsa", "id_dsa"]:
+    # Cherche des clés privées classiques (DSA n'est plus pris en charge par paramiko)
+    for key_name in ["id_ed25519", "id_rsa", "id_ecdsa"]:
         key_path = ssh_dir / key_name
         if key_path.exists():
             return str(key_path)
     return None
 
+# --------------------------
+# Connexion SSH (partagée par l'audit et run_command_ssh)
+# --------------------------
+class HandshakeError(Exception):
+    """Connexion TCP établie mais poignée de main SSH en échec (serveur saturé, MaxStartups...)."""
+
+    def __init__(self, message: str, timed_out: bool = False):
+        super().__init__(message)
+        self.timed_out = timed_out
+
+
+def open_ssh(
+    host: str, username: str, key_path: str | None, port: int = 22, timeout: float = 10.0
+) -> tuple[paramiko.SSHClient, float]:
+    """
+    Ouvre une connexion SSH authentifiée ; renvoie (client, durée de connexion
+    en secondes). Un échec après l'ouverture TCP, hors authentification, est
+    levé en HandshakeError (timed_out si la poignée de main a dépassé timeout).
+    """
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    started = time.monotonic()
+    try:
+        # Clé chargée une fois par processus (cache) + ssh-agent si disponible
+        client.connect(hostname=host, port=port, username=username, timeout=timeout,
+                       banner_timeout=timeout, auth_timeout=timeout, **ssh_keys.connect_kwargs(key_path))
+    except paramiko.AuthenticationException:
+        client.close()
+        raise
+    except Exception as e:
+        reached = client.get_transport() is not None
+        client.close()
+        if not reached:
+            raise  # hôte absent / port fermé
+        msg = str(e) or type(e).__name__
+        # paramiko enveloppe le timeout de lecture de la bannière dans une SSHException,
+        # et abandonne sans exception propre quand son propre délai expire
+        timed_out = (isinstance(e, socket.timeout) or isinstance(e.__context__, socket.timeout)
+                     or time.monotonic() - started >= timeout)
+        raise HandshakeError(msg, timed_out=timed_out) from e
+    return client, time.monotonic() - started
+
+
+def connect_outcome(error: BaseException) -> str:
+    """Issue d'une connexion ratée, pour le limiteur adaptatif."""
+    if isinstance(error, HandshakeError):
+        return OUTCOME_TIMEOUT if error.timed_out else OUTCOME_REFUSED
+    if isinstance(error, paramiko.AuthenticationException):
+        return OUTCOME_OK  # le serveur a répondu : identifiants refusés, pas de saturation
+    return OUTCOME_UNREACHABLE
+
 # --------------------------
 # run_command_ssh
 # --------------------------
 @app.command("run-ssh")
-def run_command_ssh(host: str, username: str, key_path: str, commands: list[str]) -> dict:
+def run_command_ssh(
+    host: str,
+    username: str,
+    key_path: str,
+    commands: list[str],
+    command_timeout: float = 15.0,
+    host_timeout: float = 30.0,
+    port: int = 22,
+) -> dict:
+    """
+    Exécute les commandes en parallèle sur une seule connexion SSH (un canal
+    par commande). Chaque commande est bornée par command_timeout et l'ensemble
+    par host_timeout : une commande bloquée est abandonnée et les sorties déjà
+    reçues sont renvoyées (timed_out=True), avec les durées en millisecondes.
+    """
     result = {"host": host, "success": False, "outputs": {}}
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    start = time.monotonic()
+    ssh = None
+    try:
+        ssh, connect_s = open_ssh(host, username, key_path, port)
+        result["connect_ms"] = round(connect_s * 1000, 1)
+        _collect_outputs(ssh.get_transport(), commands, command_timeout, start + host_timeout, result)
+    except Exception as e:
+        result["error"] = str(e)
+        result["outcome"] = connect_outcome(e)
+    finally:
+        if ssh is not None:
+            ssh.close()
+        result["elapsed_ms"] = round((time.monotonic() - start) * 1000, 1)
+    return result
+
+
+def run_commands_on(
+    client: paramiko.SSHClient,
+    host: str,
+    commands: list[str],
+    command_timeout: float = 15.0,
+    host_timeout: float = 30.0,
+) -> dict:
+    """
+    Comme run_command_ssh, mais sur une connexion déjà ouverte (ex: celle de
+    la session interactive), qui n'est pas fermée à la fin.
+    """
+    result = {"host": host, "success": False, "outputs": {}, "connect_ms": 0.0}
+    start = time.monotonic()
     try:
-        ssh.connect(hostname=host, username=username, key_filename=key_path, timeout=10)
-        for cmd in commands:
-            stdin, stdout, stderr = ssh.exec_command(cmd)
-            out = stdout.read().decode().strip()
-            err = stderr.read().decode().strip()
-            result["outputs"][cmd] = {"stdout": out, "stderr": err}
-        result["success"] = True
+        _collect_outputs(client.get_transport(), commands, command_timeout, start + host_timeout, result)
     except Exception as e:
         result["error"] = str(e)
     finally:
-        ssh.close()
+        result["elapsed_ms"] = round((time.monotonic() - start) * 1000, 1)
     return result
 
+
+def _drain_channel(chan, state: dict) -> None:
+    """Lit tout ce qui est déjà reçu sur le canal (sortie standard et erreur)."""
+    while chan.recv_ready():
+        state["out"].append(chan.recv(32768))
+    while chan.recv_stderr_ready():
+        state["err"].append(chan.recv_stderr(32768))
+
+
+def _wait_channels(running: dict, command_timeout: float, host_deadline: float) -> None:
+    """
+    Attend qu'un canal reçoive des données, au plus tard jusqu'à la prochaine
+    échéance. Un canal en fin de flux (EOF) est toujours prêt pour select :
+    il n'attend plus que son code retour, attendu sur son événement.
+    """
+    deadline = min(min(s["started"] + command_timeout for s in running.values()), host_deadline)
+    timeout = max(0.0, deadline - time.monotonic())
+    streaming = [s["chan"] for s in running.values() if not s["chan"].eof_received]
+    if len(streaming) == len(running):
+        select.select(streaming, [], [], timeout)
+    elif streaming:
+        # Codes retour en attente : réveil rapide pour les relever
+        select.select(streaming, [], [], min(timeout, 0.05))
+    else:
+        next(iter(running.values()))["chan"].status_event.wait(timeout)
+
+
+def _collect_outputs(transport, commands: list[str], command_timeout: float, host_deadline: float, result: dict) -> None:
+    """Exécute les commandes (un canal chacune) et range leurs sorties dans result."""
+    # Ouverture de tous les canaux d'un coup
+    running = {}
+    for cmd in commands:
+        try:
+            chan = transport.open_session(timeout=command_timeout)
+            chan.exec_command(cmd)
+        except Exception as e:
+            result["outputs"][cmd] = {"stdout": "", "stderr": "", "error": str(e),
+                                      "exit_status": None, "timed_out": False, "duration_ms": 0.0}
+            continue
+        running[cmd] = {"chan": chan, "started": time.monotonic(), "out": [], "err": []}
+
+    # Collecte concurrente des sorties jusqu'à fin ou échéance
+    while running:
+        for cmd, state in list(running.items()):
+            chan = state["chan"]
+            _drain_channel(chan, state)
+            finished = chan.exit_status_ready() and (chan.eof_received or chan.closed)
+            now = time.monotonic()
+            expired = now >= min(state["started"] + command_timeout, host_deadline)
+            if not finished and not expired:
+                continue
+            # Données arrivées entre la lecture et le test de fin
+            _drain_channel(chan, state)
+
+            result["outputs"][cmd] = {
+                "stdout": b"".join(state["out"]).decode(errors="replace").strip(),
+                "stderr": b"".join(state["err"]).decode(errors="replace").strip(),
+                "exit_status": chan.recv_exit_status() if finished else None,
+                "timed_out": not finished,
+                "duration_ms": round((now - state["started"]) * 1000, 1),
+            }
+            chan.close()
+            del running[cmd]
+        if running:
+            _wait_channels(running, command_timeout, host_deadline)
+
+    # Sorties dans l'ordre des commandes demandées
+    result["outputs"] = {cmd: result["outputs"][cmd] for cmd in commands if cmd in result["outputs"]}
+    result["success"] = True
+    result["timed_out"] = any(o["timed_out"] for o in result["outputs"].values())
+
+# --------------------------
+# Empreinte SSH (cache d'audit)
+# --------------------------
+def transport_fingerprint(transport: paramiko.Transport) -> str:
+    """
+    Empreinte d'un hôte : clé d'hôte SSH + bannière du serveur, lues sur le
+    transport de la connexion d'audit (aucune poignée de main supplémentaire).
+    """
+    key = transport.get_remote_server_key()
+    digest = hashlib.sha256(key.asbytes()).hexdigest()
+    return f"{key.get_name()}:{digest}:{transport.remote_version}"
+
 # --------------------------
 # get_system_audit_ssh
 # --------------------------
 @app.command("audit-system-ssh")
-def get_system_audit_ssh(host: str, username: str, ssh_key: str | None = None) -> dict:
+def get_system_audit_ssh(
+    host: str, username: str, ssh_key: str | None = None, inventory: bool = True, port: int = 22
+) -> dict:
     """
     Récupère les informations système d'un host distant via SSH.
+    Le résultat est enregistré dans l'inventaire SQLite (sauf --no-inventory).
     """
     # Détecte la clé si elle n'est pas fournie
     if ssh_key is None:
@@ -68,15 +257,44 @@ def get_system_audit_ssh(host: str, username: str, ssh_key: str | None = None) -
         if ssh_key is None:
             return {"error": "Aucune clé SSH trouvée"}
 
+    system_info = _system_info(lambda commands: run_command_ssh(host, username, ssh_key, commands, port=port))
+    return _finish_system_audit(host, system_info, inventory)
+
+
+def audit_system_on(client: paramiko.SSHClient, host: str, inventory: bool = True) -> dict:
+    """get_system_audit_ssh sur une connexion déjà ouverte (session interactive)."""
+    system_info = _system_info(lambda commands: run_commands_on(client, host, commands))
+    return _finish_system_audit(host, system_info, inventory)
+
+
+WIN_PRODUCT_TYPE_CMD = 'reg query "HKLM\\SYSTEM\\CurrentControlSet\\Control\\ProductOptions" /v ProductType'
+WIN_PRODUCT_NAME_CMD = 'reg query "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion" /v ProductName'
+
+
+def _reg_value(output: str, name: str) -> str:
+    """Valeur d'une sortie `reg query ... /v <name>` ("    ProductName    REG_SZ    Windows ...")."""
+    for line in output.splitlines():
+        parts = line.split(None, 2)
+        if len(parts) == 3 and parts[0] == name and parts[1].startswith("REG_"):
+            return parts[2].strip()
+    return ""
+
+
+def _system_info(run) -> dict:
+    """Détection Linux puis Windows ; run(commandes) renvoie un résultat de run_command_ssh."""
     commands_linux = ["cat /etc/os-release", "uname -a", "hostname"]
-    commands_windows = ["ver", "hostname"]
+    commands_windows = ["ver", "hostname", WIN_PRODUCT_TYPE_CMD, WIN_PRODUCT_NAME_CMD]
 
     # Tentative Linux
-    ssh_result = run_command_ssh(host, username, ssh_key, commands_linux)
+    ssh_result = run(commands_linux)
     system_info = {}
 
+    os_release_output = ""
     if ssh_result.get("success"):
         os_release_output = ssh_result["outputs"].get("cat /etc/os-release", {}).get("stdout", "")
+
+    # Un hôte Windows (OpenSSH) accepte la connexion mais n'a pas /etc/os-release
+    if ssh_result.get("success") and "ID=" in os_release_output:
         os_data = {}
         for line in os_release_output.splitlines():
             if "=" in line:
@@ -92,36 +310,276 @@ def get_system_audit_ssh(host: str, username: str, ssh_key: str | None = None) -
         }
     else:
         # Tentative Windows
-        ssh_result_win = run_command_ssh(host, username, ssh_key, commands_windows)
+        ssh_result_win = run(commands_windows)
         if ssh_result_win.get("success"):
+            outputs = ssh_result_win["outputs"]
+            # Le build est commun aux postes et aux serveurs : le type de produit les distingue
+            caption = _reg_value(outputs.get(WIN_PRODUCT_NAME_CMD, {}).get("stdout", ""), "ProductName")
+            product_type = _reg_value(outputs.get(WIN_PRODUCT_TYPE_CMD, {}).get("stdout", ""), "ProductType")
             system_info = {
-                "hostname": ssh_result_win["outputs"].get("hostname", {}).get("stdout", ""),
+                "hostname": outputs.get("hostname", {}).get("stdout", ""),
                 "os_family": "windows",
-                "version": ssh_result_win["outputs"].get("ver", {}).get("stdout", "")
+                "distribution": windows_product(product_type, caption),
+                "distribution_name": caption or None,
+                "version": outputs.get("ver", {}).get("stdout", "")
             }
         else:
-            system_info = {"error": ssh_result.get("error")}
+            system_info = {"error": ssh_result.get("error") or ssh_result_win.get("error")}
+    return system_info
+
+
+def _finish_system_audit(host: str, system_info: dict, inventory: bool) -> dict:
+    # Enrichissement fin de support (jeu de données local, aucune requête réseau)
+    if "error" not in system_info:
+        system_info.update(load_eol_index().evaluate(system_info))
+
+    if inventory:
+        _safe_inventory(record_audit, [dict(system_info, host_ip=host)], source="audit-system-ssh")
 
     return system_info
 
 
+def _safe_inventory(fn, *args, **kwargs) -> None:
+    # L'inventaire ne doit jamais faire échouer un audit
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        typer.echo(f"[yellow]Inventaire non mis à jour:[/yellow] {e}")
+
+
+@app.command("eol-update")
+def update_eol_dataset(source: Path) -> None:
+    """
+    Installe un nouveau jeu de données EOL (JSON) dans config/eol.json
+    après validation. Il remplace le jeu embarqué pour les audits suivants.
+    """
+    try:
+        index = install_dataset(source)
+    except (OSError, ValueError) as e:
+        typer.echo(f"[red]Jeu de données EOL refusé:[/red] {e}")
+        raise typer.Exit(code=1)
+    typer.echo(f"[green]OK[/green] {len(index)} cycles EOL installés (version {index.dataset_version or 'n/a'})")
+
+
+def _audit_cache_path() -> Path:
+    return get_paths().cache_dir / "audit_cache.json"
+
+
+def _silent(*args, **kwargs) -> None:
+    """Remplace typer.echo en mode quiet."""
+
+
+def _audit_host(
+    host: str,
+    username: str,
+    ssh_key: str,
+    cache: AuditCache | None,
+    limiter: AdaptiveLimiter | None,
+    port: int = 22,
+    quiet: bool = False,
+) -> dict:
+    """
+    Audite un hôte (connexion + cache + audit complet). Le cache n'est lu
+    qu'ici : l'empreinte vient de la connexion d'audit, et un hôte inchangé
+    est rendu sans exécuter de commande. Le limiteur est informé par cette
+    même connexion (durée, timeout ou refus de poignée de main).
+    """
+    echo = _silent if quiet else typer.echo
+    if limiter is not None:
+        limiter.acquire(host)
+    outcome, latency = OUTCOME_UNREACHABLE, None
+    try:
+        echo(f"[blue]Tentative de connexion à {host}...[/blue]")
+        try:
+            client, latency = open_ssh(host, username, ssh_key, port)
+        except Exception as e:
+            outcome = connect_outcome(e)
+            raise
+        outcome = OUTCOME_OK
+        try:
+            fingerprint = transport_fingerprint(client.get_transport())
+            cached = cache.get(host, fingerprint) if cache is not None else None
+            # Entrée Windows antérieure à la détection poste / serveur : ré-audit
+            if cached is not None and cached.get("os_family") == "windows" and "distribution" not in cached:
+                cached = None
+            if cached is not None:
+                cached.update(load_eol_index().evaluate(cached))
+                cached["cached"] = True
+                cached["connect_ms"] = round(latency * 1000, 1)
+                echo(f"[green][CACHE][/green] {host} -> inchangé, résultat réutilisé")
+                return cached
+            # Une seule connexion pour les détections Linux puis Windows ;
+            # enregistrement groupé dans l'inventaire par le processus parent
+            info = audit_system_on(client, host, inventory=False)
+        finally:
+            client.close()
+        info["host_ip"] = host
+        info["connect_ms"] = round(latency * 1000, 1)
+        info["ssh_fingerprint"] = fingerprint
+        if "error" in info:
+            echo(f"[red][ERROR][/red] {host} -> {info['error']}")
+        else:
+            echo(f"[green][OK][/green] {host} -> Connexion réussie")
+        return info
+    except Exception as e:
+        echo(f"[red][TIMEOUT/ERROR][/red] {host} -> {str(e)}")
+        return {"host_ip": host, "error": str(e)}
+    finally:
+        if limiter is not None:
+            limiter.release(host, outcome, latency)
+
+
+def _audit_hosts(
+    hosts: list[str],
+    username: str,
+    ssh_key: str,
+    max_workers: int,
+    cache: AuditCache | None,
+    limiter: AdaptiveLimiter | None,
+    port: int = 22,
+    quiet: bool = False,
+):
+    """Boucle d'audit multithread : renvoie les résultats au fil de l'eau."""
+    if limiter is not None:
+        hosts = limiter.register(hosts)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_audit_host, host, username, ssh_key, cache, limiter, port, quiet)
+                   for host in hosts]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _audit_shard(
+    hosts: list[str],
+    queue,
+    username: str,
+    ssh_key: str,
+    max_workers: int,
+    limiter,
+    cache_ttl: int,
+    use_cache: bool,
+    port: int = 22,
+    quiet: bool = False,
+) -> None:
+    """
+    Point d'entrée d'un processus de shard : sa propre boucle d'audit
+    multithread, résultats poussés dans la file partagée. Le limiteur (proxy
+    du gestionnaire) est commun à tous les shards. Le cache n'est lu ici
+    qu'en lecture, le processus parent est seul à l'écrire.
+    """
+    cache = AuditCache(_audit_cache_path(), ttl=cache_ttl) if use_cache else None
+    for result in _audit_hosts(hosts, username, ssh_key, max_workers, cache, limiter, port, quiet):
+        queue.put(result)
+
+
+class _ShardManager(SyncManager):
+    """Gestionnaire des shards : file de résultats et limiteur adaptatif partagés."""
+
+
+_ShardManager.register("AdaptiveLimiter", AdaptiveLimiter)
+
+
+def _audit_sharded(
+    hosts: list[str], processes: int, summaries: list, limits: tuple[int, int] | None, **shard_kwargs
+):
+    """
+    Répartit les hôtes sur un pool de processus (un shard par processus) et
+    fusionne leurs résultats, au fil de l'eau, dans un seul flux. En mode
+    adaptatif (limits = (min, max)), un seul limiteur, hébergé par le
+    gestionnaire, borne la concurrence de l'ensemble des shards : la limite,
+    l'équité par /24 et le recul sont globaux.
+    """
+    import multiprocessing
+    import queue as queue_mod
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Répartition entrelacée : chaque shard reçoit une part de chaque /24
+    shards = [shard for shard in (hosts[i::processes] for i in range(processes)) if shard]
+    seen = set()
+    # Les shards n'ont pas accès au terminal : phrase de passe demandée ici, une fois
+    passphrase = ssh_keys.resolve_passphrase(shard_kwargs.get("ssh_key"))
+    ctx = multiprocessing.get_context("spawn")
+    with _ShardManager(ctx=ctx) as manager, ProcessPoolExecutor(
+        max_workers=len(shards), mp_context=ctx,
+        initializer=ssh_keys.set_passphrase, initargs=(passphrase,),
+    ) as pool:
+        results_queue = manager.Queue()
+        limiter = manager.AdaptiveLimiter(min_limit=limits[0], max_limit=limits[1]) if limits else None
+        futures = [pool.submit(_audit_shard, shard, results_queue, limiter=limiter, **shard_kwargs)
+                   for shard in shards]
+        while True:
+            try:
+                result = results_queue.get(timeout=0.2)
+            except queue_mod.Empty:
+                if all(f.done() for f in futures):
+                    break
+                continue
+            seen.add(result.get("host_ip"))
+            yield result
+
+        for shard, future in zip(shards, futures):
+            try:
+                future.result()
+            except Exception as e:
+                # Shard interrompu : ses hôtes non traités sont signalés en erreur
+                typer.echo(f"[red][SHARD][/red] processus interrompu -> {e}")
+                for host in shard:
+                    if host not in seen:
+                        yield {"host_ip": host, "error": f"shard interrompu: {e}"}
+        if limiter is not None:
+            # Bilan unique, lu avant l'arrêt du gestionnaire qui héberge le limiteur
+            summaries.append(limiter.summary())
+
+
+def _record_audit_result(result: dict) -> None:
+    # Fait côté processus parent : couvre aussi le mode multi-processus
+    if "error" in result:
+        outcome = "timeout" if "timed out" in str(result["error"]).lower() else "error"
+    else:
+        outcome = "cached" if result.get("cached") else "ok"
+    AUDIT_HOSTS.inc(outcome=outcome)
+    if result.get("connect_ms") is not None:
+        AUDIT_CONNECT.observe(result["connect_ms"] / 1000)
+
+
 @app.command("audit-network-ssh-mt")
 def audit_network_ssh_mt(
     hosts: list[str] | None = None, 
     username: str = None, 
     ssh_key: str | None = None,
     subnet: str | None = None,
-    max_workers: int = 25  # nombre de threads
-) -> None:
+    max_workers: int = 25,  # nombre de threads (par processus)
+    cache_ttl: int = DEFAULT_TTL,  # secondes
+    no_cache: bool = False,
+    output: str | None = None,  # fichier NDJSON (un résultat par ligne)
+    adaptive: bool = True,
+    min_workers: int = 2,
+    processes: int = 1,  # 0 = un processus par cœur
+    inventory: bool = True,
+    port: int = 22,
+    quiet: bool = False,  # ni progression ni JSON final (appel programmatique)
+) -> list[dict]:
     """
     Audite un réseau via SSH en multithread.
     - hosts : liste d'IP
     - subnet : plage réseau, ex: 192.168.1.0/24
     - Si aucun host ni subnet fourni, scan du /24 autour de l'IP locale
     - Ignore rapidement les machines qui ne répondent pas
+    - Réutilise le résultat en cache d'un hôte audité il y a moins de
+      cache_ttl secondes si sa clé d'hôte et sa bannière SSH n'ont pas changé
+    - En mode adaptatif, max_workers est un plafond : la concurrence réelle
+      s'ajuste (AIMD) entre min_workers et max_workers selon la latence de
+      connexion, les timeouts et les refus de poignée de main
+    - processes > 1 : les hôtes sont répartis sur plusieurs processus (la
+      cryptographie SSH de paramiko est liée au GIL), chacun avec sa propre
+      boucle multithread ; les résultats sont fusionnés dans un seul flux.
+      En mode adaptatif, le plafond max_workers et le limiteur sont communs
+      à tous les processus
+    - quiet : aucune sortie par hôte ni JSON des résultats (ex: tâche du
+      runner, qui tourne en parallèle d'autres tâches) ; seuls les résultats
+      renvoyés comptent
     """
     import ipaddress, socket, json
-    from concurrent.futures import ThreadPoolExecutor, as_completed
 
     if not username:
         username = typer.prompt("[yellow]Nom d'utilisateur SSH non fourni. Merci de saisir le login :[/yellow]")
@@ -144,38 +602,180 @@ def audit_network_ssh_mt(
             network_prefix = ".".join(local_ip.split(".")[:3])
             hosts = [f"{network_prefix}.{i}" for i in range(1, 255)]
 
-    typer.echo(f"[green]Début du scan de {len(hosts)} hôtes...[/green]")
+    if processes <= 0:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(hosts)) or 1
+
+    echo = _silent if quiet else typer.echo
+    echo(f"[green]Début du scan de {len(hosts)} hôtes ({processes} processus)...[/green]")
 
-    # Fonction interne pour thread
-    def audit_host(host: str) -> dict:
+    cache = None if no_cache else AuditCache(_audit_cache_path(), ttl=cache_ttl)
+    summaries: list = []
+    limiter = None
+    limits = (min(min_workers, max_workers), max_workers) if adaptive else None
+    if processes > 1:
+        stream = _audit_sharded(
+            hosts, processes, summaries, limits,
+            username=username, ssh_key=ssh_key, max_workers=max_workers,
+            cache_ttl=cache_ttl, use_cache=cache is not None, port=port, quiet=quiet,
+        )
+    else:
+        limiter = AdaptiveLimiter(min_limit=limits[0], max_limit=limits[1]) if limits else None
+        stream = _audit_hosts(hosts, username, ssh_key, max_workers, cache, limiter, port, quiet)
+
+    results = []
+    started = time.monotonic()
+    out_file = open(output, "w", encoding="utf-8") if output else None
+    writer = None
+    if inventory:
         try:
-            typer.echo(f"[blue]Tentative de connexion à {host}...[/blue]")
-            info = get_system_audit_ssh(host, username, ssh_key)
-            info["host_ip"] = host
-            if "error" in info:
-                typer.echo(f"[red][ERROR][/red] {host} -> {info['error']}")
-            else:
-                typer.echo(f"[green][OK][/green] {host} -> Connexion réussie")
-            return info
+            writer = InventoryWriter("audit", source=subnet or ",".join(hosts[:5]))
         except Exception as e:
-            typer.echo(f"[red][TIMEOUT/ERROR][/red] {host} -> {str(e)}")
-            return {"host_ip": host, "error": str(e)}
+            typer.echo(f"[yellow]Inventaire indisponible:[/yellow] {e}")
+    try:
+        for result in stream:
+            results.append(result)
+            _record_audit_result(result)
+            if writer is not None:
+                writer.add_audit(result)
+            if cache is not None and result.get("ssh_fingerprint") and not result.get("cached"):
+                cache.put(result["host_ip"], result["ssh_fingerprint"], result)
+            if out_file is not None:
+                out_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if out_file is not None:
+            out_file.close()
+        if writer is not None:
+            _safe_inventory(writer.close)
 
-    # Multithreading
-    results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_host = {executor.submit(audit_host, host): host for host in hosts}
-        for future in as_completed(future_to_host):
-            results.append(future.result())
+    AUDIT_DURATION.observe(time.monotonic() - started)
+    # Comme pour les sauvegardes : un audit où tout a échoué n'est pas un succès
+    if any("error" not in result for result in results):
+        LAST_SUCCESS.set(time.time(), operation="audit")
+    if cache is not None:
+        cache.save()
+    if limiter is not None:
+        summaries.append(limiter.summary())
+    for summary in summaries:
+        echo(f"[green]Concurrence adaptative:[/green] {json.dumps(summary)}")
 
-    typer.echo("[green]Audit terminé[/green]")
-    typer.echo(json.dumps(results, indent=2))
+    echo("[green]Audit terminé[/green]")
+    echo(json.dumps(results, indent=2))
+    return results
+
+@app.command("report")
+def audit_report(
+    input_file: Path,
+    formats: str = "html,md,csv",
+    out_dir: Path | None = None,
+    top: int = 20,
+    max_unreachable: int = 1000,
+    max_versions: int = 200,
+) -> list[Path]:
+    """
+    Génère un rapport agrégé (HTML/Markdown/CSV) depuis un résultat d'audit
+    (fichier --output NDJSON, tableau JSON ou sortie standard redirigée de
+    audit-network-ssh-mt), lu en une seule passe et en mémoire constante.
+    """
+    if not input_file.exists():
+        typer.echo(f"[red]Fichier introuvable:[/red] {input_file}")
+        raise typer.Exit(code=1)
+
+    fmt_list = [f.strip().lower() for f in formats.split(",") if f.strip()]
+    out_dir = out_dir or get_paths().repo_root / "rapport"
+    try:
+        agg = aggregate_file(input_file, top=top, max_unreachable=max_unreachable, max_versions=max_versions)
+        written = write_report(agg, out_dir, f"audit_{input_file.stem}", fmt_list, source=str(input_file))
+    except ValueError as e:
+        typer.echo(f"[red]Rapport impossible:[/red] {e}")
+        raise typer.Exit(code=1)
+
+    typer.echo(f"[green]Rapport généré[/green] ({agg.total} hôtes, {agg.unreachable_count} injoignables)")
+    for path in written:
+        typer.echo(f" - {path}")
+    return written
 
 # --- Fonctions appelées par le menu interactif ---
 
-def interactive_audit_system() -> None:
-    audit_data = get_system_audit_ssh("172.16.135.61", "user")
+DEFAULT_AUDIT_HOST = "172.16.135.61"
+DEFAULT_AUDIT_USER = "user"
+DEFAULT_SUBNET = "172.16.135.0/24"
+
+
+def _subnet_hosts(subnet: str) -> list[str]:
+    return [str(ip) for ip in ipaddress.ip_network(subnet, strict=False).hosts()]
+
+
+def warm_session(session) -> None:
+    """
+    À l'ouverture du menu 3 : balayage de vivacité du sous-réseau et connexion
+    à l'hôte habituel, en arrière-plan (les erreurs resurgiront à l'usage).
+    Une clé protégée par phrase de passe n'est pas préchauffée : la saisie
+    se fera au premier plan, lors de l'audit.
+    """
+    session.sweep(_subnet_hosts(DEFAULT_SUBNET))
+    ssh_key = find_ssh_key()
+    if ssh_key:
+        session.warm_ssh(DEFAULT_AUDIT_HOST, DEFAULT_AUDIT_USER, key_path=ssh_key)
+
+
+def interactive_audit_system(session=None) -> None:
+    if session is None:
+        audit_data = get_system_audit_ssh(DEFAULT_AUDIT_HOST, DEFAULT_AUDIT_USER)
+    else:
+        audit_data = _audit_system_session(session, DEFAULT_AUDIT_HOST, DEFAULT_AUDIT_USER)
+        session.results["audit_system"] = audit_data
     print(json.dumps(audit_data, indent=2))
 
-def interactive_audit_reseau() -> None:
-    audit_network_ssh_mt(subnet="172.16.135.0/24")
\ No newline at end of file
+
+def _audit_system_session(session, host: str, username: str) -> dict:
+    ssh_key = find_ssh_key()
+    if ssh_key is None:
+        return {"error": "Aucune clé SSH trouvée"}
+    try:
+        client = session.ssh(host, username, key_path=ssh_key)
+    except Exception as e:
+        return _finish_system_audit(host, {"error": str(e)}, inventory=True)
+    audit_data = audit_system_on(client, host)
+    if "error" in audit_data:
+        session.drop_ssh(host, username)
+    return audit_data
+
+
+def interactive_audit_reseau(session=None) -> None:
+    if session is None:
+        audit_network_ssh_mt(subnet=DEFAULT_SUBNET)
+        return
+
+    hosts = _subnet_hosts(DEFAULT_SUBNET)
+    # Balayage terminé : seuls les hôtes qui répondent sur le port 22 sont audités
+    live = session.live_hosts(hosts)
+    if live is not None:
+        print(f"{len(live)}/{len(hosts)} hôtes joignables d'après le balayage en arrière-plan")
+        if not live:
+            return
+        hosts = live
+    username = session.results.get("audit_username") or typer.prompt("Nom d'utilisateur SSH")
+    session.results["audit_username"] = username
+    output = get_paths().cache_dir / "last_audit.ndjson"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    session.results["audit_reseau"] = audit_network_ssh_mt(
+        hosts=hosts, username=username, subnet=DEFAULT_SUBNET, output=str(output)
+    )
+    session.results["audit_file"] = str(output)
+
+
+def interactive_audit_report(session=None) -> None:
+    default = session.results.get("audit_file") if session is not None else None
+    prompt = f"Fichier de résultats d'audit (NDJSON/JSON) [{default}] : " if default else \
+        "Fichier de résultats d'audit (NDJSON/JSON) : "
+    path = input(prompt).strip() or default
+    if not path:
+        print("Aucun fichier fourni.")
+        return
+    try:
+        written = audit_report(Path(path))
+    except typer.Exit:
+        return
+    if session is not None:
+        session.results["audit_report"] = written
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import typer
+
+from ntl_systoolbox.core.jobs import STATUS_SUCCESS, TaskResult, parse_plan, run_plan
+from ntl_systoolbox.core.paths import load_env
+
+app = typer.Typer()
+
+
+# --------------------------
+# Adaptateurs : type de tâche -> appel des modules
+# Chaque adaptateur reçoit les params de la tâche et lève une exception en cas
+# d'échec (ce qui déclenche les nouvelles tentatives).
+# --------------------------
+def _secret(params: dict, key: str) -> str:
+    """Les secrets ne sont jamais écrits dans le plan : on y référence une variable d'env."""
+    env_name = params.get(f"{key}_env")
+    if not env_name:
+        raise ValueError(f"Paramètre '{key}_env' requis")
+    value = os.environ.get(env_name)
+    if not value:
+        raise ValueError(f"Variable d'environnement {env_name} absente")
+    return value
+
+
+def _require_mysql_password() -> None:
+    """Pas de saisie interactive depuis un thread du pool : le mot de passe doit être fourni."""
+    load_env()
+    if not os.environ.get("MYSQL_PASSWORD"):
+        raise ValueError("Variable d'environnement MYSQL_PASSWORD absente")
+
+
+def _task_diag(params: dict) -> dict:
+    from ntl_systoolbox.cli.module1_diag import check_remote_ssh
+
+    report = check_remote_ssh(
+        params["host"], params["user"], _secret(params, "password"), int(params.get("port", 22))
+    )
+    if "error" in report:
+        raise RuntimeError(report["error"])
+    return report
+
+
+def _task_dump(params: dict) -> str:
+    from ntl_systoolbox.cli.module2_backup import _dump_sql
+
+    _require_mysql_password()
+    ssh_port = params.get("ssh_port")
+    out = _dump_sql(None, strategy=params.get("strategy", "auto"), compress=params.get("compress"),
+                    ssh=(params.get("ssh_host"), params.get("ssh_user"), int(ssh_port) if ssh_port else None,
+                         params.get("ssh_key")))
+    if out is None:
+        raise RuntimeError("dump SQL en échec")
+    return str(out)
+
+
+def _task_export(params: dict) -> str:
+    from ntl_systoolbox.cli.module2_backup import _export_csv
+
+    _require_mysql_password()
+    columns = params.get("columns")
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",") if c.strip()]
+    out = _export_csv(params["table"], params.get("db"), None, columns=columns or None,
+                      where=params.get("where"), since=params.get("since"), compress=params.get("compress"))
+    if out is None:
+        raise RuntimeError(f"export CSV de {params['table']} en échec")
+    return str(out)
+
+
+def _task_audit(params: dict) -> dict:
+    from ntl_systoolbox.cli.module3_audit import audit_network_ssh_mt
+
+    if not params.get("username"):
+        raise ValueError("Paramètre 'username' requis")
+    results = audit_network_ssh_mt(
+        hosts=params.get("hosts"),
+        username=params["username"],
+        ssh_key=params.get("ssh_key"),
+        subnet=params.get("subnet"),
+        max_workers=int(params.get("max_workers", 25)),
+        output=params.get("output"),
+        processes=int(params.get("processes", 1)),
+        port=int(params.get("port", 22)),
+        quiet=True,  # pas de sortie par hôte depuis un thread du pool
+    )
+    reachable = sum(1 for r in results if "error" not in r)
+    typer.echo(f"Audit: {len(results)} hôtes, {reachable} joignables")
+    return {
+        "hosts": len(results),
+        "reachable": reachable,
+        "results": results,
+    }
+
+
+def _task_audit_system(params: dict) -> dict:
+    from ntl_systoolbox.cli.module3_audit import get_system_audit_ssh
+
+    info = get_system_audit_ssh(
+        params["host"], params["username"], params.get("ssh_key"), port=int(params.get("port", 22))
+    )
+    if "error" in info:
+        raise RuntimeError(info["error"])
+    return info
+
+
+TASK_HANDLERS = {
+    "diag": _task_diag,
+    "backup.dump": _task_dump,
+    "backup.export": _task_export,
+    "audit": _task_audit,
+    "audit.system": _task_audit_system,
+}
+
+# Types de tâches qui se connectent à MySQL (mot de passe requis avant lancement)
+MYSQL_TASK_TYPES = {"backup.dump", "backup.export"}
+
+
+def load_plan_file(path: Path) -> dict:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML est requis pour les plans YAML (pip install pyyaml), ou utiliser un plan .json")
+        try:
+            return yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ValueError(f"YAML invalide: {e}") from e
+    return json.loads(text)
+
+
+def _task_to_dict(res: TaskResult) -> dict[str, Any]:
+    return {
+        "id": res.id,
+        "type": res.type,
+        "status": res.status,
+        "attempts": res.attempts,
+        "started_at": res.started_at,
+        "duration_s": res.duration_s,
+        "error": res.error,
+        "result": res.result,
+    }
+
+
+@app.command("run")
+def run(
+    plan_file: Path = typer.Argument(..., help="Plan YAML/JSON décrivant les tâches"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Fichier JSON du résultat consolidé"),
+    max_parallel: Optional[int] = typer.Option(None, "--max-parallel", help="Surcharge max_parallel du plan"),
+) -> dict:
+    """
+    Exécute un plan de tâches (diag, backup.dump, backup.export, audit,
+    audit.system) avec dépendances, ressources limitées et nouvelles tentatives.
+    """
+    load_env()
+    try:
+        plan = parse_plan(load_plan_file(plan_file), known_types=set(TASK_HANDLERS))
+    except (OSError, ValueError, TypeError) as e:
+        # TypeError : valeur d'un type inattendu (ex: "retries: [1]")
+        typer.echo(f"[red]Plan invalide:[/red] {e}")
+        raise typer.Exit(code=2)
+    mysql_tasks = [t.id for t in plan.tasks if t.type in MYSQL_TASK_TYPES]
+    if mysql_tasks and not os.environ.get("MYSQL_PASSWORD"):
+        typer.echo(f"[red]MYSQL_PASSWORD doit être défini pour les tâches:[/red] {', '.join(mysql_tasks)}")
+        raise typer.Exit(code=2)
+    if max_parallel:
+        plan.max_parallel = max_parallel
+
+    def on_done(res: TaskResult) -> None:
+        typer.echo(f"[{res.status.upper()}] {res.id} ({res.type}) en {res.duration_s}s"
+                   + (f" -> {res.error}" if res.error else ""))
+
+    typer.echo(f"Plan {plan_file}: {len(plan.tasks)} tâches, {plan.max_parallel} en parallèle max")
+    started = time.monotonic()
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    results = run_plan(plan, TASK_HANDLERS, on_done=on_done)
+
+    summary = {
+        "plan": str(plan_file),
+        "started_at": started_at,
+        "duration_s": round(time.monotonic() - started, 3),
+        "success": all(r.status == STATUS_SUCCESS for r in results),
+        "tasks": [_task_to_dict(r) for r in results],
+    }
+    payload = json.dumps(summary, indent=2, ensure_ascii=False, default=str)
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(payload, encoding="utf-8")
+        typer.echo(f"Résultat consolidé: {output}")
+    else:
+        typer.echo(payload)
+
+    if not summary["success"]:
+        raise typer.Exit(code=1)
+    return summary
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+# Durée de validité par défaut d'un résultat d'audit (24h)
+DEFAULT_TTL = 24 * 3600
+
+
+class AuditCache:
+    """
+    Cache des résultats d'audit, indexé par IP.
+    Une entrée n'est réutilisée que si elle a moins de `ttl` secondes et si
+    l'empreinte SSH (clé d'hôte + bannière) n'a pas changé depuis.
+    """
+
+    def __init__(self, path: Path, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._dirty = False
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if isinstance(data, dict):
+                    self._entries = data
+            except (OSError, ValueError):
+                # Cache illisible : on repart de zéro, il sera réécrit
+                self._entries = {}
+
+    def get(self, host: str, fingerprint: str, now: float | None = None) -> Optional[dict]:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(host)
+        if not entry:
+            return None
+        if entry.get("fingerprint") != fingerprint:
+            return None
+        if now - entry.get("audited_at", 0) > self.ttl:
+            return None
+        return dict(entry["result"])
+
+    def put(self, host: str, fingerprint: str, result: dict, now: float | None = None) -> None:
+        # On ne met jamais en cache un échec : l'hôte sera retenté au prochain passage
+        if "error" in result:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[host] = {
+                "fingerprint": fingerprint,
+                "audited_at": now,
+                "result": dict(result),
+            }
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._entries, ensure_ascii=False)
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(self.path)
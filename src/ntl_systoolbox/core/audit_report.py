@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import csv
+import heapq
+import html
+import json
+import re
+from collections import Counter
+from datetime import date
+from itertools import count
+from pathlib import Path
+from typing import Iterator, TextIO
+
+from ntl_systoolbox.core.eol import STATUS_EOL, STATUS_EOL_SOON, load_eol_index
+
+_CHUNK_SIZE = 1 << 16
+
+# Au-delà de ce nombre de versions distinctes, les suivantes sont regroupées
+OTHER_VERSIONS = "autres versions"
+# "Microsoft Windows [Version 10.0.17763.5458]" -> 10.0.17763 (sans la révision)
+_WINDOWS_VERSION_RE = re.compile(r"\d+\.\d+\.\d+")
+
+
+# --------------------------
+# Lecture en flux (NDJSON, tableau JSON ou sortie standard de l'audit)
+# --------------------------
+def _iter_json_array(f: TextIO, buf: str) -> Iterator[dict]:
+    """Décode les éléments d'un tableau JSON au fil de l'eau, sans tout charger."""
+    decoder = json.JSONDecoder()
+    pos = buf.index("[") + 1
+    eof = False
+    while True:
+        # Sauter séparateurs et blancs
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(_CHUNK_SIZE), 0
+            eof = not buf
+        if pos >= len(buf) or buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(_CHUNK_SIZE)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        pos = end
+        if isinstance(obj, dict):
+            yield obj
+
+
+def _is_array_start(text: str) -> bool:
+    """Début de tableau JSON ("[{", "[]" ou "[" seul), pas une balise comme "[blue]"."""
+    stripped = text.lstrip()
+    return stripped.startswith("[") and stripped[1:].lstrip()[:1] in ("{", "]", "")
+
+
+def iter_audit_records(path: Path) -> Iterator[dict]:
+    """
+    Itère sur les résultats d'audit en une seule passe et en mémoire
+    constante. Formats acceptés : NDJSON (fichier --output, un objet par
+    ligne), tableau JSON, ou sortie standard d'audit-network-ssh-mt (lignes
+    de progression puis tableau JSON indenté) : les lignes qui ne sont pas
+    du JSON sont ignorées.
+    """
+    with path.open("r", encoding="utf-8") as f:
+        head = f.read(_CHUNK_SIZE)
+        if _is_array_start(head):
+            yield from _iter_json_array(f, head)
+            return
+
+        pending = head
+        while True:
+            *lines, pending = pending.split("\n")
+            for i, line in enumerate(lines):
+                if _is_array_start(line):
+                    # Tableau JSON (indenté) après les lignes de progression
+                    yield from _iter_json_array(f, "\n".join(lines[i:] + [pending]))
+                    return
+                line = line.strip()
+                if line.startswith("{"):
+                    yield json.loads(line)
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            pending += chunk
+        if _is_array_start(pending):
+            yield from _iter_json_array(f, pending)
+            return
+        pending = pending.strip()
+        if pending.startswith("{"):
+            yield json.loads(pending)
+
+
+# --------------------------
+# Agrégation
+# --------------------------
+class AuditAggregator:
+    """
+    Agrège des résultats d'audit en mémoire bornée : compteurs par OS,
+    version (max_versions entrées au plus, les suivantes regroupées sous
+    OTHER_VERSIONS) et statut EOL, liste (tronquée) des hôtes injoignables
+    et top N des hôtes les plus en retard sur leur fin de support.
+    """
+
+    def __init__(
+        self, top: int = 20, max_unreachable: int = 1000, today: date | None = None, max_versions: int = 200
+    ):
+        self.top = top
+        self.today = today
+        self.max_unreachable = max_unreachable
+        self.max_versions = max_versions
+        self.total = 0
+        self.unreachable_count = 0
+        self.unreachable: list[tuple[str, str]] = []
+        self.by_os: Counter = Counter()
+        self.by_version: Counter = Counter()
+        self.by_status: Counter = Counter()
+        self._offenders: list[tuple[int, int, dict]] = []
+        self._seq = count()
+        self._eol = load_eol_index()
+
+    def add(self, record: dict) -> None:
+        self.total += 1
+        host = record.get("host_ip") or record.get("hostname") or "?"
+
+        if "error" in record:
+            self.unreachable_count += 1
+            if len(self.unreachable) < self.max_unreachable:
+                self.unreachable.append((host, str(record.get("error"))))
+            return
+
+        # Fichiers produits avant l'enrichissement EOL : on le calcule ici
+        if "eol_status" not in record:
+            record.update(self._eol.evaluate(record, self.today))
+
+        os_family = record.get("os_family") or "inconnu"
+        version = record.get("eol_product") or self._version_key(record, os_family)
+        self.by_os[os_family] += 1
+        if version not in self.by_version and len(self.by_version) >= self.max_versions:
+            self.by_version[OTHER_VERSIONS] += 1
+        else:
+            self.by_version[version] += 1
+        self.by_status[record["eol_status"]] += 1
+
+        days = record.get("days_remaining")
+        if record["eol_status"] in (STATUS_EOL, STATUS_EOL_SOON) and days is not None and self.top > 0:
+            item = (-days, next(self._seq), {
+                "host": host,
+                "hostname": record.get("hostname", ""),
+                "version": version,
+                "eol_date": record.get("eol_date"),
+                "days_remaining": days,
+            })
+            heapq.heappush(self._offenders, item)
+            if len(self._offenders) > self.top:
+                heapq.heappop(self._offenders)
+
+    @staticmethod
+    def _version_key(record: dict, os_family: str) -> str:
+        """Version sans produit EOL connu ; pour Windows, build sans la révision mensuelle."""
+        version = str(record.get("version") or "")
+        if os_family == "windows":
+            m = _WINDOWS_VERSION_RE.search(version)
+            version = m.group(0) if m else version
+        return " ".join(p for p in (str(record.get("distribution") or os_family), version) if p)
+
+    @property
+    def offenders(self) -> list[dict]:
+        return [item[2] for item in sorted(self._offenders, key=lambda i: (-i[0], i[1]))]
+
+    def summary(self) -> dict:
+        return {
+            "total": self.total,
+            "reachable": self.total - self.unreachable_count,
+            "unreachable": self.unreachable_count,
+            "by_os": dict(self.by_os.most_common()),
+            "by_version": dict(self.by_version.most_common()),
+            "by_eol_status": dict(self.by_status.most_common()),
+            "top_offenders": self.offenders,
+            "unreachable_hosts": [{"host": h, "error": e} for h, e in self.unreachable],
+        }
+
+
+def aggregate_file(
+    path: Path, top: int = 20, max_unreachable: int = 1000, today: date | None = None, max_versions: int = 200
+) -> AuditAggregator:
+    agg = AuditAggregator(top=top, max_unreachable=max_unreachable, today=today, max_versions=max_versions)
+    for record in iter_audit_records(path):
+        agg.add(record)
+    return agg
+
+
+# --------------------------
+# Rendus
+# --------------------------
+def _truncated_note(agg: AuditAggregator) -> str:
+    hidden = agg.unreachable_count - len(agg.unreachable)
+    return f"... {hidden} autres hôtes injoignables non listés" if hidden > 0 else ""
+
+
+def render_markdown(agg: AuditAggregator, source: str = "") -> str:
+    s = agg.summary()
+    lines = [
+        "# Rapport d'audit d'obsolescence",
+        "",
+        f"Source : `{source}`" if source else "",
+        "",
+        f"- Hôtes audités : **{s['total']}**",
+        f"- Joignables : **{s['reachable']}**",
+        f"- Injoignables : **{s['unreachable']}**",
+        "",
+    ]
+    for title, key in (("Par OS", "by_os"), ("Par version", "by_version"), ("Par statut EOL", "by_eol_status")):
+        lines += [f"## {title}", "", "| Valeur | Hôtes |", "|---|---:|"]
+        lines += [f"| {k} | {v} |" for k, v in s[key].items()]
+        lines.append("")
+    lines += ["## Hôtes les plus en retard", "", "| Hôte | Nom | Version | Fin de support | Jours restants |",
+              "|---|---|---|---|---:|"]
+    lines += [f"| {o['host']} | {o['hostname']} | {o['version']} | {o['eol_date']} | {o['days_remaining']} |"
+              for o in s["top_offenders"]]
+    lines += ["", "## Hôtes injoignables", ""]
+    lines += [f"- {u['host']} : {u['error']}" for u in s["unreachable_hosts"]]
+    note = _truncated_note(agg)
+    if note:
+        lines.append(f"- {note}")
+    return "\n".join(lines) + "\n"
+
+
+def render_html(agg: AuditAggregator, source: str = "") -> str:
+    s = agg.summary()
+    e = html.escape
+
+    def table(headers: list[str], rows: list[list]) -> str:
+        head = "".join(f"<th>{e(h)}</th>" for h in headers)
+        body = "".join("<tr>" + "".join(f"<td>{e(str(c))}</td>" for c in row) + "</tr>" for row in rows)
+        return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+    parts = [
+        "<!DOCTYPE html><html lang=\"fr\"><head><meta charset=\"utf-8\">",
+        "<title>Rapport d'audit d'obsolescence</title>",
+        "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1.5em}"
+        "td,th{border:1px solid #ccc;padding:4px 8px;text-align:left}</style></head><body>",
+        "<h1>Rapport d'audit d'obsolescence</h1>",
+        f"<p>Source : <code>{e(source)}</code></p>" if source else "",
+        f"<p>Hôtes audités : <b>{s['total']}</b> — joignables : <b>{s['reachable']}</b>"
+        f" — injoignables : <b>{s['unreachable']}</b></p>",
+    ]
+    for title, key in (("Par OS", "by_os"), ("Par version", "by_version"), ("Par statut EOL", "by_eol_status")):
+        parts.append(f"<h2>{title}</h2>")
+        parts.append(table(["Valeur", "Hôtes"], [[k, v] for k, v in s[key].items()]))
+    parts.append("<h2>Hôtes les plus en retard</h2>")
+    parts.append(table(
+        ["Hôte", "Nom", "Version", "Fin de support", "Jours restants"],
+        [[o["host"], o["hostname"], o["version"], o["eol_date"], o["days_remaining"]] for o in s["top_offenders"]],
+    ))
+    parts.append("<h2>Hôtes injoignables</h2>")
+    parts.append(table(["Hôte", "Erreur"], [[u["host"], u["error"]] for u in s["unreachable_hosts"]]))
+    note = _truncated_note(agg)
+    if note:
+        parts.append(f"<p>{e(note)}</p>")
+    parts.append("</body></html>")
+    return "\n".join(p for p in parts if p) + "\n"
+
+
+def write_csv(agg: AuditAggregator, out: Path) -> None:
+    s = agg.summary()
+    with out.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["section", "cle", "valeur"])
+        writer.writerow(["total", "hotes", s["total"]])
+        writer.writerow(["total", "joignables", s["reachable"]])
+        writer.writerow(["total", "injoignables", s["unreachable"]])
+        for section in ("by_os", "by_version", "by_eol_status"):
+            for k, v in s[section].items():
+                writer.writerow([section, k, v])
+        for o in s["top_offenders"]:
+            writer.writerow(["top_offender", o["host"], o["days_remaining"]])
+        for u in s["unreachable_hosts"]:
+            writer.writerow(["unreachable", u["host"], u["error"]])
+
+
+def write_report(agg: AuditAggregator, out_dir: Path, stem: str, formats: list[str], source: str = "") -> list[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for fmt in formats:
+        if fmt == "md":
+            path = out_dir / f"{stem}.md"
+            path.write_text(render_markdown(agg, source), encoding="utf-8")
+        elif fmt == "html":
+            path = out_dir / f"{stem}.html"
+            path.write_text(render_html(agg, source), encoding="utf-8")
+        elif fmt == "csv":
+            path = out_dir / f"{stem}.csv"
+            write_csv(agg, path)
+        else:
+            raise ValueError(f"Format de rapport inconnu: {fmt}")
+        written.append(path)
+    return written
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import statistics
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Seuils de décision (octets / lignes)
+COMPRESS_BYTES = 1 << 30           # au-delà de 1 Go : sortie compressée (gzip)
+PARALLEL_BYTES = 2 << 30           # au-delà de 2 Go : --strategy parallel suggéré si plusieurs grosses tables
+BIG_TABLE_BYTES = 256 << 20        # "grosse" table pour le parallélisme
+CHUNK_ROWS = 500_000               # export découpé au-delà de ce nombre de lignes
+CHUNK_SIZE = 200_000               # lignes par tranche d'export
+MAX_JOBS = 4
+
+GZIP_RATIO = 0.25                  # taille compressée / taille brute (texte SQL/CSV, estimation)
+SPACE_MARGIN = 0.9                 # part de l'espace libre utilisable
+DEFAULT_THROUGHPUT = 20 << 20      # octets/s sans historique de manifest
+
+STRATEGY_SINGLE = "single"
+STRATEGY_PARALLEL = "parallel"
+STRATEGY_CHUNKED = "chunked"
+
+
+@dataclass
+class TableStats:
+    name: str
+    rows: int = 0                  # estimation InnoDB (information_schema.TABLES.TABLE_ROWS)
+    data_bytes: int = 0
+    index_bytes: int = 0
+    pk: str | None = None          # clé primaire entière mono-colonne, pour le découpage
+
+
+@dataclass
+class BackupPlan:
+    operation: str                 # dump / export
+    strategy: str = STRATEGY_SINGLE
+    compress: bool = False
+    jobs: int = 1
+    chunk_size: int | None = None
+    estimated_bytes: int = 0       # volume brut à transférer
+    estimated_output_bytes: int = 0
+    estimated_duration_s: float | None = None
+    throughput_bps: float = DEFAULT_THROUGHPUT
+    throughput_source: str = "défaut"
+    free_bytes: int = 0
+    enough_space: bool = True
+    tables: list[TableStats] = field(default_factory=list)
+    reasons: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "operation": self.operation,
+            "strategy": self.strategy,
+            "compress": self.compress,
+            "jobs": self.jobs,
+            "chunk_size": self.chunk_size,
+            "estimated_bytes": self.estimated_bytes,
+            "estimated_output_bytes": self.estimated_output_bytes,
+            "estimated_duration_s": self.estimated_duration_s,
+            "throughput_bps": round(self.throughput_bps),
+            "throughput_source": self.throughput_source,
+            "free_bytes": self.free_bytes,
+            "enough_space": self.enough_space,
+            "reasons": self.reasons,
+        }
+
+
+def human_bytes(n: float) -> str:
+    for unit in ("o", "Ko", "Mo", "Go", "To"):
+        if abs(n) < 1024 or unit == "To":
+            return f"{n:.0f} {unit}" if unit == "o" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} To"
+
+
+def parse_table_stats(tsv: str) -> list[TableStats]:
+    """Sortie `mysql -N -B` de TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH."""
+    tables = []
+    for line in tsv.splitlines():
+        parts = line.split("\t")
+        if len(parts) < 4 or not parts[0]:
+            continue
+        as_int = [int(p) if p.isdigit() else 0 for p in parts[1:4]]
+        tables.append(TableStats(parts[0], *as_int))
+    return tables
+
+
+def manifest_throughput(dirs: list[Path], kind: str, last: int = 10) -> float | None:
+    """
+    Débit médian (octets bruts/s) des dernières opérations `kind`, d'après
+    les manifests (size_bytes ou raw_bytes si compressé, et duration_s).
+    """
+    samples = []
+    for directory in dirs:
+        if not directory.exists():
+            continue
+        for manifest in directory.glob("*.manifest.json"):
+            try:
+                data = json.loads(manifest.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            extra = data.get("extra") or {}
+            duration = extra.get("duration_s")
+            size = extra.get("raw_bytes") or data.get("size_bytes")
+            if data.get("kind") != kind or not duration or not size:
+                continue
+            samples.append((data.get("created_at", ""), size / duration))
+    if not samples:
+        return None
+    samples.sort()
+    return statistics.median(rate for _, rate in samples[-last:])
+
+
+def _finish(plan: BackupPlan, throughput: float | None, free_bytes: int) -> BackupPlan:
+    if throughput:
+        plan.throughput_bps, plan.throughput_source = throughput, "historique des manifests"
+    plan.free_bytes = free_bytes
+    speedup = max(1.0, plan.jobs * 0.75) if plan.strategy == STRATEGY_PARALLEL else 1.0
+    plan.estimated_duration_s = round(plan.estimated_bytes / plan.throughput_bps / speedup, 1)
+    plan.estimated_output_bytes = int(plan.estimated_bytes * (GZIP_RATIO if plan.compress else 1.0))
+    plan.enough_space = plan.estimated_output_bytes <= free_bytes * SPACE_MARGIN
+    if not plan.enough_space:
+        plan.reasons.append(
+            f"espace insuffisant : {human_bytes(plan.estimated_output_bytes)} estimés pour "
+            f"{human_bytes(free_bytes)} libres"
+        )
+    return plan
+
+
+def _want_compress(plan: BackupPlan, free_bytes: int, force: bool | None) -> None:
+    if force is not None:
+        plan.compress = force
+        plan.reasons.append("compression " + ("imposée" if force else "désactivée") + " par option")
+    elif plan.estimated_bytes > COMPRESS_BYTES:
+        plan.compress = True
+        plan.reasons.append(f"volume > {human_bytes(COMPRESS_BYTES)} : sortie gzip")
+    elif plan.estimated_bytes > free_bytes * SPACE_MARGIN * 0.5:
+        plan.compress = True
+        plan.reasons.append("espace disque limité : sortie gzip")
+
+
+def plan_dump(
+    tables: list[TableStats],
+    free_bytes: int,
+    throughput: float | None = None,
+    strategy: str = "auto",
+    compress: bool | None = None,
+    max_jobs: int = MAX_JOBS,
+) -> BackupPlan:
+    """
+    Choisit la stratégie de dump (un flux ou parallèle par table, compression).
+    "auto" garde toujours un seul flux cohérent entre tables : le dump
+    parallèle, cohérent table par table seulement, n'est retenu que sur
+    demande explicite (strategy="parallel").
+    """
+    plan = BackupPlan("dump", tables=tables)
+    plan.estimated_bytes = sum(t.data_bytes for t in tables)
+    big = [t for t in tables if t.data_bytes >= BIG_TABLE_BYTES]
+
+    if strategy == STRATEGY_PARALLEL:
+        plan.strategy = STRATEGY_PARALLEL
+        plan.jobs = max(2, min(max_jobs, len(big) or len(tables)))
+        plan.reasons.append(
+            f"{plan.jobs} dumps en parallèle demandés : ATTENTION, cohérence par table, pas entre tables"
+        )
+    else:
+        plan.reasons.append("un seul flux mysqldump (instantané cohérent)")
+        if strategy == "auto" and plan.estimated_bytes > PARALLEL_BYTES and len(big) >= 2:
+            plan.reasons.append(
+                f"{len(big)} tables > {human_bytes(BIG_TABLE_BYTES)} : --strategy parallel irait plus vite, "
+                "au prix de la cohérence entre tables"
+            )
+    _want_compress(plan, free_bytes, compress)
+    return _finish(plan, throughput, free_bytes)
+
+
+def plan_export(
+    table: TableStats,
+    free_bytes: int,
+    throughput: float | None = None,
+    incremental: bool = False,
+    compress: bool | None = None,
+) -> BackupPlan:
+    """Choisit la stratégie d'export CSV (requête unique ou tranches par clé primaire)."""
+    plan = BackupPlan("export", tables=[table])
+    plan.estimated_bytes = table.data_bytes
+    if table.rows > CHUNK_ROWS and table.pk:
+        plan.strategy = STRATEGY_CHUNKED
+        plan.chunk_size = CHUNK_SIZE
+        plan.reasons.append(
+            f"~{table.rows} lignes : export par tranches de {CHUNK_SIZE} sur "
+            + (f"la colonne de reprise puis la clé {table.pk}" if incremental else f"la clé {table.pk}")
+        )
+    elif table.rows > CHUNK_ROWS:
+        plan.reasons.append("table volumineuse exportée en une requête (pas de clé primaire entière)")
+    else:
+        plan.reasons.append("requête unique")
+    _want_compress(plan, free_bytes, compress)
+    return _finish(plan, throughput, free_bytes)
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import ipaddress
+import math
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from itertools import zip_longest
+
+# Issues possibles d'une connexion, telles que vues par le limiteur
+OUTCOME_OK = "ok"
+OUTCOME_TIMEOUT = "timeout"          # poignée de main SSH trop lente (serveur/lien saturé)
+OUTCOME_REFUSED = "refused"          # poignée de main coupée (ex: sshd MaxStartups)
+OUTCOME_UNREACHABLE = "unreachable"  # hôte absent / port fermé : neutre
+
+
+def subnet_key(host: str) -> str:
+    """Clé d'équité : le /24 d'une IPv4 (le /64 d'une IPv6), sinon le nom d'hôte."""
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        return host
+    prefix = 24 if ip.version == 4 else 64
+    return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+
+
+class AdaptiveLimiter:
+    """
+    Limiteur de concurrence AIMD (additive increase / multiplicative decrease).
+
+    - +1 connexion simultanée après une fenêtre de succès à latence correcte
+    - limite divisée par 2 sur timeout ou refus de poignée de main, au plus
+      une fois par fenêtre pour ne pas s'effondrer sur une rafale d'échecs
+    - partage équitable entre /24 : un sous-réseau ne peut occuper plus de
+      limite / (nombre de /24 ayant encore des hôtes à traiter) créneaux
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 2,
+        max_limit: int = 25,
+        initial: int | None = None,
+        latency_target: float = 1.0,
+        backoff: float = 0.5,
+    ):
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError("Bornes de concurrence invalides")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.limit = initial if initial is not None else max(min_limit, min(max_limit, 8))
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._subnet_in_flight: Counter = Counter()
+        self._subnet_pending: Counter = Counter()
+        self._good_since_change = 0
+        self._releases_since_decrease = 0
+        self._latency_ewma: float | None = None
+
+        self._samples: deque = deque(maxlen=10000)
+        self._limit_history: list[tuple[float, int]] = [(time.monotonic(), self.limit)]
+        self._outcomes: Counter = Counter()
+        self.increases = 0
+        self.decreases = 0
+        self.peak = self.limit
+
+    # --- planification -------------------------------------------------
+    def register(self, hosts: list[str]) -> list[str]:
+        """Déclare les hôtes à traiter et les renvoie entrelacés par /24."""
+        groups: dict[str, list[str]] = defaultdict(list)
+        for host in hosts:
+            groups[subnet_key(host)].append(host)
+        with self._cond:
+            for key, members in groups.items():
+                self._subnet_pending[key] += len(members)
+        return [h for batch in zip_longest(*groups.values()) for h in batch if h is not None]
+
+    def _subnet_cap(self) -> int:
+        active = sum(1 for n in self._subnet_pending.values() if n > 0)
+        return max(1, math.ceil(self.limit / max(1, active)))
+
+    def acquire(self, host: str) -> None:
+        key = subnet_key(host)
+        with self._cond:
+            while self._in_flight >= self.limit or self._subnet_in_flight[key] >= self._subnet_cap():
+                # Réveillé par release() (créneau libéré ou limite relevée)
+                self._cond.wait()
+            self._in_flight += 1
+            self._subnet_in_flight[key] += 1
+
+    def release(self, host: str, outcome: str, latency: float | None = None) -> None:
+        key = subnet_key(host)
+        with self._cond:
+            self._in_flight -= 1
+            self._subnet_in_flight[key] -= 1
+            if self._subnet_pending[key] > 0:
+                self._subnet_pending[key] -= 1
+            self._outcomes[outcome] += 1
+            self._releases_since_decrease += 1
+            if latency is not None:
+                self._samples.append(latency)
+                self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+
+            if outcome in (OUTCOME_TIMEOUT, OUTCOME_REFUSED):
+                self._decrease()
+            elif outcome == OUTCOME_OK:
+                if self._latency_ewma is not None and self._latency_ewma > 2 * self.latency_target:
+                    # Latence qui s'envole : signe de saturation avant les timeouts
+                    self._decrease()
+                elif latency is None or latency <= self.latency_target:
+                    self._good_since_change += 1
+                    if self._good_since_change >= self.limit:
+                        self._set_limit(self.limit + 1)
+                        self.increases += 1
+            self._cond.notify_all()
+
+    def _decrease(self) -> None:
+        # Une seule réduction par fenêtre (les connexions déjà en vol échouent ensemble)
+        if self._releases_since_decrease < self.limit and self.decreases:
+            return
+        new_limit = max(self.min_limit, int(self.limit * self.backoff))
+        self._releases_since_decrease = 0
+        self._latency_ewma = None
+        if new_limit < self.limit:
+            self._set_limit(new_limit)
+            self.decreases += 1
+
+    def _set_limit(self, value: int) -> None:
+        self.limit = max(self.min_limit, min(self.max_limit, value))
+        self.peak = max(self.peak, self.limit)
+        self._good_since_change = 0
+        self._limit_history.append((time.monotonic(), self.limit))
+
+    # --- bilan ---------------------------------------------------------
+    def summary(self) -> dict:
+        with self._cond:
+            history = list(self._limit_history) + [(time.monotonic(), self.limit)]
+            samples = sorted(self._samples)
+            outcomes = dict(self._outcomes)
+        # Moyenne de la limite pondérée par le temps passé à chaque valeur
+        total = history[-1][0] - history[0][0]
+        weighted = sum((t2 - t1) * lim for (t1, lim), (t2, _) in zip(history, history[1:]))
+        average = weighted / total if total > 0 else float(self.limit)
+        return {
+            "mode": "adaptive",
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "final": self.limit,
+            "peak": self.peak,
+            "average": round(average, 1),
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "outcomes": outcomes,
+            "connect_ms_p50": round(statistics.median(samples) * 1000, 1) if samples else None,
+            "connect_ms_p95": round(samples[int(0.95 * (len(samples) - 1))] * 1000, 1) if samples else None,
+        }
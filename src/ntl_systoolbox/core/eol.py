@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import re
+import shutil
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+from ntl_systoolbox.core.paths import detect_repo_root
+
+# Jeu de données embarqué (livré avec le paquet) et surcharge locale
+# optionnelle (config/eol.json à la racine du dépôt), mise à jour via
+# `ntl-systoolbox audit eol-update`.
+BUNDLED_DATASET = Path(__file__).resolve().parent.parent / "data" / "eol.json"
+OVERRIDE_NAME = "eol.json"
+
+# Nombre de jours avant la fin de support à partir duquel un hôte est signalé.
+EOL_SOON_DAYS = 180
+
+STATUS_SUPPORTED = "supported"
+STATUS_EOL_SOON = "eol_soon"
+STATUS_EOL = "eol"
+STATUS_UNKNOWN = "unknown"
+
+_MATCH_MODES = {"version", "major", "build"}
+_WINDOWS_BUILD_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
+# Produits Windows : un même numéro de build désigne un poste et un serveur
+# (17763 = Windows 10 1809 et Server 2019, 26100 = Windows 11 24H2 et Server 2025)
+WINDOWS_CLIENT = "windows"
+WINDOWS_SERVER = "windows-server"
+
+
+@dataclass(frozen=True)
+class EolEntry:
+    product: str
+    cycle: str
+    label: str
+    eol_date: date
+
+
+class EolIndex:
+    """
+    Index en mémoire (product, cycle) -> EolEntry.
+    Construit une seule fois par processus puis utilisé pour des recherches
+    en O(1), y compris sur des milliers de résultats d'audit.
+    """
+
+    def __init__(self, entries: Iterable[EolEntry], match_modes: dict[str, str], dataset_version: str = ""):
+        self.dataset_version = dataset_version
+        self._match_modes = dict(match_modes)
+        self._entries = {(e.product, e.cycle): e for e in entries}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def from_dataset(cls, data: dict) -> "EolIndex":
+        products = data.get("products")
+        if not isinstance(products, dict) or not products:
+            raise ValueError("Jeu de données EOL invalide: clé 'products' absente ou vide")
+
+        entries: list[EolEntry] = []
+        match_modes: dict[str, str] = {}
+        for product, spec in products.items():
+            mode = spec.get("match", "version")
+            if mode not in _MATCH_MODES:
+                raise ValueError(f"Mode de correspondance inconnu pour {product}: {mode}")
+            match_modes[product] = mode
+            label = spec.get("label", product)
+            names = spec.get("names", {})
+            for cycle, eol in spec.get("cycles", {}).items():
+                try:
+                    eol_date = date.fromisoformat(eol)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Date EOL invalide pour {product} {cycle}: {eol!r}")
+                entries.append(EolEntry(
+                    product=product,
+                    cycle=str(cycle),
+                    label=f"{label} {names.get(cycle, cycle)}",
+                    eol_date=eol_date,
+                ))
+        return cls(entries, match_modes, str(data.get("dataset_version", "")))
+
+    def _cycle_for(self, product: str, version: str) -> Optional[str]:
+        mode = self._match_modes.get(product)
+        if mode is None or not version:
+            return None
+        if mode == "version":
+            return version.strip()
+        if mode == "major":
+            return version.strip().split(".", 1)[0]
+        # mode "build" : sortie de `ver`, ex. "Microsoft Windows [Version 10.0.20348.2113]"
+        m = _WINDOWS_BUILD_RE.search(version)
+        return m.group(3) if m else None
+
+    def lookup(self, os_family: str | None, distribution: str | None, version: str | None) -> Optional[EolEntry]:
+        product = (distribution or "").lower()
+        # Sans type de produit, le build seul ne permet pas de choisir poste ou serveur
+        if os_family == "windows" and product not in (WINDOWS_CLIENT, WINDOWS_SERVER):
+            return None
+        cycle = self._cycle_for(product, version or "")
+        if cycle is None:
+            return None
+        return self._entries.get((product, cycle))
+
+    def evaluate(self, record: dict, today: date | None = None) -> dict:
+        """Retourne les champs EOL (eol_date, days_remaining, eol_status...) d'un résultat d'audit."""
+        today = today or date.today()
+        entry = self.lookup(record.get("os_family"), record.get("distribution"), record.get("version"))
+        if entry is None:
+            return {
+                "eol_product": None,
+                "eol_date": None,
+                "days_remaining": None,
+                "eol_status": STATUS_UNKNOWN,
+            }
+        days = (entry.eol_date - today).days
+        if days < 0:
+            status = STATUS_EOL
+        elif days <= EOL_SOON_DAYS:
+            status = STATUS_EOL_SOON
+        else:
+            status = STATUS_SUPPORTED
+        return {
+            "eol_product": entry.label,
+            "eol_date": entry.eol_date.isoformat(),
+            "days_remaining": days,
+            "eol_status": status,
+        }
+
+
+def windows_product(product_type: str | None, caption: str | None = None) -> Optional[str]:
+    """
+    Produit EOL d'un hôte Windows d'après le type de produit du registre
+    (ProductType : WinNT = poste, ServerNT/LanmanNT = serveur) ou, à défaut,
+    d'après son intitulé (ProductName).
+    """
+    kind = (product_type or "").strip().lower()
+    if kind == "winnt":
+        return WINDOWS_CLIENT
+    if kind in ("servernt", "lanmannt"):
+        return WINDOWS_SERVER
+    if caption and "windows" in caption.lower():
+        return WINDOWS_SERVER if "server" in caption.lower() else WINDOWS_CLIENT
+    return None
+
+
+def override_path() -> Path:
+    return detect_repo_root() / "config" / OVERRIDE_NAME
+
+
+def _read_dataset(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+@lru_cache(maxsize=1)
+def load_eol_index() -> EolIndex:
+    """Charge (une fois par processus) le jeu de données local, sinon celui embarqué."""
+    path = override_path()
+    if not path.exists():
+        path = BUNDLED_DATASET
+    return EolIndex.from_dataset(_read_dataset(path))
+
+
+def install_dataset(source: Path) -> EolIndex:
+    """Valide un nouveau jeu de données puis l'installe comme surcharge locale."""
+    index = EolIndex.from_dataset(_read_dataset(source))
+    target = override_path()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, target)
+    load_eol_index.cache_clear()
+    return index
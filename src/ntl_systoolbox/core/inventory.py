@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from ntl_systoolbox.core.paths import detect_repo_root
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS audit_results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs(id),
+    host TEXT NOT NULL,
+    ts REAL NOT NULL,
+    hostname TEXT,
+    os_family TEXT,
+    distribution TEXT,
+    version TEXT,
+    eol_date TEXT,
+    eol_status TEXT,
+    error TEXT,
+    payload TEXT
+);
+CREATE TABLE IF NOT EXISTS diag_results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs(id),
+    host TEXT NOT NULL,
+    ts REAL NOT NULL,
+    os_type TEXT,
+    success INTEGER NOT NULL,
+    error TEXT,
+    payload TEXT
+);
+CREATE TABLE IF NOT EXISTS diag_services (
+    diag_id INTEGER REFERENCES diag_results(id),
+    host TEXT NOT NULL,
+    ts REAL NOT NULL,
+    service TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+-- Dernier état connu de chaque hôte (upsert)
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    hostname TEXT,
+    os_family TEXT,
+    distribution TEXT,
+    version TEXT,
+    eol_date TEXT,
+    eol_status TEXT,
+    last_error TEXT,
+    last_seen REAL,
+    last_audit_ts REAL,
+    last_diag_ts REAL
+);
+CREATE INDEX IF NOT EXISTS idx_audit_host_ts ON audit_results(host, ts);
+CREATE INDEX IF NOT EXISTS idx_audit_os ON audit_results(os_family, distribution, version);
+CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_results(ts);
+CREATE INDEX IF NOT EXISTS idx_diag_host_ts ON diag_results(host, ts);
+CREATE INDEX IF NOT EXISTS idx_diag_ts ON diag_results(ts);
+CREATE INDEX IF NOT EXISTS idx_diag_services ON diag_services(service, status, host, ts);
+CREATE INDEX IF NOT EXISTS idx_hosts_os ON hosts(os_family, distribution, version);
+CREATE INDEX IF NOT EXISTS idx_hosts_eol ON hosts(eol_status);
+"""
+
+_UPSERT_HOST_AUDIT = """
+INSERT INTO hosts (host, hostname, os_family, distribution, version, eol_date, eol_status,
+                   last_error, last_seen, last_audit_ts)
+VALUES (:host, :hostname, :os_family, :distribution, :version, :eol_date, :eol_status,
+        :error, :seen, :ts)
+ON CONFLICT(host) DO UPDATE SET
+    hostname = COALESCE(excluded.hostname, hosts.hostname),
+    os_family = COALESCE(excluded.os_family, hosts.os_family),
+    distribution = COALESCE(excluded.distribution, hosts.distribution),
+    version = COALESCE(excluded.version, hosts.version),
+    eol_date = COALESCE(excluded.eol_date, hosts.eol_date),
+    eol_status = COALESCE(excluded.eol_status, hosts.eol_status),
+    last_error = excluded.last_error,
+    last_seen = COALESCE(excluded.last_seen, hosts.last_seen),
+    last_audit_ts = excluded.last_audit_ts
+"""
+
+_UPSERT_HOST_DIAG = """
+INSERT INTO hosts (host, last_error, last_seen, last_diag_ts)
+VALUES (:host, :error, :seen, :ts)
+ON CONFLICT(host) DO UPDATE SET
+    last_error = excluded.last_error,
+    last_seen = COALESCE(excluded.last_seen, hosts.last_seen),
+    last_diag_ts = excluded.last_diag_ts
+"""
+
+
+def inventory_path() -> Path:
+    env = os.environ.get("NTL_INVENTORY_DB")
+    if env:
+        return Path(env)
+    return detect_repo_root() / "inventaire" / "inventory.sqlite3"
+
+
+def connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    path = path or inventory_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class InventoryWriter:
+    """
+    Écriture groupée des résultats d'audit/diag dans l'inventaire SQLite :
+    les lignes sont mises en tampon puis insérées par lots (une transaction
+    par lot), ce qui reste rapide même pour des milliers d'hôtes.
+    """
+
+    def __init__(self, kind: str, path: Optional[Path] = None, batch_size: int = 500, source: str = ""):
+        self.kind = kind
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._audits: list[dict] = []
+        self._diags: list[dict] = []
+        self._conn = connect(path)
+        with self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (kind, started_at, source) VALUES (?, ?, ?)", (kind, time.time(), source)
+            )
+        self.run_id = cur.lastrowid
+
+    def __enter__(self) -> "InventoryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def add_audit(self, result: dict, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        error = result.get("error")
+        row = {
+            "run_id": self.run_id,
+            "host": result.get("host_ip") or result.get("host") or result.get("hostname") or "?",
+            "ts": ts,
+            "seen": None if error else ts,
+            "hostname": result.get("hostname") or None,
+            "os_family": result.get("os_family"),
+            "distribution": result.get("distribution"),
+            "version": result.get("version"),
+            "eol_date": result.get("eol_date"),
+            "eol_status": result.get("eol_status"),
+            "error": str(error) if error else None,
+            "payload": json.dumps(result, ensure_ascii=False, default=str),
+        }
+        with self._lock:
+            self._audits.append(row)
+            if len(self._audits) >= self.batch_size:
+                self._flush_locked()
+
+    def add_diag(self, report: dict, ts: float | None = None) -> None:
+        ts = time.time() if ts is None else ts
+        error = report.get("error")
+        row = {
+            "run_id": self.run_id,
+            "host": report.get("host") or "?",
+            "ts": ts,
+            "seen": ts if report.get("success") else None,
+            "os_type": report.get("os_type"),
+            "success": 1 if report.get("success") else 0,
+            "error": str(error) if error else None,
+            "payload": json.dumps(report, ensure_ascii=False, default=str),
+            "services": dict(report.get("services") or {}),
+        }
+        with self._lock:
+            self._diags.append(row)
+            if len(self._diags) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._audits and not self._diags:
+            return
+        audits, self._audits = self._audits, []
+        diags, self._diags = self._diags, []
+        with self._conn:
+            if audits:
+                self._conn.executemany(
+                    "INSERT INTO audit_results (run_id, host, ts, hostname, os_family, distribution, version,"
+                    " eol_date, eol_status, error, payload) VALUES (:run_id, :host, :ts, :hostname, :os_family,"
+                    " :distribution, :version, :eol_date, :eol_status, :error, :payload)",
+                    audits,
+                )
+                self._conn.executemany(_UPSERT_HOST_AUDIT, audits)
+            for row in diags:
+                cur = self._conn.execute(
+                    "INSERT INTO diag_results (run_id, host, ts, os_type, success, error, payload)"
+                    " VALUES (:run_id, :host, :ts, :os_type, :success, :error, :payload)",
+                    row,
+                )
+                self._conn.executemany(
+                    "INSERT INTO diag_services (diag_id, host, ts, service, status) VALUES (?, ?, ?, ?, ?)",
+                    [(cur.lastrowid, row["host"], row["ts"], svc, status) for svc, status in row["services"].items()],
+                )
+            if diags:
+                self._conn.executemany(_UPSERT_HOST_DIAG, diags)
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+def record_audit(results: Iterable[dict], source: str = "") -> None:
+    with InventoryWriter("audit", source=source) as writer:
+        for result in results:
+            writer.add_audit(result)
+
+
+def record_diag(report: dict, source: str = "") -> None:
+    with InventoryWriter("diag", source=source) as writer:
+        writer.add_diag(report)
+
+
+# --------------------------
+# Requêtes
+# --------------------------
+def query_hosts(
+    conn: sqlite3.Connection,
+    os_family: str | None = None,
+    distribution: str | None = None,
+    version: str | None = None,
+    eol_status: str | None = None,
+) -> list[sqlite3.Row]:
+    """Dernier état connu des hôtes, filtré par OS/version/statut EOL."""
+    clauses, params = [], []
+    for column, value in (("os_family", os_family), ("distribution", distribution),
+                          ("version", version), ("eol_status", eol_status)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(f"SELECT * FROM hosts {where} ORDER BY host", params).fetchall()
+
+
+def host_history(conn: sqlite3.Connection, host: str, limit: int = 50) -> list[sqlite3.Row]:
+    """Historique audits + diagnostics d'un hôte, du plus récent au plus ancien."""
+    return conn.execute(
+        "SELECT 'audit' AS kind, ts, os_family AS os, version, eol_status AS status, error FROM audit_results"
+        " WHERE host = ?"
+        " UNION ALL"
+        " SELECT 'diag' AS kind, ts, os_type AS os, NULL AS version,"
+        " CASE success WHEN 1 THEN 'ok' ELSE 'ko' END AS status, error FROM diag_results WHERE host = ?"
+        " ORDER BY ts DESC LIMIT ?",
+        (host, host, limit),
+    ).fetchall()
+
+
+def service_down(conn: sqlite3.Connection, service: str, host: str | None = None) -> list[sqlite3.Row]:
+    """Dernier signalement d'un service non actif (ex: NTDS), par hôte."""
+    sql = ("SELECT host, MAX(ts) AS ts, status, COUNT(*) AS occurrences FROM diag_services"
+           " WHERE service = ? AND status != 'ACTIF'")
+    params: list = [service]
+    if host:
+        sql += " AND host = ?"
+        params.append(host)
+    sql += " GROUP BY host ORDER BY ts DESC"
+    return conn.execute(sql, params).fetchall()
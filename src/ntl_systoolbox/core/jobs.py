@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+
+@dataclass
+class Task:
+    id: str
+    type: str
+    params: dict = field(default_factory=dict)
+    depends_on: list[str] = field(default_factory=list)
+    resources: list[str] = field(default_factory=list)
+    retries: int = 0
+    retry_delay: float = 5.0
+
+
+@dataclass
+class TaskResult:
+    id: str
+    type: str
+    status: str
+    attempts: int = 0
+    started_at: str | None = None
+    duration_s: float = 0.0
+    result: Any = None
+    error: str | None = None
+
+
+@dataclass
+class Plan:
+    tasks: list[Task]
+    max_parallel: int = 4
+    resources: dict[str, int] = field(default_factory=dict)
+
+
+def parse_plan(data: dict, known_types: set[str] | None = None) -> Plan:
+    """
+    Valide un plan (dict issu du YAML/JSON) : identifiants uniques,
+    dépendances et ressources connues, absence de cycle.
+    Lève ValueError avec un message explicite sinon.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("tasks"), list) or not data["tasks"]:
+        raise ValueError("Le plan doit contenir une liste 'tasks' non vide")
+
+    if not isinstance(data.get("resources") or {}, dict):
+        raise ValueError("'resources' doit être un dictionnaire nom -> capacité")
+    resources = {str(k): int(v) for k, v in (data.get("resources") or {}).items()}
+    if any(v < 1 for v in resources.values()):
+        raise ValueError("Chaque ressource doit avoir une capacité >= 1")
+
+    tasks: list[Task] = []
+    seen: set[str] = set()
+    for raw in data["tasks"]:
+        if not isinstance(raw, dict) or "id" not in raw or "type" not in raw:
+            raise ValueError(f"Tâche invalide (id et type requis): {raw!r}")
+        if not isinstance(raw.get("params") or {}, dict):
+            raise ValueError(f"'params' doit être un dictionnaire pour {raw['id']}")
+        for key in ("depends_on", "resources"):
+            if not isinstance(raw.get(key) or [], list):
+                raise ValueError(f"'{key}' doit être une liste pour {raw['id']}")
+        task = Task(
+            id=str(raw["id"]),
+            type=str(raw["type"]),
+            params=dict(raw.get("params") or {}),
+            depends_on=[str(d) for d in raw.get("depends_on") or []],
+            # Sans doublon : une ressource citée deux fois ne prend qu'un créneau
+            resources=list(dict.fromkeys(str(r) for r in raw.get("resources") or [])),
+            retries=int(raw.get("retries", 0)),
+            retry_delay=float(raw.get("retry_delay", 5.0)),
+        )
+        if task.id in seen:
+            raise ValueError(f"Identifiant de tâche en double: {task.id}")
+        if task.retries < 0 or task.retry_delay < 0:
+            raise ValueError(f"retries et retry_delay doivent être >= 0 pour {task.id}")
+        if known_types is not None and task.type not in known_types:
+            raise ValueError(f"Type de tâche inconnu pour {task.id}: {task.type}")
+        unknown = [r for r in task.resources if r not in resources]
+        if unknown:
+            raise ValueError(f"Ressource(s) non déclarée(s) pour {task.id}: {', '.join(unknown)}")
+        seen.add(task.id)
+        tasks.append(task)
+
+    for task in tasks:
+        missing = [d for d in task.depends_on if d not in seen]
+        if missing:
+            raise ValueError(f"Dépendance(s) inconnue(s) pour {task.id}: {', '.join(missing)}")
+
+    # Détection de cycle (tri topologique de Kahn)
+    indegree = {t.id: len(set(t.depends_on)) for t in tasks}
+    dependents: dict[str, list[str]] = {t.id: [] for t in tasks}
+    for t in tasks:
+        for d in set(t.depends_on):
+            dependents[d].append(t.id)
+    queue = [tid for tid, n in indegree.items() if n == 0]
+    visited = 0
+    while queue:
+        tid = queue.pop()
+        visited += 1
+        for child in dependents[tid]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    if visited != len(tasks):
+        raise ValueError("Le plan contient un cycle de dépendances")
+
+    return Plan(tasks=tasks, max_parallel=max(1, int(data.get("max_parallel", 4))), resources=resources)
+
+
+def _run_with_retries(task: Task, handler: Callable[[dict], Any]) -> TaskResult:
+    res = TaskResult(id=task.id, type=task.type, status=STATUS_FAILED,
+                     started_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    started = time.monotonic()
+    for attempt in range(1, task.retries + 2):
+        res.attempts = attempt
+        try:
+            res.result = handler(task.params)
+            res.status = STATUS_SUCCESS
+            res.error = None
+            break
+        except Exception as e:
+            res.error = str(e) or type(e).__name__
+            if attempt <= task.retries:
+                time.sleep(task.retry_delay)
+    res.duration_s = round(time.monotonic() - started, 3)
+    return res
+
+
+def run_plan(
+    plan: Plan,
+    handlers: dict[str, Callable[[dict], Any]],
+    on_done: Callable[[TaskResult], None] | None = None,
+) -> list[TaskResult]:
+    """
+    Exécute le graphe de tâches : les tâches indépendantes tournent en
+    parallèle (max_parallel), dans la limite des ressources déclarées ;
+    les dépendants d'une tâche en échec sont ignorés (skipped).
+    Les résultats sont renvoyés dans l'ordre du plan.
+    """
+    by_id = {t.id: t for t in plan.tasks}
+    results: dict[str, TaskResult] = {}
+    available = dict(plan.resources)
+    pending = [t.id for t in plan.tasks]
+
+    def finish(res: TaskResult) -> None:
+        results[res.id] = res
+        if on_done is not None:
+            on_done(res)
+
+    with ThreadPoolExecutor(max_workers=plan.max_parallel) as pool:
+        running = {}
+        while pending or running:
+            # Propagation des échecs : un dépendant d'une tâche KO est ignoré
+            for tid in list(pending):
+                failed = [d for d in by_id[tid].depends_on if d in results and results[d].status != STATUS_SUCCESS]
+                if failed:
+                    pending.remove(tid)
+                    finish(TaskResult(id=tid, type=by_id[tid].type, status=STATUS_SKIPPED,
+                                      error=f"dépendance en échec: {', '.join(failed)}"))
+
+            # Lancement de tout ce qui est prêt et dispose de ses ressources
+            for tid in list(pending):
+                task = by_id[tid]
+                if len(running) >= plan.max_parallel:
+                    break
+                if not all(d in results for d in task.depends_on):
+                    continue
+                if not all(available[r] > 0 for r in task.resources):
+                    continue
+                for r in task.resources:
+                    available[r] -= 1
+                pending.remove(tid)
+                running[pool.submit(_run_with_retries, task, handlers[task.type])] = task
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                for r in task.resources:
+                    available[r] += 1
+                finish(future.result())
+
+    return [results[t.id] for t in plan.tasks]
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+# Format texte Prometheus (0.0.4), lu par le collecteur "textfile" de
+# node-exporter et par tout scrapeur Prometheus/OpenMetrics.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r'\\(.)', lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: dict) -> tuple[tuple[str, str], ...]:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """Lignes d'échantillons au format texte, sans HELP ni TYPE."""
+
+
+class _ValueMetric(_Metric):
+    """Une valeur par jeu d'étiquettes (compteur, jauge)."""
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: dict[tuple, float] = {}
+
+    def _add(self, amount: float, labels: dict) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Counter(_ValueMetric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Un compteur ne peut que croître")
+        self._add(amount, labels)
+
+
+class Gauge(_ValueMetric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, persistent: bool = False):
+        super().__init__(name, help)
+        # persistent : les séries absentes de ce processus sont reprises du
+        # textfile existant lors de sa réécriture (ex: horodatage du dernier succès)
+        self.persistent = persistent
+
+    def _setdefault(self, key: tuple, value: float) -> None:
+        with self._lock:
+            self._values.setdefault(key, value)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self._add(-amount, labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict[tuple, list] = {}  # labels -> [compteurs par bucket, somme, total]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        lines = []
+        for key, (counts, total, n) in items:
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {c}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {n}")
+        return lines
+
+
+class Registry:
+    """Registre de métriques du processus (get-or-create par nom)."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Métrique {name} déjà déclarée avec un autre type")
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str, persistent: bool = False) -> Gauge:
+        return self._get(Gauge, name, help, persistent=persistent)
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _restore_persistent(self, path: Path) -> None:
+        """Reprend du textfile existant les séries des jauges persistantes absentes ici."""
+        with self._lock:
+            gauges = {name: m for name, m in self._metrics.items() if isinstance(m, Gauge) and m.persistent}
+        if not gauges:
+            return
+        try:
+            text = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return
+        for line in text.splitlines():
+            match = _SAMPLE_RE.match(line)
+            if match is None or match.group(1) not in gauges:
+                continue
+            labels = {k: _unescape(v) for k, v in _LABEL_RE.findall(match.group(2) or "")}
+            try:
+                value = float(match.group(3))
+            except ValueError:
+                continue
+            gauges[match.group(1)]._setdefault(Gauge._key(labels), value)
+
+    def write_textfile(self, path: Path) -> None:
+        """
+        Écriture atomique (fichier temporaire + rename), comme l'attend
+        node-exporter. Le fichier est réécrit à chaque exécution : compteurs
+        et histogrammes ne couvrent que celle-ci (un fichier par tâche
+        planifiée), mais les jauges persistantes (dernier succès) gardent les
+        valeurs des exécutions précédentes, même après un échec.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._restore_persistent(path)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.render(), encoding="utf-8")
+        tmp.replace(path)
+
+    def serve(self, port: int, addr: str = "127.0.0.1"):
+        """Expose /metrics sur un port local (thread démon) ; renvoie le serveur HTTP."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), _Handler)
+        threading.Thread(target=server.serve_forever, name="ntl-metrics", daemon=True).start()
+        return server
+
+
+REGISTRY = Registry()
+
+# --------------------------
+# Métriques de la boîte à outils
+# --------------------------
+BACKUP_RUNS = REGISTRY.counter("ntl_backup_runs_total", "Sauvegardes lancées, par opération et résultat")
+BACKUP_DURATION = REGISTRY.histogram("ntl_backup_duration_seconds", "Durée des sauvegardes, par opération")
+BACKUP_BYTES = REGISTRY.counter("ntl_backup_bytes_total", "Octets écrits par les sauvegardes, par opération")
+BACKUP_ROWS = REGISTRY.counter("ntl_backup_rows_total", "Lignes exportées, par table")
+LAST_SUCCESS = REGISTRY.gauge(
+    "ntl_last_success_timestamp_seconds", "Horodatage Unix du dernier succès, par opération", persistent=True
+)
+
+AUDIT_HOSTS = REGISTRY.counter("ntl_audit_hosts_total", "Hôtes audités, par issue (ok, cached, timeout, error)")
+AUDIT_CONNECT = REGISTRY.histogram(
+    "ntl_audit_ssh_connect_seconds", "Durée de la connexion SSH d'audit (poignée de main + authentification)",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+AUDIT_DURATION = REGISTRY.histogram("ntl_audit_duration_seconds", "Durée totale des audits réseau")
+
+DIAG_RUNS = REGISTRY.counter("ntl_diag_runs_total", "Diagnostics distants, par résultat")
+DIAG_DURATION = REGISTRY.histogram("ntl_diag_duration_seconds", "Durée des diagnostics distants")
@@ -1,11 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 @dataclass(frozen=True)
 class AppPaths:
     repo_root: Path
     sauvegarde_dir: Path
+    cache_dir: Path
 
 def detect_repo_root() -> Path:
     # Heuristique robuste: remonter depuis le fichier du module pour trouver
@@ -17,8 +19,18 @@ def detect_repo_root() -> Path:
             return parent
     return cur_dir
 
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    # .env du répertoire courant (ou d'un parent), chargé une seule fois par
+    # processus ; les variables déjà définies dans l'environnement priment.
+    # Import tardif : dotenv reste hors du démarrage de la CLI.
+    from dotenv import find_dotenv, load_dotenv
+    load_dotenv(find_dotenv(".env", usecwd=True))
+
 def get_paths() -> AppPaths:
     root = detect_repo_root()
     sauvegarde = root / "sauvegarde"
     sauvegarde.mkdir(parents=True, exist_ok=True)
-    return AppPaths(repo_root=root, sauvegarde_dir=sauvegarde)
\ No newline at end of file
+    cache = root / ".cache"
+    cache.mkdir(parents=True, exist_ok=True)
+    return AppPaths(repo_root=root, sauvegarde_dir=sauvegarde, cache_dir=cache)
\ No newline at end of file
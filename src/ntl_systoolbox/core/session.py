@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import getpass
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Optional
+
+import paramiko
+
+from ntl_systoolbox.core import ssh_keys
+
+
+class SessionContext:
+    """
+    État du mode interactif, conservé pendant toute la durée du menu :
+    - secrets saisis une seule fois (gardés en mémoire uniquement)
+    - connexions SSH ouvertes, réutilisées d'une action à l'autre
+    - résultats des dernières actions (audit, diagnostic, tables...)
+    - tâches de préchauffage en arrière-plan (connexions, balayage de vivacité)
+    """
+
+    def __init__(self, max_background: int = 4):
+        self._lock = threading.RLock()
+        self._secrets: dict[str, str] = {}
+        self._ssh: dict[tuple, Future] = {}
+        self._cache: dict[tuple, tuple[float, Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_background, thread_name_prefix="ntl-warm")
+        self.alive: dict[str, bool] = {}
+        self.sweep_at: float | None = None
+        self._sweep: Future | None = None
+        self.results: dict[str, Any] = {}
+
+    # --------------------------
+    # Secrets
+    # --------------------------
+    def secret(self, name: str, prompt: str) -> str:
+        """Demande un secret la première fois seulement (vide = non mémorisé)."""
+        with self._lock:
+            if name in self._secrets:
+                return self._secrets[name]
+        # Saisie hors verrou : les tâches de fond ne restent pas bloquées sur le terminal
+        value = getpass.getpass(prompt)
+        if not value:
+            return ""
+        with self._lock:
+            return self._secrets.setdefault(name, value)
+
+    def known_secret(self, name: str) -> Optional[str]:
+        """Secret déjà saisi, sans jamais demander (utilisable en arrière-plan)."""
+        return self._secrets.get(name)
+
+    def set_secret(self, name: str, value: str) -> None:
+        with self._lock:
+            self._secrets[name] = value
+
+    def forget_secret(self, name: str) -> None:
+        with self._lock:
+            self._secrets.pop(name, None)
+
+    # --------------------------
+    # Tâches de fond et valeurs mémorisées
+    # --------------------------
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def cached(self, key: tuple, loader: Callable[[], Any], ttl: float = 300.0) -> Any:
+        """Valeur mémorisée pendant ttl secondes (ex: liste des tables d'une base)."""
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        value = loader()
+        with self._lock:
+            self._cache[key] = (time.monotonic(), value)
+        return value
+
+    def warm_cached(self, key: tuple, loader: Callable[[], Any], ttl: float = 300.0) -> Future:
+        return self.submit(self.cached, key, loader, ttl)
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    # --------------------------
+    # Connexions SSH réutilisables
+    # --------------------------
+    @staticmethod
+    def _connect(host: str, port: int, username: str, password: Optional[str], key_path: Optional[str]):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            if password is not None:
+                client.connect(host, port=port, username=username, password=password, timeout=10)
+            else:
+                client.connect(host, port=port, username=username, timeout=10, **ssh_keys.connect_kwargs(key_path))
+        except Exception:
+            client.close()
+            raise
+        return client
+
+    def _ssh_future(self, key: tuple, password: Optional[str], key_path: Optional[str]) -> Future:
+        with self._lock:
+            future = self._ssh.get(key)
+            if future is not None and not (future.done() and not self._usable(future)):
+                return future
+            future = self._ssh[key] = self.submit(self._connect, *key, password, key_path)
+            return future
+
+    @staticmethod
+    def _usable(future: Future) -> bool:
+        if future.exception() is not None:
+            return False
+        transport = future.result().get_transport()
+        return transport is not None and transport.is_active()
+
+    def warm_ssh(self, host: str, username: str, port: int = 22,
+                 password: Optional[str] = None, key_path: Optional[str] = None) -> Optional[Future]:
+        """
+        Ouvre la connexion en arrière-plan ; ssh() la récupérera déjà prête.
+        Rien n'est lancé (None) si la clé demanderait une phrase de passe :
+        la saisie est laissée à ssh(), au premier plan.
+        """
+        if password is None and key_path and not ssh_keys.usable_without_prompt(key_path):
+            return None
+        return self._ssh_future((host, port, username), password, key_path)
+
+    def ssh(self, host: str, username: str, port: int = 22,
+            password: Optional[str] = None, key_path: Optional[str] = None) -> paramiko.SSHClient:
+        """
+        Connexion SSH ouverte (réutilisée si toujours active, sinon rouverte).
+        Lève l'exception de connexion en cas d'échec, qui n'est pas mémorisé.
+        """
+        key = (host, port, username)
+        if password is None and key_path:
+            # Clé chargée (et phrase de passe demandée si besoin) dans le thread
+            # appelant, pas dans le thread de connexion
+            ssh_keys.load_private_key(key_path)
+        future = self._ssh_future(key, password, key_path)
+        try:
+            return future.result()
+        except Exception:
+            with self._lock:
+                if self._ssh.get(key) is future:
+                    del self._ssh[key]
+            raise
+
+    def drop_ssh(self, host: str, username: str, port: int = 22) -> None:
+        with self._lock:
+            future = self._ssh.pop((host, port, username), None)
+        if future is not None and future.done() and future.exception() is None:
+            future.result().close()
+
+    # --------------------------
+    # Balayage de vivacité (TCP)
+    # --------------------------
+    def sweep(self, hosts: list[str], port: int = 22, timeout: float = 0.5, workers: int = 64) -> Future:
+        """Teste en arrière-plan quels hôtes acceptent une connexion TCP sur port."""
+        def probe(host: str) -> bool:
+            try:
+                socket.create_connection((host, port), timeout=timeout).close()
+                return True
+            except OSError:
+                return False
+
+        def run() -> dict[str, bool]:
+            alive: dict[str, bool] = {}
+            with ThreadPoolExecutor(max_workers=min(workers, max(len(hosts), 1))) as pool:
+                futures = {pool.submit(probe, host): host for host in hosts}
+                for future in as_completed(futures):
+                    alive[futures[future]] = future.result()
+            with self._lock:
+                self.alive.update(alive)
+                self.sweep_at = time.monotonic()
+            return alive
+
+        with self._lock:
+            if self._sweep is None or self._sweep.done():
+                self._sweep = self.submit(run)
+            return self._sweep
+
+    def live_hosts(self, hosts: list[str], max_age: float = 120.0) -> Optional[list[str]]:
+        """
+        Sous-ensemble joignable de hosts d'après le dernier balayage, ou None
+        si le balayage est absent, en cours, trop ancien ou incomplet.
+        """
+        with self._lock:
+            if self.sweep_at is None or time.monotonic() - self.sweep_at > max_age:
+                return None
+            if any(host not in self.alive for host in hosts):
+                return None
+            return [host for host in hosts if self.alive[host]]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            futures, self._ssh = list(self._ssh.values()), {}
+            self._secrets.clear()
+        for future in futures:
+            if future.done() and future.exception() is None:
+                future.result().close()
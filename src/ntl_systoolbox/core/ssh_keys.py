@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import base64
+import getpass
+import os
+import threading
+from typing import Optional
+
+import paramiko
+
+# Cache par processus : une clé privée n'est lue et déchiffrée (KDF bcrypt
+# des clés OpenSSH protégées) qu'une seule fois, quel que soit le nombre
+# d'hôtes audités.
+_lock = threading.RLock()
+_keys: dict[str, paramiko.PKey] = {}
+_failures: dict[str, str] = {}
+_passphrase: Optional[str] = None
+_passphrase_asked = False
+_agent_blobs: Optional[list[bytes]] = None
+
+PASSPHRASE_ENV = "NTL_SSH_KEY_PASSPHRASE"
+_OPENSSH_MAGIC = b"openssh-key-v1\x00"
+
+
+def _read_key(path: str, passphrase: Optional[str]) -> paramiko.PKey:
+    # PKey.from_path détecte le type de clé : le KDF bcrypt d'une clé OpenSSH
+    # chiffrée ne tourne qu'une fois. cryptography signale une clé chiffrée
+    # sans phrase de passe par un TypeError.
+    try:
+        return paramiko.PKey.from_path(path, passphrase.encode() if passphrase else None)
+    except TypeError as e:
+        raise paramiko.PasswordRequiredException(str(e)) from e
+
+
+def _public_blob(path: str) -> Optional[bytes]:
+    """Clé publique associée (fichier .pub, ou en-tête en clair d'une clé OpenSSH)."""
+    try:
+        return paramiko.PublicBlob.from_file(path + ".pub").key_blob
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            lines = f.read().splitlines()
+        body = base64.b64decode("".join(line.strip() for line in lines if not line.startswith("-----")))
+        if not body.startswith(_OPENSSH_MAGIC):
+            return None
+        msg = paramiko.Message(body[len(_OPENSSH_MAGIC):])
+        for _ in range(3):  # ciphername, kdfname, kdfoptions
+            msg.get_binary()
+        if msg.get_int() < 1:
+            return None
+        return msg.get_binary()
+    except Exception:
+        return None
+
+
+def _agent_key_blobs() -> list[bytes]:
+    """Identités exposées par le ssh-agent (lues une fois)."""
+    global _agent_blobs
+    with _lock:
+        if _agent_blobs is None:
+            try:
+                agent = paramiko.Agent()
+                try:
+                    _agent_blobs = [k.asbytes() for k in agent.get_keys()]
+                finally:
+                    agent.close()
+            except Exception:
+                _agent_blobs = []
+        return _agent_blobs
+
+
+def agent_available() -> bool:
+    """Vrai si un ssh-agent joignable expose au moins une identité (testé une fois)."""
+    return len(_agent_key_blobs()) > 0
+
+
+def agent_holds(path: str) -> bool:
+    """Vrai si le ssh-agent détient l'identité de cette clé (signature possible sans la déchiffrer)."""
+    if not agent_available():
+        return False
+    blob = _public_blob(path)
+    return blob is not None and blob in _agent_key_blobs()
+
+
+def set_passphrase(passphrase: Optional[str]) -> None:
+    """Fournit la phrase de passe (ex: transmise par le processus parent aux shards)."""
+    global _passphrase, _passphrase_asked
+    with _lock:
+        _passphrase = passphrase
+        _passphrase_asked = passphrase is not None
+
+
+def _ask_passphrase(path: str) -> Optional[str]:
+    global _passphrase, _passphrase_asked
+    if not _passphrase_asked:
+        _passphrase_asked = True
+        _passphrase = os.environ.get(PASSPHRASE_ENV)
+        if _passphrase is None:
+            try:
+                _passphrase = getpass.getpass(f"Phrase de passe de la clé {path} : ")
+            except (EOFError, OSError):
+                _passphrase = None
+    return _passphrase
+
+
+def key_needs_passphrase(path: str) -> bool:
+    try:
+        _read_key(path, None)
+    except paramiko.PasswordRequiredException:
+        return True
+    except Exception:
+        return False
+    return False
+
+
+def usable_without_prompt(path: str) -> bool:
+    """
+    Vrai si la clé peut servir sans rien demander au terminal : déjà en
+    cache, non chiffrée, détenue par le ssh-agent ou phrase de passe déjà
+    saisie. Sinon, seule une action au premier plan doit l'utiliser.
+    """
+    with _lock:
+        if path in _keys or path in _failures or _passphrase_asked:
+            return True
+    return not key_needs_passphrase(path) or agent_holds(path)
+
+
+def resolve_passphrase(path: Optional[str]) -> Optional[str]:
+    """
+    Demande la phrase de passe (une fois) si la clé en a besoin et que le
+    ssh-agent ne détient pas cette identité. Utile avant de lancer des
+    processus enfants, qui n'ont pas accès au terminal.
+    """
+    if not path or not key_needs_passphrase(path) or agent_holds(path):
+        return None
+    with _lock:
+        return _ask_passphrase(path)
+
+
+def load_private_key(path: str) -> Optional[paramiko.PKey]:
+    """
+    Clé privée chargée une seule fois par processus. Une clé chiffrée n'est
+    déchiffrée que si le ssh-agent ne détient pas son identité (sinon
+    l'agent signe) ; la phrase de passe est alors demandée.
+    Renvoie None si la clé est inutilisable.
+    """
+    with _lock:
+        if path in _keys:
+            return _keys[path]
+        if path in _failures:
+            return None
+        try:
+            key = _read_key(path, None)
+        except paramiko.PasswordRequiredException:
+            if agent_holds(path):
+                _failures[path] = "clé chiffrée : authentification déléguée au ssh-agent"
+                return None
+            try:
+                key = _read_key(path, _ask_passphrase(path))
+            except Exception as e:
+                _failures[path] = str(e)
+                return None
+        except Exception as e:
+            _failures[path] = str(e)
+            return None
+        _keys[path] = key
+        return key
+
+
+def connect_kwargs(key_path: Optional[str]) -> dict:
+    """
+    Arguments d'authentification pour SSHClient.connect : clé en cache
+    d'abord, puis identités du ssh-agent. look_for_keys est désactivé pour
+    que paramiko ne relise pas ~/.ssh à chaque connexion.
+    """
+    kwargs = {"allow_agent": agent_available(), "look_for_keys": False}
+    pkey = load_private_key(key_path) if key_path else None
+    if pkey is not None:
+        kwargs["pkey"] = pkey
+    elif key_path and not agent_holds(key_path):
+        # Dernier recours : laisser paramiko lire le fichier et remonter son erreur
+        kwargs["key_filename"] = key_path
+    return kwargs
+
+
+def clear_cache() -> None:
+    global _passphrase, _passphrase_asked, _agent_blobs
+    with _lock:
+        _keys.clear()
+        _failures.clear()
+        _passphrase = None
+        _passphrase_asked = False
+        _agent_blobs = None
@@ -0,0 +1,320 @@
+"""
+Parc SSH simulé sur la boucle locale, pour tester et mesurer les modules 1
+(diagnostic) et 3 (audit) sans réseau réel.
+
+Chaque hôte simulé écoute sur sa propre adresse 127.x.y.z (toute la plage
+127.0.0.0/8 est locale sous Linux), sur un port commun au parc. Un seul
+thread accepte les connexions de tous les hôtes ; chaque session SSH est
+ensuite servie par paramiko. Les réponses aux commandes imitent un Linux
+(os-release, uname, systemctl...) ou un Windows OpenSSH (ver, reg, sc...),
+avec latence, pannes et blocages configurables par hôte.
+"""
+from __future__ import annotations
+
+import ipaddress
+import selectors
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import paramiko
+
+# Pannes simulées
+FAIL_DOWN = "down"            # rien n'écoute : connexion refusée
+FAIL_HANDSHAKE = "handshake"  # TCP accepté, aucune bannière SSH (poignée de main bloquée)
+FAIL_AUTH = "auth"            # authentification refusée
+
+USERNAME = "audit"
+PASSWORD = "secret"
+
+_OS_RELEASE = {
+    ("ubuntu", "18.04"): ("Ubuntu 18.04.6 LTS", "bionic"),
+    ("ubuntu", "22.04"): ("Ubuntu 22.04.4 LTS", "jammy"),
+    ("debian", "12"): ("Debian GNU/Linux 12 (bookworm)", "bookworm"),
+    ("rocky", "9"): ("Rocky Linux 9.3 (Blue Onyx)", ""),
+}
+
+_WINDOWS_BUILDS = {
+    "2016": ("10.0.14393.6897", "Windows Server 2016 Standard", "ServerNT"),
+    "2019": ("10.0.17763.5576", "Windows Server 2019 Standard", "ServerNT"),
+    "2022": ("10.0.20348.2340", "Windows Server 2022 Standard", "ServerNT"),
+    "2025": ("10.0.26100.2314", "Windows Server 2025 Datacenter", "LanmanNT"),
+    "10-1809": ("10.0.17763.5576", "Windows 10 Enterprise", "WinNT"),
+    # Windows 11 annonce toujours "Windows 10" dans ProductName
+    "11-24H2": ("10.0.26100.2314", "Windows 10 Pro", "WinNT"),
+}
+
+
+@dataclass
+class SimHost:
+    ip: str
+    os: str = "linux"               # linux / windows
+    distribution: str = "ubuntu"    # Linux : clé de _OS_RELEASE
+    version: str = "22.04"          # Linux : VERSION_ID, Windows : clé de _WINDOWS_BUILDS
+    latency: float = 0.0            # secondes ajoutées à chaque réponse de commande
+    failure: str | None = None      # FAIL_DOWN / FAIL_HANDSHAKE / FAIL_AUTH
+    hang: tuple[str, ...] = ()      # sous-chaînes des commandes qui ne répondent jamais
+    services_down: tuple[str, ...] = ()
+    # sous-chaîne de commande -> fn(commande, stdin) -> (stdout, stderr, code) en octets ;
+    # stdin est lu jusqu'à EOF avant l'appel (ex: mysqldump recevant ses options)
+    handlers: dict[str, Callable[[str, bytes], tuple[bytes, bytes, int]]] = field(default_factory=dict)
+    commands: list[str] = field(default_factory=list)
+
+    @property
+    def hostname(self) -> str:
+        return f"sim-{self.ip.replace('.', '-')}"
+
+    # --------------------------
+    # Réponses aux commandes : (stdout, stderr, code retour)
+    # --------------------------
+    def reply(self, command: str) -> tuple[str, str, int]:
+        if command == "hostname":
+            return self.hostname, "", 0
+        if self.os == "windows":
+            return self._reply_windows(command)
+        return self._reply_linux(command)
+
+    def _reply_linux(self, command: str) -> tuple[str, str, int]:
+        pretty, codename = _OS_RELEASE.get((self.distribution, self.version), (f"{self.distribution} {self.version}", ""))
+        if command.startswith("cat /etc/os-release"):
+            return (f'PRETTY_NAME="{pretty}"\nNAME="{pretty.split(" ")[0]}"\nID={self.distribution}\n'
+                    f'VERSION_ID="{self.version}"\nVERSION_CODENAME={codename}'), "", 0
+        if command.startswith("uname -a"):
+            return f"Linux {self.hostname} 5.15.0-105-generic #115-Ubuntu SMP x86_64 GNU/Linux", "", 0
+        if command.startswith("uname -s"):
+            return "Linux", "", 0
+        if command.startswith("grep PRETTY_NAME"):
+            return pretty, "", 0
+        if command.startswith("uptime -p"):
+            return "up 3 days, 4 hours", "", 0
+        if command.startswith("top -bn1"):
+            return "12.5", "", 0
+        if command.startswith("free"):
+            return "42", "", 0
+        if command.startswith("df -h"):
+            return "37% (50G total)", "", 0
+        if command.startswith("systemctl is-active"):
+            service = command.split()[2].upper()
+            return ("failed", "", 3) if service in self.services_down else ("active", "", 0)
+        name = command.split()[0]
+        return "", f"bash: {name}: command not found", 127
+
+    def _reply_windows(self, command: str) -> tuple[str, str, int]:
+        build, product, product_type = _WINDOWS_BUILDS.get(self.version, _WINDOWS_BUILDS["2019"])
+        if command.startswith("ver"):
+            return f"Microsoft Windows [Version {build}]", "", 0
+        if command.startswith("reg query") and "ProductType" in command:
+            return f"    ProductType    REG_SZ    {product_type}", "", 0
+        if command.startswith("reg query"):
+            return f"    ProductName    REG_SZ    {product}", "", 0
+        if command.startswith("systeminfo"):
+            return f"OS Name:                   Microsoft {product}\nOS Version:                {build} N/A Build", "", 0
+        if command.startswith("powershell") and "LastBootUpTime" in command:
+            return "266400", "", 0
+        if command.startswith("powershell") and "LoadPercentage" in command:
+            return "7", "", 0
+        if command.startswith("powershell"):
+            return "55", "", 0
+        if command.startswith("wmic logicaldisk"):
+            return "FreeSpace=64424509440\r\nSize=136365211648", "", 0
+        if command.startswith("sc query"):
+            service = command.split()[2].upper()
+            if service in self.services_down:
+                return "        STATE              : 1  STOPPED", "", 0
+            return "        STATE              : 4  RUNNING", "", 0
+        name = command.split()[0]
+        return "", f"'{name}' is not recognized as an internal or external command", 1
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, host: SimHost, authorized_key: paramiko.PKey | None):
+        self.host = host
+        self.authorized_key = authorized_key
+
+    def get_allowed_auths(self, username):
+        return "publickey,password"
+
+    def check_auth_publickey(self, username, key):
+        if self.host.failure == FAIL_AUTH or username != USERNAME:
+            return paramiko.AUTH_FAILED
+        if self.authorized_key is not None and key != self.authorized_key:
+            return paramiko.AUTH_FAILED
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_password(self, username, password):
+        if self.host.failure == FAIL_AUTH or (username, password) != (USERNAME, PASSWORD):
+            return paramiko.AUTH_FAILED
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        cmd = command.decode("utf-8", errors="replace")
+        self.host.commands.append(cmd)
+        threading.Thread(target=self._run, args=(channel, cmd), daemon=True).start()
+        return True
+
+    def _run(self, channel, cmd: str) -> None:
+        try:
+            if any(pattern in cmd for pattern in self.host.hang):
+                return  # commande bloquée : le canal reste ouvert sans réponse
+            if self.host.latency:
+                time.sleep(self.host.latency)
+            handler = next((fn for pattern, fn in self.host.handlers.items() if pattern in cmd), None)
+            if handler is not None:
+                out, err, status = handler(cmd, channel.makefile("rb").read())
+            else:
+                out, err, status = self.host.reply(cmd)
+                out, err = (out.encode() + b"\n") if out else b"", (err.encode() + b"\n") if err else b""
+            if out:
+                channel.sendall(out)
+            if err:
+                channel.sendall_stderr(err)
+            # Pas de close() côté serveur : il pourrait précéder l'acceptation de
+            # la requête "exec", que le client prendrait pour un canal fermé.
+            # EOF + statut suffisent ; le client ferme le canal après lecture.
+            channel.send_exit_status(status)
+            channel.shutdown_write()
+        except Exception:
+            pass
+
+
+class SimFleet:
+    """
+    Parc d'hôtes SSH simulés. S'utilise comme gestionnaire de contexte :
+
+        with SimFleet(hosts, authorized_key=key) as fleet:
+            audit_network_ssh_mt(hosts=fleet.ips, port=fleet.port, ...)
+    """
+
+    def __init__(self, hosts: list[SimHost], authorized_key: paramiko.PKey | None = None,
+                 host_key: paramiko.PKey | None = None, backlog: int = 128):
+        self.hosts = {h.ip: h for h in hosts}
+        self.authorized_key = authorized_key
+        # Une seule clé d'hôte pour tout le parc (génération RSA coûteuse)
+        self.host_key = host_key or paramiko.RSAKey.generate(2048)
+        self.backlog = backlog
+        self.port = 0
+        self._selector = selectors.DefaultSelector()
+        self._listeners: list[socket.socket] = []
+        self._transports: list[paramiko.Transport] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ips(self) -> list[str]:
+        return list(self.hosts)
+
+    def _bind(self, ip: str, port: int) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((ip, port))
+        sock.listen(self.backlog)
+        sock.setblocking(False)
+        return sock
+
+    def start(self) -> "SimFleet":
+        listening = [h for h in self.hosts.values() if h.failure != FAIL_DOWN]
+        for host in listening:
+            sock = self._bind(host.ip, self.port)
+            self.port = self.port or sock.getsockname()[1]
+            self._listeners.append(sock)
+            self._selector.register(sock, selectors.EVENT_READ, host)
+        self.port = self.port or self._free_port()
+        self._thread = threading.Thread(target=self._accept_loop, name="sim-fleet", daemon=True)
+        self._thread.start()
+        return self
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.1):
+                try:
+                    conn, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                conn.setblocking(True)
+                threading.Thread(target=self._serve, args=(conn, key.data), daemon=True).start()
+
+    def _serve(self, conn: socket.socket, host: SimHost) -> None:
+        if host.failure == FAIL_HANDSHAKE:
+            # Connexion TCP acceptée puis silence, jusqu'à l'arrêt du parc
+            self._stop.wait()
+            conn.close()
+            return
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(self.host_key)
+        with self._lock:
+            self._transports.append(transport)
+        try:
+            transport.start_server(server=_Server(host, self.authorized_key))
+        except Exception:
+            transport.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for sock in self._listeners:
+            self._selector.unregister(sock)
+            sock.close()
+        self._selector.close()
+        with self._lock:
+            transports, self._transports = self._transports, []
+        for transport in transports:
+            transport.close()
+
+    def __enter__(self) -> "SimFleet":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def loopback_ips(count: int, start: str = "127.0.1.1") -> list[str]:
+    """count adresses consécutives de 127.0.0.0/8 (hors .0 et .255)."""
+    ips, addr = [], ipaddress.IPv4Address(start)
+    while len(ips) < count:
+        if addr.packed[-1] not in (0, 255):
+            ips.append(str(addr))
+        addr += 1
+    return ips
+
+
+def mixed_fleet(count: int, latency: float = 0.0, failure_every: int = 0) -> list[SimHost]:
+    """
+    Parc hétérogène reproductible : Ubuntu/Debian/Rocky/Windows en rotation,
+    une panne (refus, poignée de main bloquée, auth) tous les failure_every hôtes.
+    """
+    profiles = [
+        dict(os="linux", distribution="ubuntu", version="22.04"),
+        dict(os="linux", distribution="debian", version="12"),
+        dict(os="windows", version="2019"),
+        dict(os="linux", distribution="ubuntu", version="18.04"),
+        dict(os="linux", distribution="rocky", version="9"),
+        dict(os="windows", version="2022"),
+    ]
+    failures = [FAIL_DOWN, FAIL_AUTH, FAIL_HANDSHAKE]
+    hosts = []
+    for i, ip in enumerate(loopback_ips(count)):
+        failure = None
+        if failure_every and i % failure_every == failure_every - 1:
+            failure = failures[(i // failure_every) % len(failures)]
+        hosts.append(SimHost(ip=ip, latency=latency, failure=failure, **profiles[i % len(profiles)]))
+    return hosts
+
+
+def write_client_key(path: Path) -> paramiko.RSAKey:
+    key = paramiko.RSAKey.generate(2048)
+    key.write_private_key_file(str(path))
+    return key
@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+from ntl_systoolbox.core import backup_plan as bp
+from ntl_systoolbox.core.backup_plan import TableStats
+
+GB = 1 << 30
+MB = 1 << 20
+
+
+def test_small_dump_is_single_uncompressed():
+    plan = bp.plan_dump([TableStats("orders", 1000, 10 * MB)], free_bytes=100 * GB)
+    assert plan.strategy == bp.STRATEGY_SINGLE and plan.jobs == 1
+    assert plan.compress is False and plan.enough_space
+    assert plan.estimated_duration_s == round(10 * MB / bp.DEFAULT_THROUGHPUT, 1)
+
+
+def test_large_dump_stays_consistent_unless_parallel_requested():
+    tables = [TableStats("orders", data_bytes=2 * GB), TableStats("stock", data_bytes=1 * GB),
+              TableStats("users", data_bytes=1 * MB)]
+    auto = bp.plan_dump(tables, free_bytes=100 * GB, throughput=100 * MB)
+    assert auto.strategy == bp.STRATEGY_SINGLE and auto.jobs == 1
+    assert auto.compress is True and "--strategy parallel" in auto.reasons[1]
+
+    plan = bp.plan_dump(tables, free_bytes=100 * GB, throughput=100 * MB, strategy="parallel")
+    assert plan.strategy == bp.STRATEGY_PARALLEL and plan.jobs == 2
+    assert "pas entre tables" in plan.reasons[0]
+    assert plan.compress is True
+    assert plan.estimated_output_bytes == int(plan.estimated_bytes * bp.GZIP_RATIO)
+    assert plan.throughput_source == "historique des manifests"
+
+    forced = bp.plan_dump(tables, free_bytes=100 * GB, strategy="single", compress=False)
+    assert forced.strategy == bp.STRATEGY_SINGLE and forced.compress is False
+
+
+def test_low_disk_space_compresses_or_refuses():
+    tight = bp.plan_dump([TableStats("orders", data_bytes=300 * MB)], free_bytes=500 * MB)
+    assert tight.compress is True and tight.enough_space
+    full = bp.plan_dump([TableStats("orders", data_bytes=300 * MB)], free_bytes=50 * MB)
+    assert full.enough_space is False and "espace insuffisant" in full.reasons[-1]
+
+
+def test_export_chunked_only_with_integer_pk():
+    big = TableStats("orders", rows=2_000_000, data_bytes=200 * MB, pk="id")
+    assert bp.plan_export(big, free_bytes=100 * GB).chunk_size == bp.CHUNK_SIZE
+    assert bp.plan_export(big, free_bytes=100 * GB, incremental=True).chunk_size == bp.CHUNK_SIZE
+    no_pk = TableStats("logs", rows=2_000_000, data_bytes=200 * MB)
+    assert bp.plan_export(no_pk, free_bytes=100 * GB).strategy == bp.STRATEGY_SINGLE
+
+
+def test_manifest_throughput_and_table_stats(tmp_path: Path):
+    for i, (size, raw, duration) in enumerate([(100, None, 1.0), (50, 400, 2.0), (999, None, None)]):
+        extra = {"duration_s": duration}
+        if raw:
+            extra["raw_bytes"] = raw
+        (tmp_path / f"d{i}.sql.manifest.json").write_text(json.dumps(
+            {"kind": "dump_sql", "created_at": f"2026-01-0{i + 1}T00:00:00Z", "size_bytes": size, "extra": extra}))
+    assert bp.manifest_throughput([tmp_path], "dump_sql") == 150.0
+    assert bp.manifest_throughput([tmp_path], "export_csv") is None
+
+    tables = bp.parse_table_stats("orders\t1200\t65536\t16384\nempty\tNULL\t0\t0\n")
+    assert [(t.name, t.rows, t.data_bytes) for t in tables] == [("orders", 1200, 65536), ("empty", 0, 0)]
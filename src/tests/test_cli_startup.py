@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("paramiko", "cryptography", "mariadb", "dotenv")
+SUBCOMMAND_MODULES = (
+    "ntl_systoolbox.cli.module1_diag",
+    "ntl_systoolbox.cli.module2_backup",
+    "ntl_systoolbox.cli.module3_audit",
+    "ntl_systoolbox.cli.inventory",
+    "ntl_systoolbox.cli.runner",
+)
+
+
+def _run_python(code: str) -> subprocess.CompletedProcess:
+    env = os.environ.copy()
+    env["PYTHONPATH"] = str(SRC_DIR) + os.pathsep + env.get("PYTHONPATH", "")
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=60)
+
+
+_HELP_THEN_LIST_MODULES = """
+import sys
+from ntl_systoolbox.cli.app import app
+try:
+    app(%r, standalone_mode=False)
+except SystemExit:
+    pass
+print("loaded=" + ",".join(m for m in %r if m in sys.modules))
+"""
+
+
+def test_help_does_not_import_heavy_dependencies():
+    proc = _run_python(_HELP_THEN_LIST_MODULES % (["--help"], HEAVY_MODULES))
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-1] == "loaded="
+
+
+def test_backup_help_does_not_import_ssh_stack():
+    proc = _run_python(_HELP_THEN_LIST_MODULES % (["backup", "dump", "--help"], ("paramiko", "mariadb")))
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-1] == "loaded="
+
+
+def test_help_does_not_import_subcommand_modules():
+    # Les sous-commandes ne sont chargées qu'à l'exécution : --help ne les importe pas
+    proc = _run_python(_HELP_THEN_LIST_MODULES % (["--help"], SUBCOMMAND_MODULES))
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-1] == "loaded="
+
+
+def test_run_help_has_no_completion_options():
+    proc = _run_python(_HELP_THEN_LIST_MODULES % (["run", "--help"], ()))
+    assert proc.returncode == 0, proc.stderr
+    assert "PLAN" in proc.stdout.upper()
+    assert "--install-completion" not in proc.stdout and "--show-completion" not in proc.stdout
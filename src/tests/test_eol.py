@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+from ntl_systoolbox.core import eol
+
+
+@pytest.fixture
+def index():
+    return eol.EolIndex.from_dataset(eol._read_dataset(eol.BUNDLED_DATASET))
+
+
+def test_bundled_dataset_loads(index):
+    assert len(index) > 0
+    assert index.dataset_version
+
+
+def test_ubuntu_lts_past_eol(index):
+    fields = index.evaluate(
+        {"os_family": "linux", "distribution": "ubuntu", "version": "18.04"},
+        today=date(2024, 1, 1),
+    )
+    assert fields["eol_date"] == "2023-05-31"
+    assert fields["days_remaining"] < 0
+    assert fields["eol_status"] == eol.STATUS_EOL
+
+
+def test_debian_and_rhel_family_match_major(index):
+    deb = index.lookup("linux", "debian", "12")
+    rocky = index.lookup("linux", "rocky", "9.3")
+    assert deb is not None and deb.cycle == "12"
+    assert rocky is not None and rocky.cycle == "9"
+
+
+def test_windows_build_from_ver_output(index):
+    fields = index.evaluate(
+        {"os_family": "windows", "distribution": "windows-server",
+         "version": "Microsoft Windows [Version 10.0.17763.5458]"},
+        today=date(2028, 9, 1),
+    )
+    assert fields["eol_product"] == "Windows Server 2019"
+    assert fields["eol_status"] == eol.STATUS_EOL_SOON
+
+
+@pytest.mark.parametrize("product,label,eol_date", [
+    ("windows", "Windows 11 24H2", "2026-10-13"),
+    ("windows-server", "Windows Server 2025", "2034-11-14"),
+])
+def test_windows_client_and_server_share_builds(index, product, label, eol_date):
+    entry = index.lookup("windows", product, "Microsoft Windows [Version 10.0.26100.2314]")
+    assert entry is not None and entry.label == label and entry.eol_date.isoformat() == eol_date
+
+
+def test_windows_without_product_type_is_unknown(index):
+    fields = index.evaluate({"os_family": "windows", "version": "Microsoft Windows [Version 10.0.17763.5458]"})
+    assert fields["eol_status"] == eol.STATUS_UNKNOWN
+
+
+@pytest.mark.parametrize("product_type,caption,expected", [
+    ("WinNT", "Windows 10 Pro", "windows"),
+    ("ServerNT", "", "windows-server"),
+    ("LanmanNT", "Windows Server 2022 Standard", "windows-server"),
+    ("", "Windows Server 2019 Datacenter", "windows-server"),
+    ("", "Windows 10 Enterprise LTSC 2019", "windows"),
+    ("", "", None),
+])
+def test_windows_product(product_type, caption, expected):
+    assert eol.windows_product(product_type, caption) == expected
+
+
+def test_unknown_version(index):
+    fields = index.evaluate({"os_family": "linux", "distribution": "arch", "version": None})
+    assert fields["eol_status"] == eol.STATUS_UNKNOWN
+    assert fields["days_remaining"] is None
+
+
+def test_install_dataset_rejects_invalid(tmp_path, monkeypatch):
+    monkeypatch.setattr(eol, "detect_repo_root", lambda: tmp_path)
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"products": {"ubuntu": {"cycles": {"22.04": "demain"}}}}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        eol.install_dataset(bad)
+    assert not (tmp_path / "config" / "eol.json").exists()
@@ -0,0 +1,200 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from fleet_sim import FAIL_AUTH, FAIL_DOWN, FAIL_HANDSHAKE, PASSWORD, USERNAME, SimFleet, SimHost, write_client_key
+from ntl_systoolbox.cli import module3_audit as m3
+from ntl_systoolbox.cli.module1_diag import check_remote_ssh
+from ntl_systoolbox.core import ssh_keys
+from ntl_systoolbox.core.concurrency import OUTCOME_OK, OUTCOME_TIMEOUT, OUTCOME_UNREACHABLE
+
+
+@pytest.fixture
+def env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("NTL_INVENTORY_DB", str(tmp_path / "inventory.sqlite3"))
+    monkeypatch.setattr(ssh_keys, "agent_available", lambda: False)
+    ssh_keys.clear_cache()
+    key_file = tmp_path / "id_rsa"
+    key = write_client_key(key_file)
+    yield tmp_path, key_file, key
+    ssh_keys.clear_cache()
+
+
+def test_audit_network_against_simulated_fleet(env):
+    tmp_path, key_file, key = env
+    hosts = [
+        SimHost("127.0.2.1", distribution="ubuntu", version="18.04"),
+        SimHost("127.0.2.2", distribution="debian", version="12"),
+        SimHost("127.0.2.3", os="windows", version="2019"),
+        SimHost("127.0.2.4", failure=FAIL_DOWN),
+        SimHost("127.0.2.5", failure=FAIL_AUTH),
+        SimHost("127.0.2.6", os="windows", version="10-1809"),
+    ]
+    with SimFleet(hosts, authorized_key=key) as fleet:
+        results = m3.audit_network_ssh_mt(
+            hosts=fleet.ips, username=USERNAME, ssh_key=str(key_file), port=fleet.port,
+            no_cache=True, output=str(tmp_path / "audit.ndjson"), max_workers=4,
+        )
+
+    by_ip = {r["host_ip"]: r for r in results}
+    assert set(by_ip) == set(fleet.ips)
+    assert by_ip["127.0.2.1"]["distribution"] == "ubuntu"
+    assert by_ip["127.0.2.1"]["eol_status"] == "eol"
+    assert by_ip["127.0.2.1"]["hostname"] == "sim-127-0-2-1"
+    assert by_ip["127.0.2.2"]["version"] == "12"
+    assert by_ip["127.0.2.3"]["os_family"] == "windows"
+    assert "17763" in by_ip["127.0.2.3"]["version"]
+    assert by_ip["127.0.2.3"]["eol_product"] == "Windows Server 2019"
+    # Même build 17763 sur un poste : Windows 10 1809, pas Server 2019
+    assert by_ip["127.0.2.6"]["distribution"] == "windows"
+    assert by_ip["127.0.2.6"]["eol_product"] == "Windows 10 1809"
+    assert by_ip["127.0.2.6"]["eol_status"] == "eol"
+    assert "error" in by_ip["127.0.2.4"] and "error" in by_ip["127.0.2.5"]
+    assert all(r.get("connect_ms") and r.get("ssh_fingerprint")
+               for ip, r in by_ip.items() if ip not in ("127.0.2.4", "127.0.2.5"))
+
+    lines = (tmp_path / "audit.ndjson").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 6 and all(json.loads(line)["host_ip"] for line in lines)
+    with sqlite3.connect(tmp_path / "inventory.sqlite3") as conn:
+        assert conn.execute("SELECT COUNT(*) FROM hosts").fetchone()[0] == 6
+
+
+def test_audit_sharded_against_simulated_fleet(env, capsys):
+    tmp_path, key_file, key = env
+    hosts = [SimHost(f"127.0.3.{i}", distribution="debian", version="12") for i in range(1, 7)]
+    with SimFleet(hosts, authorized_key=key) as fleet:
+        results = m3.audit_network_ssh_mt(
+            hosts=fleet.ips, username=USERNAME, ssh_key=str(key_file), port=fleet.port,
+            no_cache=True, processes=2, max_workers=3, inventory=False,
+        )
+    assert sorted(r["host_ip"] for r in results) == sorted(fleet.ips)
+    assert all(r.get("distribution") == "debian" for r in results)
+
+    # Un seul limiteur pour les deux shards : un seul bilan, qui couvre tous les hôtes
+    summaries = [line for line in capsys.readouterr().out.splitlines() if "Concurrence adaptative" in line]
+    assert len(summaries) == 1
+    summary = json.loads(summaries[0].split(" ", 2)[-1])
+    assert sum(summary["outcomes"].values()) == len(hosts) and summary["max"] == 3
+
+
+def test_runner_audit_task_prints_a_single_summary_line(env, capsys, monkeypatch):
+    from ntl_systoolbox.cli import runner
+
+    tmp_path, key_file, key = env
+    monkeypatch.setattr(m3, "_audit_cache_path", lambda: tmp_path / "audit_cache.json")
+    hosts = [SimHost("127.0.3.21"), SimHost("127.0.3.22", failure=FAIL_DOWN)]
+    with SimFleet(hosts, authorized_key=key) as fleet:
+        capsys.readouterr()
+        result = runner._task_audit({"hosts": fleet.ips, "username": USERNAME, "ssh_key": str(key_file),
+                                     "port": fleet.port, "max_workers": 2})
+    assert result["hosts"] == 2 and result["reachable"] == 1 and len(result["results"]) == 2
+    assert capsys.readouterr().out.splitlines() == ["Audit: 2 hôtes, 1 joignables"]
+
+
+def test_run_command_ssh_hung_command_times_out(env):
+    _, key_file, key = env
+    host = SimHost("127.0.4.1", hang=("sleep",))
+    with SimFleet([host], authorized_key=key) as fleet:
+        result = m3.run_command_ssh(
+            host.ip, USERNAME, str(key_file), ["hostname", "sleep 60"], command_timeout=0.5, port=fleet.port,
+        )
+    assert result["success"] and result["timed_out"]
+    assert result["outputs"]["hostname"]["stdout"] == host.hostname
+    assert result["outputs"]["sleep 60"]["timed_out"] is True
+    assert result["elapsed_ms"] < 5000
+
+
+def test_handshake_hang_is_reported_as_timeout(env):
+    host = SimHost("127.0.4.2", failure=FAIL_HANDSHAKE)
+    with SimFleet([host]) as fleet:
+        with pytest.raises(m3.HandshakeError) as excinfo:
+            m3.open_ssh(host.ip, USERNAME, None, fleet.port, timeout=0.5)
+    assert excinfo.value.timed_out
+
+
+def test_cache_hit_uses_a_single_connection_per_host(env):
+    tmp_path, key_file, key = env
+    host = SimHost("127.0.4.7", distribution="debian", version="12")
+    cache = m3.AuditCache(tmp_path / "cache.json")
+    with SimFleet([host], authorized_key=key) as fleet:
+        first = m3._audit_host(host.ip, USERNAME, str(key_file), cache, None, fleet.port)
+        cache.put(host.ip, first["ssh_fingerprint"], first)
+        commands_run = len(host.commands)
+        second = m3._audit_host(host.ip, USERNAME, str(key_file), cache, None, fleet.port)
+    assert second["cached"] and second["distribution"] == "debian"
+    assert len(host.commands) == commands_run  # aucune commande sur l'hôte inchangé
+    assert second["connect_ms"] > 0
+
+
+def test_audit_connection_outcome_feeds_limiter(env, monkeypatch):
+    _, key_file, key = env
+    released = {}
+
+    class Recorder:
+        def acquire(self, host):
+            pass
+
+        def release(self, host, outcome, latency=None):
+            released[host] = (outcome, latency)
+
+    real_open_ssh = m3.open_ssh
+    monkeypatch.setattr(m3, "open_ssh", lambda *a, **kw: real_open_ssh(*a, timeout=0.5))
+    hosts = [SimHost("127.0.4.3"), SimHost("127.0.4.4", failure=FAIL_HANDSHAKE),
+             SimHost("127.0.4.5", failure=FAIL_DOWN), SimHost("127.0.4.6", failure=FAIL_AUTH)]
+    with SimFleet(hosts, authorized_key=key) as fleet:
+        for host in hosts:
+            m3._audit_host(host.ip, USERNAME, str(key_file), None, Recorder(), fleet.port)
+
+    assert released["127.0.4.3"][0] == OUTCOME_OK and released["127.0.4.3"][1] > 0
+    assert released["127.0.4.4"][0] == OUTCOME_TIMEOUT
+    assert released["127.0.4.5"][0] == OUTCOME_UNREACHABLE
+    assert released["127.0.4.6"][0] == OUTCOME_OK
+
+
+def test_audit_metrics_follow_the_audit_connection(env):
+    from ntl_systoolbox.core.metrics import AUDIT_CONNECT, LAST_SUCCESS
+
+    tmp_path, key_file, key = env
+    hosts = [SimHost("127.0.4.8"), SimHost("127.0.4.9", failure=FAIL_DOWN)]
+    with SimFleet(hosts, authorized_key=key) as fleet:
+        LAST_SUCCESS.set(0, operation="audit")
+        m3.audit_network_ssh_mt(hosts=[hosts[1].ip], username=USERNAME, ssh_key=str(key_file),
+                                port=fleet.port, no_cache=True, adaptive=False, inventory=False)
+        assert LAST_SUCCESS.value(operation="audit") == 0  # tout a échoué
+
+        connects = AUDIT_CONNECT.count()
+        m3.audit_network_ssh_mt(hosts=fleet.ips, username=USERNAME, ssh_key=str(key_file),
+                                port=fleet.port, no_cache=True, adaptive=False, inventory=False)
+    assert AUDIT_CONNECT.count() == connects + 1
+    assert LAST_SUCCESS.value(operation="audit") > 0
+
+
+@pytest.mark.parametrize("os_name,version", [("linux", "22.04"), ("windows", "2022")])
+def test_check_remote_ssh_against_simulated_host(env, os_name, version):
+    tmp_path = env[0]
+    host = SimHost("127.0.5.1", os=os_name, version=version, services_down=("DNS",))
+    with SimFleet([host]) as fleet:
+        report = check_remote_ssh(host.ip, USERNAME, PASSWORD, fleet.port)
+
+    assert report["success"], report.get("error")
+    if os_name == "windows":
+        assert report["os_type"] == "Windows"
+        assert "2022" in report["os"]
+        assert report["uptime"] == "3j 2h"
+        assert report["services"]["NTDS"] == "ACTIF"
+        assert report["services"]["DNS"] != "ACTIF"
+    else:
+        assert report["os_type"] == "Linux"
+        assert report["os"] == "Ubuntu 22.04.4 LTS"
+        assert report["services"] == {"SSSD": "ACTIF", "BIND9": "ACTIF"}
+    with sqlite3.connect(tmp_path / "inventory.sqlite3") as conn:
+        assert conn.execute("SELECT success FROM diag_results WHERE host = ?", (host.ip,)).fetchone() == (1,)
+
+
+def test_check_remote_ssh_auth_failure(env):
+    host = SimHost("127.0.5.2", failure=FAIL_AUTH)
+    with SimFleet([host]) as fleet:
+        report = check_remote_ssh(host.ip, USERNAME, PASSWORD, fleet.port)
+    assert not report["success"] and "error" in report
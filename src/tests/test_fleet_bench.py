@@ -0,0 +1,127 @@
+"""
+Mesures de montée en charge sur le parc simulé (désactivées par défaut).
+
+    NTL_FLEET_BENCH=100,1000,5000 NTL_FLEET_BENCH_OUT=bench.ndjson python -m pytest -q tests/test_fleet_bench.py
+
+Variables facultatives :
+- NTL_FLEET_BENCH_LATENCY : latence par commande en secondes (défaut 0.02)
+- NTL_FLEET_BENCH_FAILURES : une panne tous les N hôtes (défaut 0 = aucune)
+- NTL_FLEET_BENCH_WORKERS : threads d'audit/diagnostic (défaut 50)
+- NTL_FLEET_BENCH_OUT : fichier NDJSON où ajouter les mesures (elles sont
+  aussi jointes au rapport pytest via record_property, ex: --junitxml)
+"""
+import json
+import os
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from fleet_sim import PASSWORD, USERNAME, SimFleet, mixed_fleet, write_client_key
+from ntl_systoolbox.cli import module1_diag
+from ntl_systoolbox.cli import module3_audit as m3
+from ntl_systoolbox.core import ssh_keys
+
+SIZES = [int(n) for n in os.environ.get("NTL_FLEET_BENCH", "").split(",") if n.strip()]
+
+pytestmark = pytest.mark.skipif(not SIZES, reason="NTL_FLEET_BENCH non défini (ex: 100,1000,5000)")
+
+LATENCY = float(os.environ.get("NTL_FLEET_BENCH_LATENCY", "0.02"))
+FAILURES = int(os.environ.get("NTL_FLEET_BENCH_FAILURES", "0"))
+WORKERS = int(os.environ.get("NTL_FLEET_BENCH_WORKERS", "50"))
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _report(record_property, name: str, size: int, elapsed: float, latencies: list[float], rss_before: int,
+            errors: int) -> dict:
+    stats = {
+        "bench": name,
+        "hosts": size,
+        "workers": WORKERS,
+        "latency_s": LATENCY,
+        "elapsed_s": round(elapsed, 2),
+        "hosts_per_s": round(size / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+        "errors": errors,
+        # ru_maxrss en Ko sous Linux ; inclut le parc simulé (même processus)
+        "rss_growth_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+    }
+    for key, value in stats.items():
+        record_property(key, value)
+    out = os.environ.get("NTL_FLEET_BENCH_OUT")
+    if out:
+        with open(out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(stats) + "\n")
+    return stats
+
+
+@pytest.fixture
+def bench_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("NTL_INVENTORY_DB", str(tmp_path / "inventory.sqlite3"))
+    monkeypatch.setattr(ssh_keys, "agent_available", lambda: False)
+    ssh_keys.clear_cache()
+    key_file = tmp_path / "id_rsa"
+    key = write_client_key(key_file)
+    yield tmp_path, key_file, key
+    ssh_keys.clear_cache()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_audit(bench_env, monkeypatch, record_property, size):
+    tmp_path, key_file, key = bench_env
+    latencies: list[float] = []
+    audit_host = m3._audit_host
+
+    def timed_audit_host(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return audit_host(*args, **kwargs)
+        finally:
+            latencies.append(time.monotonic() - started)
+
+    monkeypatch.setattr(m3, "_audit_host", timed_audit_host)
+    with SimFleet(mixed_fleet(size, latency=LATENCY, failure_every=FAILURES), authorized_key=key,
+                  backlog=1024) as fleet:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.monotonic()
+        results = m3.audit_network_ssh_mt(
+            hosts=fleet.ips, username=USERNAME, ssh_key=str(key_file), port=fleet.port,
+            no_cache=True, max_workers=WORKERS, output=str(tmp_path / "audit.ndjson"),
+        )
+        elapsed = time.monotonic() - started
+
+    assert len(results) == size
+    _report(record_property, "audit", size, elapsed, latencies, rss_before, sum(1 for r in results if "error" in r))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_bench_diag(bench_env, record_property, size):
+    latencies: list[float] = []
+
+    def diag(ip: str, port: int) -> dict:
+        started = time.monotonic()
+        try:
+            return module1_diag.check_remote_ssh(ip, USERNAME, PASSWORD, port)
+        finally:
+            latencies.append(time.monotonic() - started)
+
+    with SimFleet(mixed_fleet(size, latency=LATENCY, failure_every=FAILURES), backlog=1024) as fleet:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            reports = list(executor.map(lambda ip: diag(ip, fleet.port), fleet.ips))
+        elapsed = time.monotonic() - started
+
+    assert len(reports) == size
+    _report(record_property, "diag", size, elapsed, latencies, rss_before, sum(1 for r in reports if not r["success"]))
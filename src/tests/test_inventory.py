@@ -0,0 +1,41 @@
+from contextlib import closing
+from pathlib import Path
+
+from ntl_systoolbox.core import inventory as inv
+
+
+def test_audit_results_upsert_latest_host_state(tmp_path: Path):
+    db = tmp_path / "inv.sqlite3"
+    with inv.InventoryWriter("audit", path=db, batch_size=2) as writer:
+        writer.add_audit({"host_ip": "10.0.0.1", "hostname": "srv1", "os_family": "linux",
+                          "distribution": "ubuntu", "version": "18.04", "eol_status": "eol"}, ts=100)
+        writer.add_audit({"host_ip": "10.0.0.2", "os_family": "linux",
+                          "distribution": "ubuntu", "version": "22.04", "eol_status": "supported"}, ts=100)
+        writer.add_audit({"host_ip": "10.0.0.1", "hostname": "srv1", "os_family": "linux",
+                          "distribution": "ubuntu", "version": "22.04", "eol_status": "supported"}, ts=200)
+        # un échec ultérieur ne doit pas effacer le dernier état connu
+        writer.add_audit({"host_ip": "10.0.0.2", "error": "timed out"}, ts=300)
+
+    with closing(inv.connect(db)) as conn:
+        assert [r["host"] for r in inv.query_hosts(conn, distribution="ubuntu", version="18.04")] == []
+        rows = inv.query_hosts(conn, distribution="ubuntu", version="22.04")
+        assert [r["host"] for r in rows] == ["10.0.0.1", "10.0.0.2"]
+        assert rows[1]["last_error"] == "timed out"
+        assert rows[1]["last_seen"] == 100
+
+        history = inv.host_history(conn, "10.0.0.1")
+        assert [(h["ts"], h["version"]) for h in history] == [(200, "22.04"), (100, "18.04")]
+
+
+def test_diag_services_last_down(tmp_path: Path):
+    db = tmp_path / "inv.sqlite3"
+    with inv.InventoryWriter("diag", path=db) as writer:
+        writer.add_diag({"host": "dc1", "success": True, "services": {"NTDS": "KO", "DNS": "ACTIF"}}, ts=100)
+        writer.add_diag({"host": "dc1", "success": True, "services": {"NTDS": "KO", "DNS": "ACTIF"}}, ts=150)
+        writer.add_diag({"host": "dc1", "success": True, "services": {"NTDS": "ACTIF", "DNS": "ACTIF"}}, ts=200)
+        writer.add_diag({"host": "dc2", "success": False, "error": "auth"}, ts=200)
+
+    with closing(inv.connect(db)) as conn:
+        down = inv.service_down(conn, "NTDS")
+        assert [(r["host"], r["ts"], r["occurrences"]) for r in down] == [("dc1", 150, 2)]
+        assert inv.service_down(conn, "DNS") == []
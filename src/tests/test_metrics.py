@@ -0,0 +1,82 @@
+import urllib.request
+from pathlib import Path
+
+from ntl_systoolbox.core.metrics import Registry
+
+
+def test_render_counter_gauge_histogram():
+    reg = Registry()
+    runs = reg.counter("t_runs_total", "Runs")
+    runs.inc(operation="dump", result="success")
+    runs.inc(2, operation="dump", result="success")
+    reg.gauge("t_last", "Last").set(1700000000, operation="dump")
+    hist = reg.histogram("t_seconds", "Durée", buckets=(1.0, 5.0))
+    hist.observe(0.5)
+    hist.observe(3.0)
+
+    text = reg.render()
+    assert "# TYPE t_runs_total counter" in text
+    assert 't_runs_total{operation="dump",result="success"} 3' in text
+    assert 't_last{operation="dump"} 1700000000' in text
+    assert 't_seconds_bucket{le="1"} 1' in text
+    assert 't_seconds_bucket{le="5"} 2' in text
+    assert 't_seconds_bucket{le="+Inf"} 2' in text
+    assert "t_seconds_sum 3.5" in text
+    assert "t_seconds_count 2" in text
+
+
+def test_label_values_are_escaped():
+    reg = Registry()
+    reg.counter("t_total", "x").inc(table='a"b\\c')
+    assert 't_total{table="a\\"b\\\\c"} 1' in reg.render()
+
+
+def test_write_textfile_and_serve(tmp_path: Path):
+    reg = Registry()
+    reg.counter("t_total", "x").inc()
+    target = tmp_path / "textfile" / "ntl.prom"
+    reg.write_textfile(target)
+    assert "t_total 1" in target.read_text(encoding="utf-8")
+    assert [p.name for p in target.parent.iterdir()] == ["ntl.prom"]
+
+    server = reg.serve(0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "t_total 1" in body
+    finally:
+        server.shutdown()
+
+
+def test_gauge_goes_up_and_down_counter_does_not():
+    import pytest
+
+    reg = Registry()
+    gauge = reg.gauge("t_in_flight", "x")
+    gauge.inc(3)
+    gauge.dec()
+    gauge.inc(-1)
+    assert gauge.value() == 1
+    with pytest.raises(ValueError):
+        reg.counter("t_total", "x").inc(-1)
+
+
+def test_textfile_keeps_last_success_of_previous_runs(tmp_path: Path):
+    target = tmp_path / "ntl.prom"
+    first = Registry()
+    first.gauge("t_last_success", "x", persistent=True).set(1700000000, operation='dump "wms"')
+    first.counter("t_runs_total", "x").inc(result="success")
+    first.write_textfile(target)
+
+    # Exécution suivante en échec, ou autre tâche partageant le fichier : pas de nouveau succès
+    second = Registry()
+    last = second.gauge("t_last_success", "x", persistent=True)
+    last.set(1700000500, operation="audit")
+    second.counter("t_runs_total", "x").inc(result="failure")
+    second.write_textfile(target)
+
+    text = target.read_text(encoding="utf-8")
+    assert 't_last_success{operation="dump \\"wms\\""} 1700000000' in text
+    assert 't_last_success{operation="audit"} 1700000500' in text
+    assert 't_runs_total{result="success"}' not in text
+    assert last.value(operation='dump "wms"') == 1700000000
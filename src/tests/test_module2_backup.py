@@ -3,6 +3,7 @@ import types
 from pathlib import Path
 
 import pytest
+import typer
 
 import ntl_systoolbox.cli.module2_backup as m2
 
@@ -174,4 +175,323 @@ def test_dump_sql_missing_env_exits(monkeypatch, tmp_path: Path):
 
     m2.dump_sql()  # ne doit pas crash
     # pas de fichier attendu car env manquante => return direct
-    assert list(tmp_path.glob("*.sql")) == []
\ No newline at end of file
+    assert list(tmp_path.glob("*.sql")) == []
+
+def test_build_select_projection_filter_and_watermark():
+    sql = m2._build_select("orders", ["id", "total"], where="statut = 'livree'", since="updated_at",
+                           watermark="2026-01-01 10:00:00")
+    assert sql == ("SELECT `id`, `total` FROM `orders` WHERE (statut = 'livree')"
+                   " AND `updated_at` >= '2026-01-01 10:00:00' ORDER BY `updated_at`;")
+    assert m2._build_select("o`x", ["a"]) == "SELECT `a` FROM `o``x`;"
+    assert m2._quote_value("it's") == "'it''s'"
+
+
+def test_export_csv_incremental_watermark_round_trip(monkeypatch, tmp_path: Path):
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "p")
+    monkeypatch.setattr(m2, "get_paths", lambda: types.SimpleNamespace(repo_root=tmp_path))
+    monkeypatch.setattr(m2, "_test_db_connection", lambda **kw: True)
+    monkeypatch.setattr(m2, "_list_tables_mysql_client", lambda **kw: ["orders"])
+    monkeypatch.setattr(m2, "_mysql_client_path", lambda: "/usr/bin/mysql")
+    queries = []
+
+    def fake_run(args, stdout=None, stderr=None, env=None, text=None, **kwargs):
+        sql = args[-1]
+        if sql.startswith("SHOW COLUMNS"):
+            return types.SimpleNamespace(returncode=0, stdout="id\tint\ntotal\tint\nday\tdate\n", stderr="")
+        if "information_schema" in sql:
+            return types.SimpleNamespace(returncode=0, stdout="", stderr="")
+        queries.append(sql)
+        return types.SimpleNamespace(returncode=0, stdout="3\t30\t2026-01-03\n4\t40\t2026-01-04\n", stderr="")
+
+    monkeypatch.setattr(m2.subprocess, "run", fake_run)
+    # Export précédent : son manifest porte le filigrane
+    export_dir = tmp_path / "export"
+    export_dir.mkdir()
+    previous = export_dir / "db_orders_20260102_000000.csv"
+    previous.write_text("id;total\n", encoding="utf-8")
+    m2._write_manifest(previous, "export_csv", {"db": "db", "table": "orders", "since": "day",
+                                                "watermark": "2026-01-02"})
+
+    out = m2.export_csv(table="orders", db=None, columns="id,total", where="total > 0", since="day",
+                       dry_run=False, compress=None)
+
+    assert queries == ["SELECT `id`, `total`, `day` FROM `orders` WHERE (total > 0)"
+                       " AND `day` >= '2026-01-02' ORDER BY `day`;"]
+    assert out.read_text(encoding="utf-8").splitlines() == ["id;total", "3;30", "4;40"]
+    manifest = json.loads(Path(str(out) + ".manifest.json").read_text(encoding="utf-8"))
+    assert manifest["extra"]["previous_watermark"] == "2026-01-02"
+    assert manifest["extra"]["watermark"] == "2026-01-04"
+    assert manifest["extra"]["rows"] == 2
+    assert m2._last_watermark(export_dir, "db", "orders", "day") == (
+        "2026-01-04", [m2._row_digest(["4", "40", "2026-01-04"])])
+    assert m2._last_watermark(export_dir, "db", "orders", "id") is None
+
+
+def test_export_csv_incremental_keeps_late_rows_at_watermark(monkeypatch, tmp_path: Path):
+    # Une ligne arrivée après l'export avec la valeur du filigrane n'est pas perdue,
+    # celles déjà exportées à cette valeur ne sont pas dupliquées
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "p")
+    monkeypatch.setattr(m2, "get_paths", lambda: types.SimpleNamespace(repo_root=tmp_path))
+    monkeypatch.setattr(m2, "_test_db_connection", lambda **kw: True)
+    monkeypatch.setattr(m2, "_list_tables_mysql_client", lambda **kw: ["orders"])
+    monkeypatch.setattr(m2, "_mysql_client_path", lambda: "/usr/bin/mysql")
+
+    def fake_run(args, stdout=None, stderr=None, env=None, text=None, **kwargs):
+        sql = args[-1]
+        if sql.startswith("SHOW COLUMNS"):
+            return types.SimpleNamespace(returncode=0, stdout="id\tint\nday\tdate\n", stderr="")
+        if "information_schema" in sql:
+            return types.SimpleNamespace(returncode=0, stdout="", stderr="")
+        return types.SimpleNamespace(returncode=0, stdout="3\t2026-01-04\n4\t2026-01-04\n5\t2026-01-04\n", stderr="")
+
+    monkeypatch.setattr(m2.subprocess, "run", fake_run)
+    export_dir = tmp_path / "export"
+    export_dir.mkdir()
+    previous = export_dir / "db_orders_20260104_000000.csv"
+    previous.write_text("id;day\n3;2026-01-04\n", encoding="utf-8")
+    m2._write_manifest(previous, "export_csv", {"db": "db", "table": "orders", "since": "day",
+                                                "watermark": "2026-01-04",
+                                                "watermark_rows": [m2._row_digest(["3", "2026-01-04"])]})
+
+    out = m2.export_csv(table="orders", db=None, columns=None, where=None, since="day",
+                        dry_run=False, compress=None)
+
+    assert out.read_text(encoding="utf-8").splitlines() == ["id;day", "4;2026-01-04", "5;2026-01-04"]
+    watermark, seen = m2._last_watermark(export_dir, "db", "orders", "day")
+    assert watermark == "2026-01-04"
+    assert sorted(seen) == sorted(m2._row_digest([i, "2026-01-04"]) for i in ("3", "4", "5"))
+
+
+def test_export_csv_rejects_where_with_comments(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(m2, "_mysql_client_path", lambda: "/usr/bin/mysql")
+    monkeypatch.setattr(m2.subprocess, "run", lambda args, **kw: types.SimpleNamespace(
+        returncode=0, stdout="id\tint\n", stderr=""))
+    for where in ("id > 0; DROP TABLE t", "id > 0 -- x", "id > 0 # x", "id > 0 /* x */",
+                  "ref = 'A' # x", "ref = 'A\\\\' -- x", "ref = 'A\\' # non refermée"):
+        assert m2._export_table_csv_mysql_client("h", "u", "p", "db", "t", tmp_path / "t.csv", where=where) is False
+    # Les mêmes caractères dans une chaîne ne sont pas des commentaires
+    for where in ("ref = 'A#1'", "note = 'x -- y; z /* w'", "ref = 'it''s #1'"):
+        assert m2._export_table_csv_mysql_client("h", "u", "p", "db", "t", tmp_path / "t.csv", where=where) is True
+
+
+def test_export_csv_rejects_unknown_columns(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(m2, "_mysql_client_path", lambda: "/usr/bin/mysql")
+    monkeypatch.setattr(m2.subprocess, "run", lambda args, **kw: types.SimpleNamespace(
+        returncode=0, stdout="id\tint\n", stderr=""))
+    ok = m2._export_table_csv_mysql_client("h", "u", "p", "db", "orders", tmp_path / "o.csv", 3306,
+                                           columns=["id", "secret"])
+    assert ok is False and not (tmp_path / "o.csv").exists()
+
+
+def test_export_csv_db_option_overrides_env(monkeypatch):
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "p")
+    assert m2._mysql_settings(None, "autre")[4] == "autre"
+    assert m2._mysql_settings(None)[4] == "db"
+
+
+def test_export_csv_chunked_gzip_pages_on_primary_key(monkeypatch, tmp_path: Path):
+    import gzip
+
+    monkeypatch.setattr(m2, "_mysql_client_path", lambda: "/usr/bin/mysql")
+    queries = []
+    pages = ["a\t1\nb\t2\n", "c\t3\n"]
+
+    def fake_run(args, stdout=None, stderr=None, env=None, text=None, **kwargs):
+        sql = args[-1]
+        if sql.startswith("SHOW COLUMNS"):
+            return types.SimpleNamespace(returncode=0, stdout="id\tint\nname\ttext\n", stderr="")
+        queries.append(sql)
+        return types.SimpleNamespace(returncode=0, stdout=pages[len(queries) - 1], stderr="")
+
+    monkeypatch.setattr(m2.subprocess, "run", fake_run)
+    out = tmp_path / "o.csv.gz"
+    stats = {}
+    ok = m2._export_table_csv_mysql_client("h", "u", "p", "db", "t", out, 3306, columns=["name"],
+                                           stats=stats, chunk_size=2, key="id", compress=True)
+    assert ok is True and stats["rows"] == 3
+    assert queries == ["SELECT `name`, `id` FROM `t` ORDER BY `id` LIMIT 2;",
+                       "SELECT `name`, `id` FROM `t` WHERE `id` > '2' ORDER BY `id` LIMIT 2;"]
+    assert gzip.open(out, "rt", encoding="utf-8").read().splitlines() == ["name", "a", "b", "c"]
+
+
+def test_export_csv_incremental_chunks_on_since_then_key(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(m2, "_mysql_client_path", lambda: "/usr/bin/mysql")
+    queries = []
+    pages = ["1\tNULL\n2\t2026-01-04\n", "3\t2026-01-04\n4\t2026-01-05\n", "5\t2026-01-05\n"]
+
+    def fake_run(args, stdout=None, stderr=None, env=None, text=None, **kwargs):
+        sql = args[-1]
+        if sql.startswith("SHOW COLUMNS"):
+            return types.SimpleNamespace(returncode=0, stdout="id\tint\nday\tdate\n", stderr="")
+        queries.append(sql)
+        return types.SimpleNamespace(returncode=0, stdout=pages[len(queries) - 1], stderr="")
+
+    monkeypatch.setattr(m2.subprocess, "run", fake_run)
+    stats = {}
+    ok = m2._export_table_csv_mysql_client("h", "u", "p", "db", "t", tmp_path / "t.csv", 3306, columns=["id"],
+                                           since="day", stats=stats, chunk_size=2, key="id")
+    assert ok is True and stats["rows"] == 5 and stats["watermark"] == "2026-01-05"
+    assert queries == [
+        "SELECT `id`, `day` FROM `t` ORDER BY `day`, `id` LIMIT 2;",
+        "SELECT `id`, `day` FROM `t` WHERE (`day` > '2026-01-04' OR (`day` = '2026-01-04' AND `id` > '2'))"
+        " ORDER BY `day`, `id` LIMIT 2;",
+        "SELECT `id`, `day` FROM `t` WHERE (`day` > '2026-01-05' OR (`day` = '2026-01-05' AND `id` > '4'))"
+        " ORDER BY `day`, `id` LIMIT 2;",
+    ]
+    assert m2._build_select("t", ["id"], since="day", key="id", after="1", limit=2, after_since=None) == (
+        "SELECT `id` FROM `t` WHERE (`day` IS NOT NULL OR `id` > '1') ORDER BY `day`, `id` LIMIT 2;")
+    assert (tmp_path / "t.csv").read_text(encoding="utf-8").splitlines() == ["id", "1", "2", "3", "4", "5"]
+
+
+def test_dump_sql_dry_run_writes_nothing(monkeypatch, tmp_path: Path):
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "p")
+    monkeypatch.setattr(m2, "get_paths", lambda: types.SimpleNamespace(sauvegarde_dir=tmp_path, repo_root=tmp_path))
+    monkeypatch.setattr(m2, "_test_db_connection", lambda **kw: True)
+    monkeypatch.setattr(m2, "_table_stats", lambda *a: [m2.TableStats("orders", 10, 3 << 30),
+                                                         m2.TableStats("stock", 10, 1 << 30)])
+    monkeypatch.setattr(m2, "_perform_mysqldump", lambda **kw: pytest.fail("dump lancé en --dry-run"))
+
+    assert m2._dump_sql(None, dry_run=True) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_parallel_dump_appends_views_after_tables(monkeypatch, tmp_path: Path):
+    import os
+
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "p")
+    monkeypatch.setattr(m2, "get_paths", lambda: types.SimpleNamespace(sauvegarde_dir=tmp_path / "sauvegarde"))
+    (tmp_path / "sauvegarde").mkdir()
+    monkeypatch.setattr(m2, "_test_db_connection", lambda **kw: True)
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "mysqldump").write_text('#!/bin/sh\necho "-- dump $*"\n')
+    (bin_dir / "mysql").write_text(
+        '#!/bin/sh\ncase "$*" in\n  *information_schema.VIEWS*) echo v_stock ;;\n'
+        '  *) printf "orders\\t10\\t1000\\t0\\nstock\\t10\\t1000\\t0\\n" ;;\nesac\n')
+    for tool in ("mysqldump", "mysql"):
+        (bin_dir / tool).chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    out = m2._dump_sql(None, strategy="parallel", compress=False)
+
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert [line.rsplit(" ", 1)[-1] for line in lines] == ["orders", "stock", "v_stock"]
+    assert "--no-data --skip-triggers db v_stock" in lines[-1]
+    manifest = json.loads(Path(str(out) + ".manifest.json").read_text(encoding="utf-8"))
+    assert manifest["extra"]["views"] == ["v_stock"]
+
+
+def test_failed_dump_writes_no_placeholder(monkeypatch, tmp_path: Path):
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "p")
+    monkeypatch.setattr(m2, "get_paths", lambda: types.SimpleNamespace(sauvegarde_dir=tmp_path))
+    monkeypatch.setattr(m2, "_test_db_connection", lambda **kw: True)
+    monkeypatch.setattr(m2, "_table_stats", lambda *a: [])
+
+    def failing_dump(**kw):
+        kw["out"].write_bytes(b"\x1f\x8b partiel")
+        return False
+
+    monkeypatch.setattr(m2, "_perform_mysqldump", failing_dump)
+    assert m2._dump_sql(None, compress=True) is None
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(typer.Exit) as exc:
+        m2.dump_sql(dry_run=False, strategy="auto", compress=True, ssh_host=None, ssh_user=None,
+                    ssh_port=None, ssh_key=None)
+    assert exc.value.exit_code == 1
+
+
+def _sim_mysql_host(ip: str, bin_dir: Path):
+    """Hôte simulé qui exécute réellement la commande reçue (sh) avec de faux mysqldump / mysql."""
+    import os
+    import subprocess
+
+    from fleet_sim import SimHost
+
+    # Faux clients : vérifient le mot de passe lu dans le fichier d'options (stdin)
+    check = 'grep -q \'^password="s3cr\\\\\\\\et"$\' "${1#--defaults-extra-file=}" || { echo "Access denied" >&2; exit 2; }\n'
+    (bin_dir / "mysqldump").write_text("#!/bin/sh\n" + check + 'echo "-- dump $*"\nseq 1 5000 | sed "s/.*/INSERT INTO t VALUES (&);/"\n')
+    (bin_dir / "mysql").write_text("#!/bin/sh\n" + check + 'printf "orders\\t5000\\t65536\\t0\\norders\\tid\\n"\n')
+    for tool in ("mysqldump", "mysql"):
+        (bin_dir / tool).chmod(0o755)
+
+    def run(cmd: str, stdin: bytes):
+        env = dict(os.environ, PATH=f"{bin_dir}:{os.environ['PATH']}")
+        proc = subprocess.run(["sh", "-c", cmd], input=stdin, capture_output=True, env=env)
+        return proc.stdout, proc.stderr, proc.returncode
+
+    return SimHost(ip, handlers={"mysqldump": run, "mysql ": run})
+
+
+@pytest.fixture
+def ssh_key_cache(monkeypatch):
+    from ntl_systoolbox.core import ssh_keys
+
+    monkeypatch.setattr(ssh_keys, "agent_available", lambda: False)
+    ssh_keys.clear_cache()
+    yield ssh_keys
+    ssh_keys.clear_cache()
+
+
+def test_remote_dump_streams_gzip_from_ssh_host(monkeypatch, tmp_path: Path, ssh_key_cache):
+    import gzip
+
+    from fleet_sim import USERNAME, SimFleet, write_client_key
+
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "s3cr\\et")
+    monkeypatch.setattr(m2, "get_paths", lambda: types.SimpleNamespace(sauvegarde_dir=tmp_path / "sauvegarde"))
+    (tmp_path / "sauvegarde").mkdir()
+    monkeypatch.setattr(m2, "_test_db_connection", lambda **kw: pytest.fail("test local inutile en mode distant"))
+    key_file = tmp_path / "id_rsa"
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    host = _sim_mysql_host("127.0.7.1", bin_dir)
+
+    with SimFleet([host], authorized_key=write_client_key(key_file)) as fleet:
+        out = m2._dump_sql(None, ssh=(host.ip, USERNAME, fleet.port, str(key_file)))
+
+    assert out.name.endswith(".sql.gz")
+    sql = gzip.open(out).read()
+    assert sql.startswith(b"-- dump --defaults-extra-file=/dev/stdin -h 127.0.0.1 -P 3306 -u user db")
+    assert "s3cr" not in "".join(host.commands)
+    manifest = json.loads(Path(str(out) + ".manifest.json").read_text(encoding="utf-8"))
+    assert manifest["extra"]["raw_bytes"] == len(sql) > manifest["size_bytes"]
+    assert manifest["extra"]["ssh_host"] == host.ip and manifest["extra"]["estimated_bytes"] == 65536
+
+
+def test_remote_dump_rejects_parallel_and_uncompressed(monkeypatch, tmp_path: Path):
+    _set_min_env(monkeypatch)
+    monkeypatch.setenv("MYSQL_PASSWORD", "p")
+    monkeypatch.setattr(m2, "get_paths", lambda: types.SimpleNamespace(sauvegarde_dir=tmp_path))
+    monkeypatch.setattr(m2, "_dump_sql_remote", lambda *a: pytest.fail("options ignorées en silence"))
+    ssh = ("10.0.0.5", "backup", 22, None)
+
+    assert m2._dump_sql(None, strategy="parallel", ssh=ssh) is None
+    assert m2._dump_sql(None, compress=False, ssh=ssh) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_remote_dump_reports_mysqldump_failure(monkeypatch, tmp_path: Path):
+    import paramiko
+
+    from fleet_sim import PASSWORD, USERNAME, SimFleet
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    host = _sim_mysql_host("127.0.7.2", bin_dir)
+    out = tmp_path / "wms.sql.gz"
+    with SimFleet([host]) as fleet:
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(host.ip, port=fleet.port, username=USERNAME, password=PASSWORD)
+        try:
+            ok = m2._perform_remote_mysqldump(client, "127.0.0.1", "user", "mauvais", "db", out)
+        finally:
+            client.close()
+    assert ok is False
@@ -0,0 +1,309 @@
+from pathlib import Path
+
+from ntl_systoolbox.core.audit_cache import AuditCache
+
+
+def test_audit_cache_hit_requires_same_fingerprint_and_ttl(tmp_path: Path):
+    cache = AuditCache(tmp_path / "cache.json", ttl=60)
+    cache.put("10.0.0.1", "fp1", {"hostname": "srv1", "os_family": "linux"}, now=1000)
+
+    assert cache.get("10.0.0.1", "fp1", now=1030)["hostname"] == "srv1"
+    assert cache.get("10.0.0.1", "fp2", now=1030) is None   # clé d'hôte changée
+    assert cache.get("10.0.0.1", "fp1", now=1100) is None   # TTL expiré
+    assert cache.get("10.0.0.2", "fp1", now=1030) is None
+
+
+def test_audit_cache_persists_and_ignores_errors(tmp_path: Path):
+    path = tmp_path / "cache.json"
+    cache = AuditCache(path, ttl=60)
+    cache.put("10.0.0.1", "fp1", {"hostname": "srv1"}, now=1000)
+    cache.put("10.0.0.2", "fp2", {"error": "timeout"}, now=1000)
+    cache.save()
+
+    reloaded = AuditCache(path, ttl=60)
+    assert reloaded.get("10.0.0.1", "fp1", now=1010) == {"hostname": "srv1"}
+    assert reloaded.get("10.0.0.2", "fp2", now=1010) is None
+
+
+def test_audit_cache_corrupt_file_is_ignored(tmp_path: Path):
+    path = tmp_path / "cache.json"
+    path.write_text("{pas du json", encoding="utf-8")
+    assert AuditCache(path).get("10.0.0.1", "fp") is None
+
+
+def _write_records(path: Path, records: list[dict], as_array: bool) -> None:
+    import json
+    if as_array:
+        path.write_text(json.dumps(records, indent=2), encoding="utf-8")
+    else:
+        path.write_text("\n".join(json.dumps(r) for r in records) + "\n", encoding="utf-8")
+
+
+def _sample_records() -> list[dict]:
+    return [
+        {"host_ip": "10.0.0.1", "os_family": "linux", "distribution": "ubuntu", "version": "18.04"},
+        {"host_ip": "10.0.0.2", "os_family": "linux", "distribution": "ubuntu", "version": "24.04"},
+        {"host_ip": "10.0.0.3", "os_family": "windows", "distribution": "windows-server",
+         "version": "Microsoft Windows [Version 6.3.9600]"},
+        {"host_ip": "10.0.0.4", "error": "timed out"},
+    ]
+
+
+def test_iter_audit_records_reads_ndjson_and_json_array(tmp_path: Path):
+    from ntl_systoolbox.core.audit_report import iter_audit_records
+
+    for as_array in (False, True):
+        path = tmp_path / f"audit_{as_array}.json"
+        _write_records(path, _sample_records(), as_array)
+        assert [r["host_ip"] for r in iter_audit_records(path)] == ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"]
+
+
+def test_iter_audit_records_skips_progress_lines(tmp_path: Path):
+    from ntl_systoolbox.core.audit_report import iter_audit_records
+
+    path = tmp_path / "audit.ndjson"
+    path.write_text('[blue]Tentative de connexion à 10.0.0.1...[/blue]\n{"host_ip": "10.0.0.1"}\n', encoding="utf-8")
+    assert list(iter_audit_records(path)) == [{"host_ip": "10.0.0.1"}]
+
+
+def test_iter_audit_records_reads_audit_stdout(tmp_path: Path):
+    import json
+
+    from ntl_systoolbox.core.audit_report import iter_audit_records
+
+    # Sortie standard d'audit-network-ssh-mt : progression, bilan, puis tableau indenté
+    path = tmp_path / "audit_stdout.txt"
+    path.write_text(
+        "[green]Début du scan de 4 hôtes (1 processus)...[/green]\n"
+        "[blue]Tentative de connexion à 10.0.0.1...[/blue]\n"
+        '[green]Concurrence adaptative:[/green] {"mode": "adaptive", "final": 8}\n'
+        "[green]Audit terminé[/green]\n" + json.dumps(_sample_records(), indent=2) + "\n",
+        encoding="utf-8",
+    )
+    assert [r["host_ip"] for r in iter_audit_records(path)] == ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"]
+
+
+def test_aggregate_and_write_report(tmp_path: Path):
+    from datetime import date
+
+    from ntl_systoolbox.core.audit_report import aggregate_file, write_report
+
+    path = tmp_path / "audit.ndjson"
+    _write_records(path, _sample_records(), as_array=False)
+    agg = aggregate_file(path, top=1, today=date(2026, 1, 15))
+
+    summary = agg.summary()
+    assert summary["total"] == 4
+    assert summary["unreachable"] == 1
+    assert summary["by_os"] == {"linux": 2, "windows": 1}
+    assert summary["by_eol_status"]["eol"] == 2
+    # le plus en retard : Ubuntu 18.04 (2023-05-31) avant Windows Server 2012 R2 (2023-10-10)
+    assert [o["host"] for o in summary["top_offenders"]] == ["10.0.0.1"]
+
+    written = write_report(agg, tmp_path / "rapport", "audit", ["md", "html", "csv"])
+    assert [p.suffix for p in written] == [".md", ".html", ".csv"]
+    assert "10.0.0.4" in written[0].read_text(encoding="utf-8")
+
+
+def test_aggregator_by_version_is_normalised_and_bounded():
+    from ntl_systoolbox.core.audit_report import OTHER_VERSIONS, AuditAggregator
+
+    agg = AuditAggregator(max_versions=3)
+    # Builds Windows sans produit EOL connu : une entrée par build, pas par révision
+    for rev in range(50):
+        agg.add({"os_family": "windows", "version": f"Microsoft Windows [Version 10.0.19045.{rev}]"})
+    for version in ("1.0", "2.0", "3.0", "4.0"):
+        agg.add({"os_family": "linux", "distribution": "arch", "version": version})
+
+    assert agg.summary()["by_version"] == {"windows 10.0.19045": 50, "arch 1.0": 1, "arch 2.0": 1,
+                                           OTHER_VERSIONS: 2}
+
+
+def test_adaptive_limiter_interleaves_subnets():
+    from ntl_systoolbox.core.concurrency import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=4)
+    order = limiter.register(["10.0.1.1", "10.0.1.2", "10.0.2.1", "10.0.2.2"])
+    assert order == ["10.0.1.1", "10.0.2.1", "10.0.1.2", "10.0.2.2"]
+
+
+def test_adaptive_limiter_aimd():
+    from ntl_systoolbox.core.concurrency import AdaptiveLimiter, OUTCOME_OK, OUTCOME_REFUSED, OUTCOME_UNREACHABLE
+
+    limiter = AdaptiveLimiter(min_limit=2, max_limit=10, initial=4, latency_target=1.0)
+    hosts = limiter.register([f"10.0.0.{i}" for i in range(1, 40)])
+
+    # une fenêtre complète de succès rapides => +1
+    for host in hosts[:4]:
+        limiter.acquire(host)
+        limiter.release(host, OUTCOME_OK, latency=0.05)
+    assert limiter.limit == 5
+
+    # hôtes morts : aucun effet sur la limite
+    for host in hosts[4:8]:
+        limiter.acquire(host)
+        limiter.release(host, OUTCOME_UNREACHABLE)
+    assert limiter.limit == 5
+
+    # refus de poignée de main => division par 2, une seule fois par fenêtre
+    for host in hosts[8:10]:
+        limiter.acquire(host)
+        limiter.release(host, OUTCOME_REFUSED)
+    assert limiter.limit == 2
+
+    summary = limiter.summary()
+    assert summary["peak"] == 5 and summary["final"] == 2
+    assert summary["increases"] == 1 and summary["decreases"] == 1
+    assert summary["outcomes"]["refused"] == 2
+
+
+def test_adaptive_limiter_subnet_fair_share():
+    from ntl_systoolbox.core.concurrency import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=4, initial=4)
+    limiter.register(["10.0.1.1", "10.0.1.2", "10.0.1.3", "10.0.2.1"])
+    # deux /24 actifs => 2 créneaux max chacun
+    assert limiter._subnet_cap() == 2
+
+
+def test_ssh_key_cached_and_passphrase_asked_once(tmp_path: Path, monkeypatch):
+    import paramiko
+
+    from ntl_systoolbox.core import ssh_keys
+
+    key_file = tmp_path / "id_rsa"
+    paramiko.RSAKey.generate(1024).write_private_key_file(str(key_file), password="secret")
+    ssh_keys.clear_cache()
+    monkeypatch.setattr(ssh_keys, "agent_available", lambda: False)
+    monkeypatch.setenv(ssh_keys.PASSPHRASE_ENV, "secret")
+    reads = []
+    real_read = ssh_keys._read_key
+    monkeypatch.setattr(ssh_keys, "_read_key", lambda p, pw: reads.append(pw) or real_read(p, pw))
+
+    try:
+        assert ssh_keys.key_needs_passphrase(str(key_file))
+        reads.clear()
+        first = ssh_keys.connect_kwargs(str(key_file))
+        second = ssh_keys.connect_kwargs(str(key_file))
+        assert first["pkey"] is second["pkey"]
+        assert first["look_for_keys"] is False and "key_filename" not in first
+        assert reads == [None, "secret"]
+    finally:
+        ssh_keys.clear_cache()
+
+
+def test_encrypted_key_prompts_when_agent_lacks_its_identity(tmp_path: Path, monkeypatch):
+    import paramiko
+
+    from ntl_systoolbox.core import ssh_keys
+
+    key = paramiko.RSAKey.generate(1024)
+    key_file = tmp_path / "id_rsa"
+    key.write_private_key_file(str(key_file), password="secret")
+    (tmp_path / "id_rsa.pub").write_text(f"{key.get_name()} {key.get_base64()}\n", encoding="utf-8")
+    monkeypatch.setenv(ssh_keys.PASSPHRASE_ENV, "secret")
+
+    try:
+        # agent joignable mais sans cette identité : on déchiffre la clé
+        ssh_keys.clear_cache()
+        monkeypatch.setattr(ssh_keys, "_agent_key_blobs", lambda: [b"autre identite"])
+        kwargs = ssh_keys.connect_kwargs(str(key_file))
+        assert kwargs["allow_agent"] is True and kwargs["pkey"].asbytes() == key.asbytes()
+        assert ssh_keys.resolve_passphrase(str(key_file)) == "secret"
+
+        # l'agent détient la clé : il signe, rien n'est déchiffré ni demandé
+        ssh_keys.clear_cache()
+        monkeypatch.setattr(ssh_keys, "_agent_key_blobs", lambda: [key.asbytes()])
+        kwargs = ssh_keys.connect_kwargs(str(key_file))
+        assert kwargs["allow_agent"] is True and "pkey" not in kwargs and "key_filename" not in kwargs
+        assert ssh_keys.resolve_passphrase(str(key_file)) is None
+    finally:
+        ssh_keys.clear_cache()
+
+
+def test_public_blob_read_from_encrypted_openssh_header(tmp_path: Path):
+    import shutil
+    import subprocess
+
+    import paramiko
+    import pytest
+
+    from ntl_systoolbox.core import ssh_keys
+
+    if shutil.which("ssh-keygen") is None:
+        pytest.skip("ssh-keygen absent")
+    key_file = tmp_path / "id_ed25519"
+    subprocess.run(["ssh-keygen", "-q", "-t", "ed25519", "-N", "secret", "-f", str(key_file)], check=True)
+    (tmp_path / "id_ed25519.pub").unlink()
+    expected = paramiko.PKey.from_path(key_file, b"secret").asbytes()
+    try:
+        assert ssh_keys._public_blob(str(key_file)) == expected
+        assert ssh_keys.key_needs_passphrase(str(key_file))
+    finally:
+        ssh_keys.clear_cache()
+
+
+class _LateOutputChannel:
+    """Canal dont la sortie arrive entre le premier recv_ready() et le test de fin."""
+
+    eof_received = True
+    closed = False
+
+    def __init__(self):
+        self._checks = 0
+        self._data = [b"fin de la sortie"]
+
+    def exec_command(self, cmd):
+        pass
+
+    def recv_ready(self):
+        self._checks += 1
+        return self._checks > 1 and bool(self._data)
+
+    def recv(self, size):
+        return self._data.pop(0)
+
+    def recv_stderr_ready(self):
+        return False
+
+    def exit_status_ready(self):
+        return True
+
+    def recv_exit_status(self):
+        return 0
+
+    def close(self):
+        self.closed = True
+
+
+def test_collect_outputs_keeps_output_received_with_exit_status():
+    import time
+    import types
+
+    from ntl_systoolbox.cli import module3_audit as m3
+
+    transport = types.SimpleNamespace(open_session=lambda timeout: _LateOutputChannel())
+    result = {"outputs": {}}
+    m3._collect_outputs(transport, ["cat /etc/os-release"], 1.0, time.monotonic() + 5, result)
+    output = result["outputs"]["cat /etc/os-release"]
+    assert output["stdout"] == "fin de la sortie"
+    assert output["exit_status"] == 0 and output["timed_out"] is False
+
+
+def test_adaptive_limiter_acquire_is_woken_by_release():
+    import threading
+    import time
+
+    from ntl_systoolbox.core.concurrency import AdaptiveLimiter, OUTCOME_OK
+
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=1, initial=1)
+    limiter.register(["10.0.0.1", "10.0.0.2"])
+    limiter.acquire("10.0.0.1")
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire("10.0.0.2"), acquired.set()))
+    waiter.start()
+    assert not acquired.wait(0.1)
+    started = time.monotonic()
+    limiter.release("10.0.0.1", OUTCOME_OK, latency=0.01)
+    assert acquired.wait(2) and time.monotonic() - started < 0.3
+    waiter.join()
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+
+from ntl_systoolbox.core.jobs import STATUS_FAILED, STATUS_SKIPPED, STATUS_SUCCESS, parse_plan, run_plan
+
+
+def test_parse_plan_rejects_cycles_and_unknown_refs():
+    with pytest.raises(ValueError, match="cycle"):
+        parse_plan({"tasks": [
+            {"id": "a", "type": "t", "depends_on": ["b"]},
+            {"id": "b", "type": "t", "depends_on": ["a"]},
+        ]})
+    with pytest.raises(ValueError, match="inconnue"):
+        parse_plan({"tasks": [{"id": "a", "type": "t", "depends_on": ["zzz"]}]})
+    with pytest.raises(ValueError, match="non déclarée"):
+        parse_plan({"tasks": [{"id": "a", "type": "t", "resources": ["db"]}]})
+    with pytest.raises(ValueError, match="Type de tâche inconnu"):
+        parse_plan({"tasks": [{"id": "a", "type": "t"}]}, known_types={"diag"})
+
+
+def test_run_plan_runs_independent_tasks_concurrently():
+    plan = parse_plan({"max_parallel": 3, "tasks": [
+        {"id": "a", "type": "sleep"},
+        {"id": "b", "type": "sleep"},
+        {"id": "c", "type": "sleep"},
+    ]})
+    started = time.monotonic()
+    results = run_plan(plan, {"sleep": lambda p: time.sleep(0.3)})
+    assert time.monotonic() - started < 0.8
+    assert [r.status for r in results] == [STATUS_SUCCESS] * 3
+
+
+def test_run_plan_respects_dependencies_and_resources():
+    lock = threading.Lock()
+    state = {"db_in_use": 0, "max_db": 0, "order": []}
+
+    def use_db(params):
+        with lock:
+            state["db_in_use"] += 1
+            state["max_db"] = max(state["max_db"], state["db_in_use"])
+        time.sleep(0.05)
+        with lock:
+            state["db_in_use"] -= 1
+            state["order"].append(params["name"])
+
+    plan = parse_plan({"max_parallel": 4, "resources": {"db": 1}, "tasks": [
+        {"id": "dump", "type": "db", "params": {"name": "dump"}, "resources": ["db"]},
+        {"id": "export1", "type": "db", "params": {"name": "export1"}, "resources": ["db"], "depends_on": ["dump"]},
+        {"id": "export2", "type": "db", "params": {"name": "export2"}, "resources": ["db"], "depends_on": ["dump"]},
+    ]})
+    results = run_plan(plan, {"db": use_db})
+    assert all(r.status == STATUS_SUCCESS for r in results)
+    assert state["max_db"] == 1
+    assert state["order"][0] == "dump"
+
+
+def test_run_plan_retries_then_skips_dependents():
+    calls = {"n": 0}
+
+    def flaky(params):
+        calls["n"] += 1
+        raise RuntimeError("KO")
+
+    plan = parse_plan({"tasks": [
+        {"id": "a", "type": "flaky", "retries": 2, "retry_delay": 0},
+        {"id": "b", "type": "ok", "depends_on": ["a"]},
+        {"id": "c", "type": "ok", "depends_on": ["b"]},
+    ]})
+    results = run_plan(plan, {"flaky": flaky, "ok": lambda p: "fait"})
+    assert calls["n"] == 3
+    assert [r.status for r in results] == [STATUS_FAILED, STATUS_SKIPPED, STATUS_SKIPPED]
+    assert results[0].attempts == 3 and results[0].error == "KO"
+
+
+def test_duplicate_resource_takes_a_single_slot():
+    plan = parse_plan({"resources": {"db": 1}, "tasks": [
+        {"id": "a", "type": "ok", "resources": ["db", "db"]},
+        {"id": "b", "type": "ok", "resources": ["db"], "depends_on": ["a"]},
+    ]})
+    assert plan.tasks[0].resources == ["db"]
+    results = run_plan(plan, {"ok": lambda p: "fait"})
+    assert [r.status for r in results] == [STATUS_SUCCESS, STATUS_SUCCESS]
+
+
+def test_run_refuses_mysql_tasks_without_password(tmp_path, monkeypatch):
+    import json
+
+    import typer
+
+    from ntl_systoolbox.cli import runner
+
+    monkeypatch.delenv("MYSQL_PASSWORD", raising=False)
+    monkeypatch.setattr("getpass.getpass", lambda *a, **k: pytest.fail("saisie depuis un thread"))
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps({"tasks": [{"id": "dump", "type": "backup.dump"}]}), encoding="utf-8")
+    with pytest.raises(typer.Exit) as exc:
+        runner.run(plan_file, output=None, max_parallel=None)
+    assert exc.value.exit_code == 2
+    with pytest.raises(ValueError, match="MYSQL_PASSWORD"):
+        runner._task_export({"table": "orders"})
+
+
+def test_run_reads_mysql_password_from_dotenv(tmp_path, monkeypatch):
+    import json
+    import os
+
+    from ntl_systoolbox.cli import runner
+    from ntl_systoolbox.core import paths
+
+    monkeypatch.delenv("MYSQL_PASSWORD", raising=False)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env").write_text("MYSQL_PASSWORD=depuis-dotenv\n", encoding="utf-8")
+    paths.load_env.cache_clear()
+    monkeypatch.setitem(runner.TASK_HANDLERS, "backup.dump", lambda p: runner._require_mysql_password() or "ok")
+    plan_file = tmp_path / "plan.json"
+    plan_file.write_text(json.dumps({"tasks": [{"id": "dump", "type": "backup.dump"}]}), encoding="utf-8")
+    try:
+        summary = runner.run(plan_file, output=tmp_path / "out.json", max_parallel=None)
+    finally:
+        paths.load_env.cache_clear()
+        os.environ.pop("MYSQL_PASSWORD", None)  # posé par load_dotenv, hors monkeypatch
+    assert summary["success"] is True
+
+
+def test_parse_plan_rejects_malformed_fields():
+    with pytest.raises(ValueError, match="params"):
+        parse_plan({"tasks": [{"id": "a", "type": "t", "params": ["x"]}]})
+    with pytest.raises(ValueError, match="depends_on"):
+        parse_plan({"tasks": [{"id": "a", "type": "t", "depends_on": "b"}]})
+    with pytest.raises(ValueError, match="retries"):
+        parse_plan({"tasks": [{"id": "a", "type": "t", "retries": -1}]})
+
+
+@pytest.mark.parametrize("name, content", [
+    ("plan.yaml", "tasks: [\n  - id: a\n"),
+    ("plan.json", '{"tasks": [{"id": "a", "type": "diag", "retries": [1]}]}'),
+    ("plan.json", '{"tasks": [{"id": "a", "type": "diag", "params": "host=x"}]}'),
+])
+def test_run_reports_invalid_plan_without_traceback(tmp_path, capsys, name, content):
+    import typer
+
+    from ntl_systoolbox.cli import runner
+
+    if name.endswith(".yaml"):
+        pytest.importorskip("yaml")
+    plan_file = tmp_path / name
+    plan_file.write_text(content, encoding="utf-8")
+    with pytest.raises(typer.Exit) as exc:
+        runner.run(plan_file, output=None, max_parallel=None)
+    assert exc.value.exit_code == 2
+    assert "Plan invalide" in capsys.readouterr().out
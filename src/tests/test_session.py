@@ -0,0 +1,129 @@
+from pathlib import Path
+
+import pytest
+
+from fleet_sim import FAIL_DOWN, PASSWORD, USERNAME, SimFleet, SimHost, write_client_key
+from ntl_systoolbox.cli import module3_audit as m3
+from ntl_systoolbox.cli.module1_diag import check_remote_ssh
+from ntl_systoolbox.core import session as session_mod
+from ntl_systoolbox.core import ssh_keys
+from ntl_systoolbox.core.session import SessionContext
+
+
+@pytest.fixture
+def session(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("NTL_INVENTORY_DB", str(tmp_path / "inventory.sqlite3"))
+    monkeypatch.setattr(ssh_keys, "agent_available", lambda: False)
+    ssh_keys.clear_cache()
+    ctx = SessionContext()
+    yield ctx
+    ctx.close()
+    ssh_keys.clear_cache()
+
+
+def test_secret_is_asked_once(session, monkeypatch):
+    asked = []
+    monkeypatch.setattr(session_mod.getpass, "getpass", lambda prompt: asked.append(prompt) or "pw")
+    assert session.secret("mysql", "MySQL password: ") == "pw"
+    assert session.secret("mysql", "MySQL password: ") == "pw"
+    assert asked == ["MySQL password: "]
+    session.forget_secret("mysql")
+    session.secret("mysql", "MySQL password: ")
+    assert len(asked) == 2
+
+
+def test_warmed_ssh_connection_is_reused(session, tmp_path: Path):
+    key_file = tmp_path / "id_rsa"
+    key = write_client_key(key_file)
+    host = SimHost("127.0.6.1", distribution="debian", version="12")
+    with SimFleet([host], authorized_key=key) as fleet:
+        session.warm_ssh(host.ip, USERNAME, fleet.port, key_path=str(key_file)).result(timeout=10)
+        client = session.ssh(host.ip, USERNAME, fleet.port, key_path=str(key_file))
+        first = m3.audit_system_on(client, host.ip)
+        second = m3.audit_system_on(session.ssh(host.ip, USERNAME, fleet.port), host.ip)
+        assert session.ssh(host.ip, USERNAME, fleet.port) is client
+
+        report = check_remote_ssh(host.ip, USERNAME, PASSWORD, fleet.port,
+                                  client=session.ssh(host.ip, USERNAME, fleet.port))
+        assert client.get_transport().is_active()
+    assert first["distribution"] == second["distribution"] == "debian"
+    assert report["success"] and report["os_type"] == "Linux"
+
+
+def test_dead_connection_is_reopened(session):
+    host = SimHost("127.0.6.2")
+    with SimFleet([host]) as fleet:
+        client = session.ssh(host.ip, USERNAME, fleet.port, password=PASSWORD)
+        client.close()
+        again = session.ssh(host.ip, USERNAME, fleet.port, password=PASSWORD)
+        assert again is not client and again.get_transport().is_active()
+
+
+def test_sweep_reports_live_hosts(session):
+    hosts = [SimHost("127.0.6.3"), SimHost("127.0.6.4", failure=FAIL_DOWN), SimHost("127.0.6.5")]
+    with SimFleet(hosts) as fleet:
+        ips = fleet.ips
+        assert session.live_hosts(ips) is None
+        session.sweep(ips, port=fleet.port, timeout=0.5).result(timeout=10)
+    assert session.live_hosts(ips) == ["127.0.6.3", "127.0.6.5"]
+    assert session.live_hosts(ips + ["127.0.6.6"]) is None
+
+
+def test_cached_value_is_reused_until_invalidated(session):
+    calls = []
+    loader = lambda: calls.append(1) or ["orders", "stock"]
+    assert session.cached(("tables", "wms"), loader) == ["orders", "stock"]
+    session.warm_cached(("tables", "wms"), loader).result(timeout=5)
+    assert len(calls) == 1
+    session.invalidate(("tables", "wms"))
+    session.cached(("tables", "wms"), loader)
+    assert len(calls) == 2
+
+
+def test_encrypted_key_is_not_warmed_in_background(session, tmp_path: Path, monkeypatch):
+    import paramiko
+
+    key = paramiko.RSAKey.generate(1024)
+    key_file = tmp_path / "id_rsa"
+    key.write_private_key_file(str(key_file), password="secret")
+    asked = []
+    monkeypatch.setattr(ssh_keys.getpass, "getpass", lambda prompt: asked.append(prompt) or "secret")
+    monkeypatch.setattr(m3, "find_ssh_key", lambda: str(key_file))
+    monkeypatch.delenv(ssh_keys.PASSPHRASE_ENV, raising=False)
+    monkeypatch.setattr(session, "sweep", lambda hosts: None)
+
+    host = SimHost("127.0.6.7", distribution="debian", version="12")
+    with SimFleet([host], authorized_key=key) as fleet:
+        monkeypatch.setattr(m3, "DEFAULT_AUDIT_HOST", host.ip)
+        m3.warm_session(session)
+        assert session.warm_ssh(host.ip, USERNAME, fleet.port, key_path=str(key_file)) is None
+        assert asked == []
+        # Au premier plan : phrase de passe demandée une fois, dans le thread appelant
+        client = session.ssh(host.ip, USERNAME, fleet.port, key_path=str(key_file))
+        assert client.get_transport().is_active() and len(asked) == 1
+        # Désormais en cache : le préchauffage redevient possible
+        assert session.warm_ssh(host.ip, USERNAME, fleet.port, key_path=str(key_file)) is not None
+
+
+def test_secret_prompt_does_not_hold_the_session_lock(session, monkeypatch):
+    import threading
+
+    typing = threading.Event()
+    release = threading.Event()
+
+    def slow_getpass(prompt):
+        typing.set()
+        release.wait(5)
+        return "pw"
+
+    monkeypatch.setattr(session_mod.getpass, "getpass", slow_getpass)
+    asker = threading.Thread(target=session.secret, args=("mysql", "MySQL password: "))
+    asker.start()
+    assert typing.wait(5)
+    # Pendant la saisie, les autres accès à la session ne sont pas bloqués
+    done = threading.Event()
+    threading.Thread(target=lambda: (session.set_secret("autre", "x"), done.set())).start()
+    assert done.wait(1)
+    release.set()
+    asker.join(5)
+    assert session.known_secret("mysql") == "pw"